@@ -1 +1,11 @@
 # Gemonade Core Package
+from core.gemonade import (
+    resolve_persona,
+    build_session_state,
+    list_gems,
+    install,
+    uninstall,
+    update,
+    recap,
+    history,
+)
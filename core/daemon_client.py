@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Thin gemonade-daemon client. bin/gemonade starts here: this module imports
+only what the socket round-trip needs, lets a running daemon answer the
+command from its warm state, and hands over to the full CLI
+(core/gemonade.py) when no daemon answers.
+"""
+import os
+import sys
+import json
+import socket
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parent
+CODE_FILES = ("gemonade.py", "daemon_client.py")
+
+def socket_path():
+    return Path.home() / ".gemonade" / "daemon.sock"
+
+def code_version():
+    """stat() fingerprint of the code a daemon runs; a daemon reporting another one predates an update."""
+    stamps = []
+    for name in CODE_FILES:
+        st = os.stat(CORE_DIR / name)
+        stamps.append(f"{st.st_mtime_ns}:{st.st_size}")
+    return "/".join(stamps)
+
+def request(sock_path, payload, timeout=2.0):
+    """Sends one request. Returns the raw reply, or None when no daemon is reachable."""
+    if os.environ.get("GEMONADE_NO_DAEMON") or not os.path.exists(sock_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(sock_path))
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+def spawn_daemon(replace=False):
+    """Starts a detached daemon; with `replace`, it first stops the running one and waits for its socket."""
+    import subprocess
+    subprocess.Popen([sys.executable, str(CORE_DIR / "gemonade.py"), "daemon", "serve"] + (["--replace"] if replace else []),
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+def current_request(sock_path, payload, timeout=2.0):
+    """
+    request(), but only from a daemon running the code on disk. A stale one
+    is replaced in the background and None returned, so this invocation
+    runs in-process.
+    """
+    reply = request(sock_path, payload, timeout)
+    if reply is not None and payload.get("op") != "stop" and reply.get("version") != code_version():
+        spawn_daemon(replace=True)
+        return None
+    return reply
+
+def main(argv):
+    reply = current_request(socket_path(), {"op": "cli", "argv": argv, "env": dict(os.environ), "cwd": os.getcwd(),
+                                            "pid": os.getpid()})
+    if reply and reply.get("ok") and reply.get("result") is not None:
+        result = reply["result"]
+        sys.stdout.write(result["stdout"])
+        sys.stderr.write(result["stderr"])
+        sys.exit(result["code"])
+    # Not served by a daemon: the full CLI
+    sys.path.insert(0, str(CORE_DIR))
+    import gemonade
+    gemonade.main()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -7,27 +7,53 @@ The Python-powered brain of the Gemonade framework.
 import os
 import sys
 import json
+import glob
+import fcntl
+import random
 import shutil
 import argparse
 import subprocess
 import re
+import ast
+import math
+import time
+import uuid
+import struct
+import operator
+import compileall
+import socket
+import tarfile
+import io
+import hashlib
+import threading
+import contextvars
+import socketserver
 import urllib.request
 import urllib.error
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
 
 try:
-    from dotenv import load_dotenv
+    from dotenv import load_dotenv, dotenv_values
     HAS_DOTENV = True
 except ImportError:
     HAS_DOTENV = False
 
+try:
+    from core import daemon_client
+except ImportError:
+    import daemon_client  # run as a script (bin/gemonade, the thin client)
+
 
 # --- Configuration & Paths ---
 GEMONADE_HOME = Path(__file__).resolve().parent.parent
 CONFIG_FILE = Path.home() / ".gemonade_config"
 STATE_DIR = Path.home() / ".gemonade"
 G_CORE_VENV = STATE_DIR / ".venv"
+GEMINI_TMP_DIR = os.path.expanduser("~/.gemini/tmp")
 
 # Default Paths
 DEFAULTS = {
@@ -35,11 +61,25 @@ DEFAULTS = {
     "G_PACKAGE_ROOT": str(GEMONADE_HOME / "packages"),
     "G_CORE_PERSONA": str(GEMONADE_HOME / "core" / "CORE_PERSONA.md"),
     "G_SAVER_SCRIPT": str(GEMONADE_HOME / "tools" / "save_session.py"),
-    "GEMONADE_RETENTION_DAYS": "30"
+    "GEMONADE_RETENTION_DAYS": "30",
+    "GEMONADE_RECAP_MODE": "relevance",
+    "GEMONADE_PROJECT_DIGEST": "off",
+    "GEMONADE_UPDATE_CHECK": "on",
+    "GEMONADE_UPDATE_CHECK_TTL": "86400",
+    "GEMONADE_TOOL_CACHE_MB": "200",
+    "GEMONADE_LIVE_CAPTURE": "on",
+    "GEMONADE_SESSION_LAYOUT": "flat",
+    "GEMONADE_PROMPT_LAYOUT": "classic",
+    "G_TEAM_ROOTS": "",
+    "GEMONADE_TEAM_CACHE": "on",
+    "GEMONADE_TEAM_REFRESH_TTL": "300"
 }
 
 # Shared State for Global Flags
-FLAGS = {"verbose": False}
+FLAGS = {"verbose": False, "command": "api"}
+# Per-call output suppression for the Public API; a ContextVar (not FLAGS) so
+# one embedded caller going quiet never silences another thread's output.
+QUIET = contextvars.ContextVar("gemonade_quiet", default=False)
 
 def load_config(config_path=None):
     """Loads Gemonade configuration. Prefers python-dotenv, fallbacks to manual parsing."""
@@ -52,17 +92,7 @@ def load_config(config_path=None):
     if HAS_DOTENV:
         load_dotenv(dotenv_path=target_config)
     else:
-        # Robust Manual Fallback
-        with open(target_config, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                if "=" in line:
-                    line = line.replace("export ", "", 1)
-                    key, value = line.split("=", 1)
-                    value = value.split("#")[0].strip().strip('"').strip("'")
-                    os.environ[key.strip()] = value
+        os.environ.update(read_config_file(target_config))
 
     for key in DEFAULTS:
         if os.environ.get(key):
@@ -70,8 +100,41 @@ def load_config(config_path=None):
     
     return config
 
+def read_config_file(config_path):
+    """KEY=value pairs of a config file."""
+    if HAS_DOTENV:
+        return {k: v for k, v in dotenv_values(config_path).items() if v is not None}
+    # Robust Manual Fallback
+    values = {}
+    with open(config_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "=" in line:
+                line = line.replace("export ", "", 1)
+                key, value = line.split("=", 1)
+                values[key.strip()] = value.split("#")[0].strip().strip('"').strip("'")
+    return values
+
+def config_for_env(env, config_path=None):
+    """
+    load_config() for another process's environment (the daemon serving a
+    client), without touching os.environ. Returns (config, the environment
+    load_config would have left behind).
+    """
+    target_config = Path(config_path) if config_path else Path(env.get("HOME", Path.home())) / ".gemonade_config"
+    values = read_config_file(target_config) if target_config.exists() else {}
+    # python-dotenv keeps variables that are already set; the manual fallback overrides them
+    merged = {**values, **env} if HAS_DOTENV else {**env, **values}
+    config = DEFAULTS.copy()
+    config.update({key: merged[key] for key in DEFAULTS if merged.get(key)})
+    return config, merged
+
 # --- UI Helpers ---
 def print_msg(emoji, message):
+    if QUIET.get():
+        return
     print(f"{emoji} {message}")
 
 def print_err(message):
@@ -89,13 +152,105 @@ def run_proc(cmd, cwd=None, check=True):
     stdout = None if FLAGS["verbose"] else subprocess.PIPE
     stderr = None if FLAGS["verbose"] else subprocess.STDOUT
     
+    program = os.path.basename(cmd[0] if isinstance(cmd, list) else cmd.split()[0])
     try:
-        return subprocess.run(cmd, cwd=cwd, check=check, text=True, stdout=stdout, stderr=stderr)
+        with timed(f"proc:{program}"):
+            return subprocess.run(cmd, cwd=cwd, check=check, text=True, stdout=stdout, stderr=stderr)
     except subprocess.CalledProcessError as e:
         if not FLAGS["verbose"] and e.stdout:
             print(e.stdout)
         raise e
 
+# --- Telemetry ---
+# Every command appends timing events to STATE_DIR/metrics.jsonl (rotated by size).
+# Set GEMONADE_METRICS=0 to disable.
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+METRICS_KEEP = 3
+
+def metrics_path():
+    return STATE_DIR / "metrics.jsonl"
+
+def _rotate_metrics(path):
+    for i in range(METRICS_KEEP - 1, 0, -1):
+        older = path.with_name(f"{path.name}.{i}")
+        if older.exists():
+            os.replace(older, path.with_name(f"{path.name}.{i + 1}"))
+    os.replace(path, path.with_name(f"{path.name}.1"))
+
+def record_metric(command, phase, duration, **sizes):
+    """Appends one timing event. Telemetry failures never affect the command itself."""
+    if os.environ.get("GEMONADE_METRICS", "1") == "0":
+        return
+    event = {"ts": round(time.time(), 3), "command": command, "phase": phase,
+             "duration_ms": round(duration * 1000, 3), "pid": os.getpid()}
+    event.update(sizes)
+    try:
+        path = metrics_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size > METRICS_MAX_BYTES:
+            _rotate_metrics(path)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, (json.dumps(event) + "\n").encode())
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+@contextmanager
+def timed(phase, command=None, **sizes):
+    """Times a block; the yielded dict can be filled with sizes (bytes, counts) before it exits."""
+    start = time.perf_counter()
+    try:
+        yield sizes
+    finally:
+        record_metric(command or FLAGS["command"], phase, time.perf_counter() - start, **sizes)
+
+def load_metrics(since=None):
+    """Reads events (oldest rotation first), optionally only those newer than `since` (epoch seconds)."""
+    path = metrics_path()
+    files = [path.with_name(f"{path.name}.{i}") for i in range(METRICS_KEEP, 0, -1)] + [path]
+    events = []
+    for f in files:
+        if not f.exists():
+            continue
+        with open(f) as handle:
+            for line in handle:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or event.get("ts", 0) >= since:
+                    events.append(event)
+    return events
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+def aggregate_metrics(events):
+    """Groups events by (command, phase) into count and p50/p95/p99 durations."""
+    groups = {}
+    for event in events:
+        groups.setdefault((event.get("command"), event.get("phase")), []).append(event.get("duration_ms", 0))
+    summary = []
+    for (command, phase), durations in sorted(groups.items(), key=lambda kv: (str(kv[0][0]), str(kv[0][1]))):
+        durations.sort()
+        summary.append({"command": command, "phase": phase, "count": len(durations),
+                        "p50": percentile(durations, 50), "p95": percentile(durations, 95), "p99": percentile(durations, 99)})
+    return summary
+
+def parse_window(text):
+    """Converts '30m', '24h', '7d' or '2w' into seconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    match = re.match(r"^(\d+(?:\.\d+)?)([smhdw])$", text.strip())
+    if not match:
+        raise ValueError(f"Invalid time window '{text}'. Use e.g. 30m, 24h, 7d.")
+    return float(match.group(1)) * units[match.group(2)]
+
 # --- Safety & Validation ---
 def validate_gem_name(name):
     """Ensures gem name is safe and contains no traversal characters."""
@@ -124,25 +279,75 @@ def get_safe_installed_path(config, name):
     
     return target
 
+# --- Warm Cache ---
+class WarmCache:
+    """
+    Memoizes derived values against the stat() fingerprint of the files they
+    came from. Only active inside gemonade-daemon; in-process runs compute directly.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(paths):
+        fp = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                fp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                fp.append(None)
+        return fp
+
+    def get(self, key, watch, compute, ttl=None):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and (ttl is None or time.monotonic() - entry["at"] < ttl):
+            if self.fingerprint(entry["paths"]) == entry["fp"]:
+                with self.lock:
+                    self.hits += 1
+                return entry["value"]
+
+        value = compute()
+        # watch may depend on the value (e.g. the persona files a registry scan found)
+        paths = [str(p) for p in (watch(value) if callable(watch) else watch)]
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = {"value": value, "paths": paths, "fp": self.fingerprint(paths), "at": time.monotonic()}
+        return value
+
+WARM_CACHE = None
+
+def warm(key, watch, compute, ttl=None):
+    """Returns compute() directly, or through the daemon's WarmCache when one is active."""
+    if WARM_CACHE is None:
+        return compute()
+    return WARM_CACHE.get(key, watch, compute, ttl)
+
 # --- Context Logic ---
-def detect_project_context(explicit_flag=None):
+def detect_project_context(explicit_flag=None, cwd=None, env=None):
+    env = os.environ if env is None else env
     if explicit_flag:
         return explicit_flag
-    if os.environ.get("GEMONADE_PROJECT"):
-        return os.environ["GEMONADE_PROJECT"]
+    if env.get("GEMONADE_PROJECT"):
+        return env["GEMONADE_PROJECT"]
     
     # Git Root Detection
     try:
         git_root = subprocess.check_output(
             ["git", "rev-parse", "--show-toplevel"], 
-            stderr=subprocess.DEVNULL
+            stderr=subprocess.DEVNULL,
+            cwd=cwd
         ).decode().strip()
         return os.path.basename(git_root)
     except:
         pass
 
     # Local Project File
-    local_conf = Path(".gemonade_project")
+    local_conf = Path(cwd or ".") / ".gemonade_project"
     if local_conf.exists():
         return local_conf.read_text().splitlines()[0].strip()
 
@@ -155,13 +360,14 @@ def find_persona_file(name, config):
     search_paths = [
         root / "local" / name / "persona.md",
         root / "installed" / name / "persona.md",
-        root / "core" / name / "persona.md"
     ]
-    
-    if name == "sys":
-        search_paths.append(root / "core" / "sys" / "persona.md")
-    if name == "general":
-        search_paths.append(root / "core" / "general" / "persona.md")
+    for path in search_paths:
+        if path.exists():
+            return path
+
+    # Team roots are only consulted (via their local mirrors) when nothing local matches
+    search_paths = [team_dir / name / "persona.md" for team_dir in team_package_dirs(config)]
+    search_paths.append(root / "core" / name / "persona.md")
 
     for path in search_paths:
         if path.exists():
@@ -174,15 +380,28 @@ def get_gems_list(config):
     categories = [
         ("LOCAL", root / "local"),
         ("INSTALLED", root / "installed"),
-        ("CORE", root / "core")
     ]
+    categories += [("TEAM", team_dir) for team_dir in team_package_dirs(config)]
+    categories.append(("CORE", root / "core"))
+
+    def watched(results):
+        paths = [path for _, path in categories]
+        for title, path in categories:
+            paths += [path / name / "persona.md" for name, _ in results.get(title, [])]
+        return paths
+
+    return warm(("gems", str(root)) + tuple(str(p) for _, p in categories), watched, lambda: _scan_gems(categories))
 
+def _scan_gems(categories):
     results = {}
     for title, path in categories:
-        gems = []
+        gems = results.setdefault(title, [])
+        seen = {name for name, _ in gems}
         if path.exists():
             for persona_md in path.glob("*/persona.md"):
                 gem_name = persona_md.parent.name
+                if gem_name in seen:  # an earlier team root shadows later ones
+                    continue
                 objective = "No objective defined."
                 try:
                     with open(persona_md, 'r') as f:
@@ -256,6 +475,10 @@ def search_gems(query):
 
 # --- Gem Lifecycle ---
 def hydrate_gem(path):
+    with timed("hydrate", gem=Path(path).name):
+        return _hydrate_gem(path)
+
+def _hydrate_gem(path):
     path = Path(path)
     req_file = path / "requirements.txt"
     gem_json = path / "gem.json"
@@ -302,6 +525,10 @@ def hydrate_gem(path):
         raise RuntimeError(f"Hydration failed for '{path.name}': {e}")
 
 def install_gem(source, config):
+    with timed("install", source_type="path" if os.path.isdir(source) else "git"):
+        return _install_gem(source, config)
+
+def _install_gem(source, config):
     installed_dir = Path(config["G_PACKAGE_ROOT"]) / "installed"
     installed_dir.mkdir(parents=True, exist_ok=True)
     
@@ -317,9 +544,10 @@ def install_gem(source, config):
             if dest_path.exists():
                 shutil.rmtree(dest_path)
             shutil.copytree(src_path, dest_path, ignore=shutil.ignore_patterns(".git", ".venv", "__pycache__"))
+            source_info = {"type": "path", "path": str(src_path)}
         else:
             repo_url = source
-            if "/" in source and "http" not in source and "@" not in source:
+            if "/" in source and "://" not in source and "@" not in source:
                 repo_url = f"https://github.com/{source}.git"
             gem_name = validate_gem_name(Path(repo_url).stem)
             dest_path = installed_dir / gem_name
@@ -327,6 +555,8 @@ def install_gem(source, config):
                 shutil.rmtree(dest_path)
             print_msg("📦", f"Cloning {repo_url}...")
             run_proc(["git", "clone", repo_url, str(dest_path)])
+            commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=dest_path, capture_output=True, text=True).stdout.strip()
+            source_info = {"type": "git", "url": repo_url, "commit": commit}
             shutil.rmtree(dest_path / ".git", ignore_errors=True)
 
         manifest = dest_path / "gem.json"
@@ -346,6 +576,8 @@ def install_gem(source, config):
                     dest_path = final_path
 
         hydrate_gem(dest_path)
+        optimize_gem(dest_path, source=source_info)
+        reindex_blueprints(config)
         return str(dest_path.name)
 
     except Exception as e:
@@ -353,17 +585,2215 @@ def install_gem(source, config):
             shutil.rmtree(dest_path)
         raise e
 
+# --- Install Optimization ---
+# Runs after hydration so the first tool call after an install does not pay for
+# bytecode compilation, and records what was installed in a receipt.
+RECEIPT_FILE = ".gemonade_receipt.json"
+VENV_PRUNE_DIRS = frozenset(["tests", "test", "testing_data", "docs", "doc", "examples"])
+
+def gem_python(path):
+    venv_python = Path(path) / ".venv" / "bin" / "python"
+    return venv_python if venv_python.exists() else None
+
+def site_packages_dirs(path):
+    return sorted((Path(path) / ".venv").glob("lib/python*/site-packages"))
+
+def _tree_size(path):
+    total, count = 0, 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+                count += 1
+            except OSError:
+                pass
+    return total, count
+
+def prune_venv(path):
+    """
+    Removes test/doc payloads shipped inside installed packages. Only
+    directories nested in a package are touched, never top-level modules.
+    Returns the number of bytes freed.
+    """
+    freed = 0
+    for site in site_packages_dirs(path):
+        for package in site.iterdir():
+            if not package.is_dir() or package.name.endswith((".dist-info", ".egg-info")) or package.name in ("pip", "setuptools"):
+                continue
+            for root, dirs, _ in os.walk(package):
+                for name in [d for d in dirs if d in VENV_PRUNE_DIRS]:
+                    target = Path(root) / name
+                    freed += _tree_size(target)[0]
+                    shutil.rmtree(target, ignore_errors=True)
+                    dirs.remove(name)
+    return freed
+
+def tool_entrypoints(path):
+    tools_dir = Path(path) / "tools"
+    if not tools_dir.is_dir():
+        return []
+    entries = []
+    for tool in sorted(tools_dir.iterdir()):
+        if tool.is_file() and not tool.name.startswith("."):
+            entries.append({
+                "name": tool.name,
+                "kind": "python" if _is_python_tool(tool) else "executable" if os.access(tool, os.X_OK) else "data",
+                "sha256": hashlib.sha256(tool.read_bytes()).hexdigest(),
+            })
+    return entries
+
+def dependency_fingerprint(path):
+    """Hash of the requirements file plus the installed distributions (name-version)."""
+    digest = hashlib.sha256()
+    for req in ("requirements.txt",):
+        if (Path(path) / req).exists():
+            digest.update((Path(path) / req).read_bytes())
+    for site in site_packages_dirs(path):
+        for dist in sorted(site.glob("*.dist-info")):
+            digest.update(dist.name.encode() + b"\0")
+    return digest.hexdigest()
+
+def read_receipt(path):
+    try:
+        return json.loads((Path(path) / RECEIPT_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+def optimize_gem(path, source=None):
+    with timed("optimize", gem=Path(path).name):
+        return _optimize_gem(path, source)
+
+def _optimize_gem(path, source=None):
+    """Precompiles tools and the venv, prunes the venv and writes the install receipt."""
+    path = Path(path)
+    python = gem_python(path)
+    if python:
+        targets = [str(d) for d in site_packages_dirs(path)]
+        freed = prune_venv(path)
+        if (path / "tools").is_dir():
+            targets.append(str(path / "tools"))
+        run_proc([str(python), "-m", "compileall", "-q", "-j", "0"] + targets)
+    else:
+        freed = 0
+        if (path / "tools").is_dir():
+            compileall.compile_dir(str(path / "tools"), quiet=1)
+
+    previous = read_receipt(path) or {}
+    try:
+        manifest = json.loads((path / "gem.json").read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    interpreter = str(python) if python else sys.executable
+    receipt = {
+        "name": path.name,
+        "version": manifest.get("version"),
+        "installed_at": datetime.now().isoformat(timespec="seconds"),
+        "source": source or previous.get("source"),
+        "interpreter": interpreter,
+        "python_version": subprocess.run([interpreter, "-c", "import platform; print(platform.python_version())"],
+                                         capture_output=True, text=True).stdout.strip(),
+        "entrypoints": tool_entrypoints(path),
+        "dependency_fingerprint": dependency_fingerprint(path),
+        "pruned_bytes": freed,
+    }
+    atomic_write_text(path / RECEIPT_FILE, json.dumps(receipt, indent=2))
+    log_debug(f"Optimized '{path.name}': pruned {freed} bytes")
+    return receipt
+
+def _tool_imports(tool):
+    """Top-level modules imported by a Python tool (what a cold start must load)."""
+    try:
+        tree = ast.parse(tool.read_text())
+    except (OSError, SyntaxError, ValueError):
+        return []
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def _best_time(cmd, runs, cwd=None):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def diagnose_gem(path, runs=3):
+    """Footprint, receipt drift and cold-start timings for one gem."""
+    path = Path(path)
+    python = str(gem_python(path) or sys.executable)
+    total, files = _tree_size(path)
+    venv_bytes = _tree_size(path / ".venv")[0]
+    receipt = read_receipt(path)
+
+    drift = []
+    if receipt:
+        recorded = {e["name"]: e["sha256"] for e in receipt.get("entrypoints", [])}
+        current = {e["name"]: e["sha256"] for e in tool_entrypoints(path)}
+        drift = sorted(name for name in set(recorded) | set(current) if recorded.get(name) != current.get(name))
+        if receipt.get("dependency_fingerprint") != dependency_fingerprint(path):
+            drift.append("(dependencies)")
+
+    tools = []
+    for tool in sorted((path / "tools").iterdir()) if (path / "tools").is_dir() else []:
+        if not _is_python_tool(tool):
+            continue
+        modules = _tool_imports(tool)
+        code = "".join(f"try: import {m}\nexcept Exception: pass\n" for m in modules) or "pass"
+        tools.append({"name": tool.name, "imports": modules,
+                      "cold_start_s": _best_time([python, "-c", code], runs, cwd=path / "tools")})
+
+    return {
+        "name": path.name,
+        "path": str(path),
+        "interpreter": python,
+        "footprint_bytes": total,
+        "files": files,
+        "venv_bytes": venv_bytes,
+        "receipt": receipt is not None,
+        "drift": drift,
+        "interpreter_start_s": _best_time([python, "-c", "pass"], runs),
+        "tools": tools,
+    }
+
+# --- Update Checks ---
+# 'gemonade outdated' compares every installed gem with the source recorded in
+# its receipt. Results are cached so 'run' can hint without network access.
+OUTDATED_TIMEOUT = 10
+OUTDATED_WORKERS = 8
+
+def outdated_cache_path():
+    return STATE_DIR / "outdated.json"
+
+def check_gem_update(path, timeout=OUTDATED_TIMEOUT):
+    """Compares one installed gem with its recorded source. Never raises."""
+    path = Path(path)
+    result = {"name": path.name, "status": "unknown", "installed": None, "latest": None, "detail": ""}
+    source = (read_receipt(path) or {}).get("source")
+    if not source:
+        result["detail"] = "no install receipt (reinstall to track updates)"
+        return result
+    try:
+        if source["type"] == "git":
+            result["installed"] = (source.get("commit") or "")[:7]
+            env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+            out = subprocess.run(["git", "ls-remote", source["url"], "HEAD"], capture_output=True,
+                                 text=True, timeout=timeout, env=env)
+            if out.returncode != 0 or not out.stdout.strip():
+                raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "no HEAD")
+            latest = out.stdout.split()[0]
+            result["latest"] = latest[:7]
+            result["status"] = "current" if latest == source.get("commit") else "outdated"
+        else:
+            installed = json.loads((path / "gem.json").read_text()).get("version")
+            latest = json.loads((Path(source["path"]) / "gem.json").read_text()).get("version")
+            result.update({"installed": installed, "latest": latest,
+                           "status": "current" if installed == latest else "outdated"})
+    except subprocess.TimeoutExpired:
+        result.update({"status": "error", "detail": f"timed out after {timeout}s"})
+    except Exception as e:
+        result.update({"status": "error", "detail": str(e)})
+    return result
+
+def check_outdated(config, timeout=OUTDATED_TIMEOUT, workers=OUTDATED_WORKERS):
+    """Checks all installed gems concurrently and refreshes the cache."""
+    installed_dir = Path(config["G_PACKAGE_ROOT"]) / "installed"
+    gems = sorted(p for p in installed_dir.iterdir() if p.is_dir()) if installed_dir.exists() else []
+    with timed("outdated_check", gems=len(gems)):
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(gems)))) as pool:
+            results = list(pool.map(lambda gem: check_gem_update(gem, timeout), gems))
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(outdated_cache_path(), json.dumps({"checked_at": time.time(), "results": results}, indent=2))
+    return results
+
+def read_outdated_cache():
+    try:
+        return json.loads(outdated_cache_path().read_text())
+    except (OSError, ValueError):
+        return None
+
+def update_hint(persona, config):
+    """
+    Returns a hint if the cached check says `persona` is outdated. Never touches
+    the network; queues a background refresh when the cache is stale.
+    """
+    if config.get("GEMONADE_UPDATE_CHECK", "on").lower() in ("off", "0", "false", "no"):
+        return None
+    cache = read_outdated_cache()
+    if cache is None or time.time() - cache.get("checked_at", 0) > float(config.get("GEMONADE_UPDATE_CHECK_TTL", 86400)):
+        installed_dir = Path(config["G_PACKAGE_ROOT"]) / "installed"
+        if installed_dir.exists() and any(installed_dir.iterdir()) \
+                and not any(job["kind"] == "outdated" for job in list_jobs("pending")):
+            enqueue_job("outdated", {})
+    for result in (cache or {}).get("results", []):
+        if result["name"] == persona and result["status"] == "outdated":
+            return f"Update available for '{persona}' ({result['installed']} -> {result['latest']}). Run: gemonade update {persona}"
+    return None
+
+# --- Team Packages ---
+# G_TEAM_ROOTS lists shared package roots (e.g. an NFS share), in priority order.
+# Each root is mirrored into STATE_DIR/team_cache so launches read local disk;
+# a stale mirror is served as-is while a 'team_refresh' job re-syncs it. Team
+# jobs run in their own worker lane so a hung share never blocks session saves.
+TEAM_SKIP_DIRS = {".git", ".venv", "__pycache__"}
+TEAM_INDEX = "index.json"
+
+def team_roots(config):
+    return [r for r in config.get("G_TEAM_ROOTS", "").split(os.pathsep) if r.strip()]
+
+def team_mirror_dir(root):
+    root = os.path.abspath(os.path.expanduser(root))
+    return STATE_DIR / "team_cache" / f"{Path(root).name}-{hashlib.sha1(root.encode()).hexdigest()[:12]}"
+
+def read_team_index(mirror):
+    try:
+        return json.loads((Path(mirror) / TEAM_INDEX).read_text())
+    except (OSError, ValueError):
+        return None
+
+def _team_files(gem_dir):
+    files = []
+    for dirpath, dirnames, filenames in os.walk(gem_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in TEAM_SKIP_DIRS)
+        files += [Path(dirpath) / f for f in sorted(filenames)]
+    return files
+
+def _team_stat_fingerprint(gem_dir):
+    """Cheap change detector (paths, sizes, mtimes); the content hash decides."""
+    h = hashlib.sha1()
+    for path in _team_files(gem_dir):
+        st = path.stat()
+        h.update(f"{path.relative_to(gem_dir)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+def team_content_hash(gem_dir):
+    h = hashlib.sha256()
+    for path in _team_files(gem_dir):
+        h.update(str(path.relative_to(gem_dir)).encode() + b"\0")
+        h.update(path.read_bytes())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def _file_sha1(path):
+    try:
+        return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+def _mirror_team_gem(src, dest, content_hash, hydrate=True):
+    """
+    Copies src next to dest, verifies it, then swaps it in (keeping a still-valid
+    .venv). With hydrate=False a needed venv build is queued as a 'team_hydrate'
+    job instead; returns True when it was.
+    """
+    tmp = dest.with_name(f".{dest.name}.tmp-{os.getpid()}")
+    if tmp.exists(): shutil.rmtree(tmp)
+    shutil.copytree(src, tmp, ignore=shutil.ignore_patterns(*TEAM_SKIP_DIRS))
+    if team_content_hash(tmp) != content_hash:
+        shutil.rmtree(tmp)
+        raise RuntimeError(f"'{src.name}' changed while it was being mirrored")
+
+    req_file = tmp / "requirements.txt"
+    old_venv = dest / ".venv"
+    keep_venv = old_venv.exists() and _file_sha1(req_file) == _file_sha1(dest / "requirements.txt")
+    needs_venv = req_file.exists() and not keep_venv
+    if keep_venv:
+        os.replace(old_venv, tmp / ".venv")
+    if dest.exists():
+        old = dest.with_name(f".{dest.name}.old-{os.getpid()}")
+        os.replace(dest, old)
+        os.replace(tmp, dest)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, dest)
+    # Venvs embed absolute paths, so hydrate only once the copy is in its final place
+    if needs_venv:
+        if not hydrate:
+            enqueue_job("team_hydrate", {"path": str(dest)})
+            return True
+        hydrate_gem(dest)
+    return False
+
+def sync_team_root(root, hydrate=True):
+    """
+    Mirrors one team root. Gems whose stat fingerprint, or else manifest version
+    and content hash, match the mirror are not copied again. Returns the index.
+    With hydrate=False, venvs are built by a background worker.
+    """
+    root = Path(os.path.expanduser(root))
+    if not root.is_dir():
+        raise FileNotFoundError(f"Team root '{root}' is not reachable.")
+    mirror = team_mirror_dir(root)
+    mirror.mkdir(parents=True, exist_ok=True)
+    previous = (read_team_index(mirror) or {}).get("gems", {})
+    gems, deferred = {}, False
+    with timed("team_sync", root=root.name):
+        for persona_md in sorted(root.glob("*/persona.md")):
+            src = persona_md.parent
+            try:
+                name = validate_gem_name(src.name)
+                version = json.loads((src / "gem.json").read_text()).get("version")
+            except (ValueError, OSError):
+                log_debug(f"Skipping team gem without a valid name/manifest: {src}")
+                continue
+            stat_fp = _team_stat_fingerprint(src)
+            old = previous.get(name)
+            cached = old and (mirror / name).exists() and old.get("version") == version
+            if cached and old.get("stat") == stat_fp:
+                gems[name] = old
+                continue
+            content_hash = team_content_hash(src)
+            if not (cached and old.get("hash") == content_hash):
+                log_debug(f"Mirroring team gem '{name}' ({version})")
+                deferred |= _mirror_team_gem(src, mirror / name, content_hash, hydrate)
+            gems[name] = {"version": version, "hash": content_hash, "stat": stat_fp, "synced_at": time.time()}
+
+        for name in set(previous) - set(gems):
+            shutil.rmtree(mirror / name, ignore_errors=True)
+    index = {"root": str(root), "checked_at": time.time(), "gems": gems}
+    atomic_write_text(mirror / TEAM_INDEX, json.dumps(index, indent=2))
+    if deferred:
+        spawn_job_worker("team")
+    return index
+
+def team_package_dirs(config):
+    """
+    Directories to search for team gems, in root order. Serves mirrors from local
+    disk and queues a background refresh when one is older than
+    GEMONADE_TEAM_REFRESH_TTL; a root is only read directly on its first use,
+    and even then gem venvs are hydrated in the background.
+    """
+    roots = team_roots(config)
+    if config.get("GEMONADE_TEAM_CACHE", "on").lower() in ("off", "0", "false", "no"):
+        return [Path(os.path.expanduser(r)) for r in roots]
+    ttl = float(config.get("GEMONADE_TEAM_REFRESH_TTL", 300))
+    dirs = []
+    for root in roots:
+        mirror = team_mirror_dir(root)
+        index = read_team_index(mirror)
+        if index is None:
+            try:
+                sync_team_root(root, hydrate=False)
+            except (OSError, RuntimeError) as e:
+                log_debug(f"Team root unavailable: {e}")
+                continue
+        elif time.time() - index.get("checked_at", 0) > ttl:
+            queue_team_refresh(root)
+        dirs.append(mirror)
+    return dirs
+
+def queue_team_refresh(root):
+    if any(job["kind"] == "team_refresh" and job["payload"].get("root") == root for job in list_jobs("pending")):
+        return
+    enqueue_job("team_refresh", {"root": root})
+    spawn_job_worker("team")
+
+# --- Prompt Compiler ---
+# Bump when the composite layout changes so stale cache entries are ignored.
+PROMPT_COMPILER_VERSION = "1"
+# Composites kept in STATE_DIR/prompt_cache; every edit of a board member adds one
+PROMPT_CACHE_KEEP = 32
+
+def split_sections(text):
+    """Splits Markdown into blocks, each starting at a heading line (the preamble is its own block)."""
+    sections, current = [], []
+    in_fence = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        if not in_fence and line.startswith("#") and current:
+            sections.append("\n".join(current).strip("\n"))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current).strip("\n"))
+    return [s for s in sections if s.strip()]
+
+def _section_key(section):
+    """Whitespace-insensitive identity of a section, used for deduplication."""
+    normalized = "\n".join(" ".join(line.split()) for line in section.splitlines() if line.strip())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+def compile_composite(personas):
+    """
+    Merges several persona files into one 'Consultative Board' block.
+    personas: list of (name, persona_path). Sections repeated verbatim across
+    personas (shared standards, boilerplate) are emitted only once.
+    """
+    names = [name for name, _ in personas]
+    out = "# 🤝 Consultative Board\n"
+    out += f"You are a board of {len(names)} expert personas: {', '.join(names)}.\n"
+    out += "Answer as the persona best suited to each point and prefix every contribution with its name "
+    out += f"(e.g. `[{names[0]}]: ...`). Personas may consult and challenge each other.\n"
+
+    seen = set()
+    for name, path in personas:
+        out += f"\n# 🎭 Persona: {name}\n\n"
+        kept = []
+        for section in split_sections(Path(path).read_text()):
+            key = _section_key(section)
+            if key in seen:
+                log_debug(f"Composite: dropped duplicate section from '{name}'")
+                continue
+            seen.add(key)
+            kept.append(section)
+        out += "\n\n".join(kept) + "\n"
+    return out
+
+def get_composite_prompt(personas):
+    """Returns the compiled composite, cached in STATE_DIR by the hashes of its inputs."""
+    key = ("composite",) + tuple((name, str(path)) for name, path in personas)
+    return warm(key, [path for _, path in personas], lambda: _load_composite(personas))
+
+def prune_prompt_cache(keep=None):
+    """Keeps the `keep` most recently used composites (hits refresh the mtime)."""
+    keep = PROMPT_CACHE_KEEP if keep is None else keep
+    entries = []
+    for path in (STATE_DIR / "prompt_cache").glob("composite_*.md"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except OSError:
+            pass
+    entries.sort(reverse=True)
+    for _, path in entries[keep:]:
+        path.unlink(missing_ok=True)
+    return len(entries[keep:])
+
+def _load_composite(personas):
+    key = hashlib.sha256(PROMPT_COMPILER_VERSION.encode())
+    for name, path in personas:
+        key.update(b"\0" + name.encode() + b"\0")
+        key.update(hashlib.sha256(Path(path).read_bytes()).digest())
+
+    cache_dir = STATE_DIR / "prompt_cache"
+    cache_file = cache_dir / f"composite_{key.hexdigest()[:32]}.md"
+    try:
+        content = cache_file.read_text()
+        os.utime(cache_file)
+        log_debug(f"Composite prompt cache hit: {cache_file.name}")
+        return content
+    except OSError:
+        pass
+
+    content = compile_composite(personas)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(content)
+    os.replace(tmp, cache_file)
+    prune_prompt_cache()
+    return content
+
+# Prompt layouts: "classic" puts the recap and scope between the core standards
+# and the persona. "stable" emits the static sections first, normalized and
+# byte-identical across launches, so provider-side prompt caching can reuse
+# them; per-launch data goes in a trailing section.
+PROMPT_LAYOUTS = ("classic", "stable")
+
+def prompt_layout(config):
+    layout = config.get("GEMONADE_PROMPT_LAYOUT", "classic").lower()
+    return layout if layout in PROMPT_LAYOUTS else "classic"
+
+def normalize_prompt_text(text):
+    """LF line endings, no trailing spaces, at most one blank line in a row, one final newline."""
+    lines, blank = [], False
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = line.rstrip()
+        if not line:
+            if blank or not lines:
+                continue
+            blank = True
+        else:
+            blank = False
+        lines.append(line)
+    return "\n".join(lines).rstrip("\n") + "\n"
+
+def assemble_system_prompt(core, persona_block, volatile, layout="classic"):
+    """
+    Joins the prompt parts. `persona_block` is the persona (or board) plus its
+    static extras; `volatile` lists per-launch blocks (recap, resume, digest,
+    scope). Returns (prompt, stable prefix length in characters).
+    """
+    if layout == "stable":
+        stable = normalize_prompt_text("\n\n".join(part for part in (core, persona_block) if part.strip()))
+        context = "".join(part for part in volatile if part)
+        return stable + "\n# 🕒 Session Context\n" + context, len(stable)
+    prefix = core + "\n\n" if core else ""
+    return prefix + "".join(part for part in volatile if part) + persona_block, len(prefix)
+
+# --- Session Layout ---
+# Sessions live in knowledge/sessions/<persona>/<project>/, either flat or
+# sharded by month (<project>/YYYY/MM/). Ledger 'file' values are paths
+# relative to the project directory. Readers accept both layouts, so a tree
+# stays usable while 'gemonade migrate-layout' is moving it.
+SESSION_LAYOUTS = ("flat", "monthly")
+SESSION_SIDECARS = (".resume.json", ".tools.json")
+SHARD_GLOB = "[0-9][0-9][0-9][0-9]/[0-9][0-9]"
+
+def session_layout(config):
+    layout = config.get("GEMONADE_SESSION_LAYOUT", "flat").lower()
+    return layout if layout in SESSION_LAYOUTS else "flat"
+
+def session_relpath(filename, layout):
+    """Where a session file belongs inside its project dir ('session_YYYYMMDD_...' names carry the month)."""
+    name = Path(filename).name
+    match = re.match(r"session_(\d{4})(\d{2})\d{2}_", name)
+    if layout == "monthly" and match:
+        return f"{match.group(1)}/{match.group(2)}/{name}"
+    return name
+
+def locate_session_file(project_dir, filename, layout="flat"):
+    """Existing location of a session file in either layout, else where `layout` puts it."""
+    project_dir = Path(project_dir)
+    for candidate_layout in dict.fromkeys((layout,) + SESSION_LAYOUTS):
+        path = project_dir / session_relpath(filename, candidate_layout)
+        if path.exists():
+            return path
+    return project_dir / session_relpath(filename, layout)
+
+def iter_session_files(project_dir, pattern="session_*.md"):
+    """Session files of a project in both layouts, ordered by name (i.e. by start time)."""
+    project_dir = Path(project_dir)
+    files = list(project_dir.glob(pattern)) + list(project_dir.glob(f"{SHARD_GLOB}/{pattern}"))
+    return sorted(files, key=lambda p: p.name)
+
+def session_location(path, config):
+    """(persona, project, project_dir) for a file inside the sessions tree."""
+    sessions = (Path(config["G_KNOWLEDGE_DIR"]) / "sessions").resolve()
+    parts = Path(path).resolve().relative_to(sessions).parts
+    return parts[0], parts[1], sessions / parts[0] / parts[1]
+
+def rewrite_ledger(ledger_path, transform):
+    """
+    Rewrites every entry of a ledger through transform(entry) -> entry, atomically.
+    Holds the ledger lock; appenders waiting on it notice the replaced file and reopen.
+    """
+    ledger_path = Path(ledger_path)
+    if not ledger_path.exists():
+        return 0
+    with open(ledger_path, "rb+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        changed, lines = 0, []
+        for line in f.read().decode(errors="replace").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                lines.append(line)
+                continue
+            new = transform(dict(entry))
+            changed += new != entry
+            lines.append(json.dumps(new))
+        if changed:
+            atomic_write_text(ledger_path, "".join(l + "\n" for l in lines))
+        return changed
+
+@contextmanager
+def locked_ledger(ledger_path):
+    """Holds the ledger lock on the current file (re-opening if it was replaced while we waited)."""
+    while True:
+        fd = os.open(ledger_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.stat(ledger_path).st_ino == os.fstat(fd).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+def replace_ledger(ledger_path, entries):
+    """
+    Replaces all entries of a ledger, atomically and under the ledger lock.
+    A history ledger's term sidecar is rebuilt in the same locked step, so it
+    never holds vectors of entries that are gone.
+    """
+    ledger_path = Path(ledger_path)
+    with locked_ledger(ledger_path):
+        if ledger_path.name == "history.jsonl":
+            sidecar = ledger_path.with_name("history.terms.jsonl")
+            with locked_ledger(sidecar):
+                atomic_write_text(sidecar, "".join(json.dumps({"file": e.get("file"), "terms": term_vector(e)}) + "\n"
+                                                   for e in entries))
+        atomic_write_text(ledger_path, "".join(json.dumps(e) + "\n" for e in entries))
+
+def migrate_project_layout(project_dir, layout):
+    """
+    Moves one project's sessions (and their sidecars) to `layout`, then
+    rewrites ledger references. Safe to re-run after an interruption.
+    Returns (files moved, ledger entries rewritten).
+    """
+    project_dir = Path(project_dir)
+    moved = 0
+    for md in iter_session_files(project_dir):
+        # Sidecars are looked up in both layouts: an interrupted run may have split them up
+        for name in [md.name] + [md.stem + suffix for suffix in SESSION_SIDECARS]:
+            dest = project_dir / session_relpath(name, layout)
+            for src in {project_dir / session_relpath(name, other) for other in SESSION_LAYOUTS} - {dest}:
+                if src.exists():
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(src, dest)
+                    moved += 1
+
+    def relocate(entry):
+        if entry.get("file"):
+            entry["file"] = session_relpath(entry["file"], layout)
+        return entry
+    rewritten = sum(rewrite_ledger(project_dir / name, relocate) for name in ("history.jsonl", "history.terms.jsonl"))
+
+    if layout == "flat":
+        for shard in sorted(project_dir.glob(SHARD_GLOB), reverse=True):
+            for folder in (shard, shard.parent):
+                try:
+                    folder.rmdir()
+                except OSError:
+                    pass
+    return moved, rewritten
+
+def migrate_layout(config, layout="monthly"):
+    """Migrates every persona/project under knowledge/sessions; returns per-project results."""
+    sessions = Path(config["G_KNOWLEDGE_DIR"]) / "sessions"
+    results = []
+    for project_dir in sorted(sessions.glob("*/*")):
+        if project_dir.parent.name == "archive" or not project_dir.is_dir():
+            continue
+        with timed("migrate_layout", project=project_dir.name) as sizes:
+            moved, rewritten = migrate_project_layout(project_dir, layout)
+            sizes.update(moved=moved, rewritten=rewritten)
+        results.append({"persona": project_dir.parent.name, "project": project_dir.name,
+                        "moved": moved, "rewritten": rewritten})
+    return results
+
+# --- Knowledge Sync ---
+# 'gemonade sync export|import' moves knowledge/ between machines as delta
+# bundles (tar.gz). STATE_DIR/sync/manifest.json caches content hashes by
+# stat so unchanged files are not re-read; peers/<peer>.json records what a
+# peer already has. An export only records what it sent as pending: the peer
+# baseline advances once the peer acknowledges the bundle, either through the
+# ids carried by its next bundle back or by 'gemonade sync ack'. Ledgers
+# travel as entries and are merged by session file.
+SYNC_VERSION = 1
+SYNC_PENDING_KEEP = 10
+SYNC_LEDGERS = ("history.jsonl", "history.terms.jsonl")
+
+def sync_dir():
+    return STATE_DIR / "sync"
+
+def _sync_skipped(name):
+    """Temp files (atomic writes, locks) and local conflict copies never leave the machine."""
+    return (name.startswith(".") or name.endswith((".tmp", ".lock")) or name == "__pycache__"
+            or ".sync-conflict" in name)
+
+def _read_json(path, default):
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return default
+
+def knowledge_manifest(knowledge_dir):
+    """{relpath: {"sha256", "size"}} for the knowledge tree; only new or touched files are hashed."""
+    knowledge_dir = Path(knowledge_dir)
+    cache_file = sync_dir() / "manifest.json"
+    cache = _read_json(cache_file, {})
+    cached = cache.get("files", {}) if cache.get("root") == str(knowledge_dir) else {}
+    files = {}
+    with timed("sync_manifest") as sizes:
+        hashed = 0
+        for dirpath, dirnames, filenames in os.walk(knowledge_dir):
+            dirnames[:] = [d for d in dirnames if not _sync_skipped(d)]
+            for name in filenames:
+                if _sync_skipped(name):
+                    continue
+                path = Path(dirpath) / name
+                rel = path.relative_to(knowledge_dir).as_posix()
+                st = path.stat()
+                old = cached.get(rel)
+                if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                    files[rel] = old
+                    continue
+                files[rel] = {"sha256": hashlib.sha256(path.read_bytes()).hexdigest(),
+                              "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                hashed += 1
+        sizes.update(files=len(files), hashed=hashed)
+    sync_dir().mkdir(parents=True, exist_ok=True)
+    atomic_write_text(cache_file, json.dumps({"root": str(knowledge_dir), "files": files}))
+    return files
+
+def _peer_path(peer, kind=None):
+    """The peer's baseline, or its 'pending' exports / 'acks' (bundle ids imported from it)."""
+    suffix = f".{kind}" if kind else ""
+    return sync_dir() / "peers" / f"{validate_gem_name(peer)}{suffix}.json"
+
+def _write_peer_file(peer, data, kind=None):
+    _peer_path(peer, kind).parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(_peer_path(peer, kind), json.dumps(data))
+
+def sync_ack(peer="default", bundle_id=None):
+    """
+    Commits a pending export (the newest, or `bundle_id`) into the peer
+    baseline; older pending exports are dropped. Returns the committed id or None.
+    """
+    pending = _read_json(_peer_path(peer, "pending"), {})
+    if bundle_id is None:
+        bundle_id = max(pending, key=lambda i: pending[i]["created"], default=None)
+    export = pending.get(bundle_id)
+    if export is None:
+        return None
+    baseline = {} if export["full"] else _read_json(_peer_path(peer), {})
+    baseline.update(export["files"])
+    _write_peer_file(peer, baseline)
+    _write_peer_file(peer, {i: e for i, e in pending.items() if e["created"] > export["created"]}, "pending")
+    return bundle_id
+
+def sync_plan(config, peer="default", full=False):
+    """What an export would send: [(relpath, manifest entry, "full" | "append", offset)]."""
+    knowledge_dir = Path(config["G_KNOWLEDGE_DIR"])
+    baseline = {} if full else _read_json(_peer_path(peer), {})
+    plan = []
+    for rel, entry in sorted(knowledge_manifest(knowledge_dir).items()):
+        known = baseline.get(rel)
+        if known and known["sha256"] == entry["sha256"]:
+            continue
+        offset = 0
+        if known and Path(rel).name in SYNC_LEDGERS and entry["size"] > known["size"]:
+            # Ledgers are append-only: if the peer's copy is still our prefix, send the tail
+            with open(knowledge_dir / rel, "rb") as f:
+                if hashlib.sha256(f.read(known["size"])).hexdigest() == known["sha256"]:
+                    offset = known["size"]
+        plan.append((rel, entry, "append" if offset else "full", offset))
+    return plan
+
+def sync_export(config, bundle, peer="default", full=False):
+    """Writes a delta bundle of everything `peer` does not have yet. Returns a summary."""
+    knowledge_dir = Path(config["G_KNOWLEDGE_DIR"])
+    plan = sync_plan(config, peer, full)
+    bundle_id = f"{time.time_ns()}-{random.randrange(16**6):06x}"
+    meta = {"version": SYNC_VERSION, "id": bundle_id, "created": time.time(), "host": socket.gethostname(),
+            "acks": _read_json(_peer_path(peer, "acks"), []),
+            "files": {rel: {"sha256": entry["sha256"], "size": entry["size"], "mode": mode}
+                      for rel, entry, mode, _ in plan}}
+    sent = 0
+    tmp = Path(bundle).with_name(f".{Path(bundle).name}.tmp")
+    with tarfile.open(tmp, "w:gz") as tar:
+        data = json.dumps(meta).encode()
+        info = tarfile.TarInfo("sync.json")
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+        for rel, entry, mode, offset in plan:
+            with open(knowledge_dir / rel, "rb") as f:
+                f.seek(offset)
+                data = f.read(entry["size"] - offset)
+            info = tarfile.TarInfo(f"files/{rel}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            sent += len(data)
+    os.replace(tmp, bundle)
+
+    # The bundle may never reach the peer, so the baseline waits for an ack
+    pending = _read_json(_peer_path(peer, "pending"), {})
+    pending[bundle_id] = {"created": meta["created"], "full": full,
+                          "files": {rel: {"sha256": entry["sha256"], "size": entry["size"]} for rel, entry, _, _ in plan}}
+    newest = sorted(pending, key=lambda i: pending[i]["created"])[-SYNC_PENDING_KEEP:]
+    _write_peer_file(peer, {i: pending[i] for i in newest}, "pending")
+    return {"bundle": str(bundle), "id": bundle_id, "files": len(plan), "bytes": sent, "bundle_bytes": Path(bundle).stat().st_size}
+
+def _ledger_key(entry):
+    # Session file names are layout independent; other entries are keyed by content
+    return Path(entry["file"]).name if entry.get("file") else json.dumps(entry, sort_keys=True)
+
+def merge_ledger(ledger_path, lines, project_dir, layout):
+    """Appends incoming entries whose session is not in the local ledger yet. Returns how many."""
+    ledger_path = Path(ledger_path)
+    local = set()
+    if ledger_path.exists():
+        for line in ledger_path.read_text().splitlines():
+            try:
+                local.add(_ledger_key(json.loads(line)))
+            except ValueError:
+                pass
+    added = 0
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if _ledger_key(entry) in local:
+            continue
+        if entry.get("file"):
+            # Point at wherever this machine's layout keeps the session
+            path = locate_session_file(project_dir, entry["file"], layout)
+            entry["file"] = path.relative_to(project_dir).as_posix()
+        local.add(_ledger_key(entry))
+        added += append_ledger_entry(ledger_path, entry)
+    return added
+
+def _safe_member_path(knowledge_dir, rel):
+    target = (knowledge_dir / rel).resolve()
+    if rel.startswith("/") or ".." in Path(rel).parts or knowledge_dir.resolve() not in target.parents:
+        raise ValueError(f"Security Alert: bundle path '{rel}' escapes the knowledge directory")
+    return knowledge_dir / rel
+
+def _bundle_members(tar, meta, knowledge_dir):
+    """
+    Checks, before anything is written, that every declared file stays inside
+    the knowledge dir and is present in the bundle as a regular file (links,
+    devices and directories have no data to extract).
+    """
+    if not isinstance(meta.get("files"), dict):
+        raise ValueError("Malformed sync bundle: 'sync.json' has no file list")
+    members = {m.name: m for m in tar.getmembers()}
+    missing = []
+    for rel in meta["files"]:
+        _safe_member_path(knowledge_dir, rel)
+        member = members.get(f"files/{rel}")
+        if member is None:
+            missing.append(rel)
+        elif not member.isfile():
+            raise ValueError(f"Security Alert: bundle entry '{rel}' is not a regular file")
+    if missing:
+        raise ValueError(f"Incomplete sync bundle: {len(missing)} declared file(s) missing, e.g. '{missing[0]}'")
+
+def sync_import(config, bundle, peer="default"):
+    """
+    Applies a bundle: new files are written, identical ones skipped, ledgers
+    merged by session. A file changed on both sides keeps the local copy and
+    stores the incoming one as '<name>.sync-conflict'. The bundle's acks
+    commit our own pending exports to `peer`.
+    """
+    knowledge_dir = Path(config["G_KNOWLEDGE_DIR"])
+    layout = session_layout(config)
+    local = knowledge_manifest(knowledge_dir)
+    baseline = _read_json(_peer_path(peer), {})
+    result = {"written": 0, "unchanged": 0, "merged_entries": 0, "conflicts": [], "acked": None}
+    with tarfile.open(bundle, "r:gz") as tar:
+        try:
+            member = tar.getmember("sync.json")
+            meta = json.loads(tar.extractfile(member).read()) if member.isfile() else None
+        except (KeyError, ValueError):
+            meta = None
+        if not isinstance(meta, dict):
+            raise ValueError(f"Not a sync bundle (no readable 'sync.json'): {bundle}")
+        if meta.get("version") != SYNC_VERSION:
+            raise ValueError(f"Unsupported sync bundle version: {meta.get('version')}")
+        _bundle_members(tar, meta, knowledge_dir)
+        ledgers = []
+        for rel, info in meta["files"].items():
+            if any(_sync_skipped(part) for part in Path(rel).parts):
+                continue  # e.g. a conflict copy from a peer that still exported them
+            data = tar.extractfile(f"files/{rel}").read()
+            target = _safe_member_path(knowledge_dir, rel)
+            parts = Path(rel).parts
+            if Path(rel).name in SYNC_LEDGERS:
+                ledgers.append((target, data))
+                continue
+            if parts[0] == "sessions" and len(parts) in (4, 6) and parts[1] != "archive" \
+                    and parts[-1].startswith("session_"):
+                project_dir = knowledge_dir.joinpath(*parts[:3])
+                target = locate_session_file(project_dir, parts[-1], layout)
+                rel = target.relative_to(knowledge_dir).as_posix()
+            mine = local.get(rel)
+            if mine and mine["sha256"] == info["sha256"]:
+                result["unchanged"] += 1
+            elif mine and (baseline.get(rel) or {}).get("sha256") != mine["sha256"]:
+                target = target.with_name(target.name + ".sync-conflict")
+                result["conflicts"].append(rel)
+                atomic_write_text(target, data)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(target, data)
+                result["written"] += 1
+            baseline[rel] = {"sha256": info["sha256"], "size": info["size"]}
+        # Ledgers last, so every entry they add already has its session file
+        for target, data in ledgers:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            result["merged_entries"] += merge_ledger(target, data.decode(errors="replace").splitlines(),
+                                                     target.parent, layout)
+    _write_peer_file(peer, baseline)
+    if meta.get("id"):
+        acks = [i for i in _read_json(_peer_path(peer, "acks"), []) if i != meta["id"]]
+        _write_peer_file(peer, (acks + [meta["id"]])[-SYNC_PENDING_KEEP:], "acks")
+    pending = _read_json(_peer_path(peer, "pending"), {})
+    acked = [i for i in meta.get("acks", []) if i in pending]
+    if acked:
+        result["acked"] = sync_ack(peer, max(acked, key=lambda i: pending[i]["created"]))
+    return result
+
+# --- Memory Ledger ---
+def read_ledger_tail(ledger_path, max_bytes=65536):
+    """Returns the last lines of a ledger without reading the whole file."""
+    with open(ledger_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        data = f.read()
+    lines = data.decode(errors="replace").splitlines()
+    return lines[1:] if size > max_bytes else lines
+
+def read_ledger(ledger_path):
+    """All ledger entries, oldest first; malformed lines (e.g. a torn write) are skipped."""
+    entries = []
+    if Path(ledger_path).exists():
+        with open(ledger_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict):
+                    entries.append(entry)
+    return entries
+
+def append_ledger_entry(ledger_path, entry):
+    """
+    Appends an entry to history.jsonl unless the same session file was already
+    recorded (safe to retry). Concurrent writers are serialized with an advisory
+    lock, and each entry lands with a single O_APPEND write so lines never interleave.
+    """
+    line = (json.dumps(entry) + "\n").encode()
+    while True:
+        fd = os.open(ledger_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            current = os.stat(ledger_path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(fd).st_ino:
+            break
+        os.close(fd)  # rewritten (rewrite_ledger) while we waited: append to the new file
+    try:
+        size = os.fstat(fd).st_size
+        tail_start = max(0, size - 65536)
+        tail = os.pread(fd, size - tail_start, tail_start).decode(errors="replace").splitlines()
+        for existing in tail[1:] if tail_start else tail:
+            try:
+                if json.loads(existing).get("file") == entry.get("file"):
+                    return False
+            except ValueError:
+                pass
+        # A writer that died mid-line must not swallow our entry
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            line = b"\n" + line
+        os.write(fd, line)
+        return True
+    finally:
+        os.close(fd)
+
+def atomic_write_text(path, content):
+    """Writes (text or bytes) via a temp file in the same directory and renames it into place."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists(): tmp.unlink()
+
+# --- Recap Relevance ---
+# Each ledger entry gets a sparse term vector, stored at save time in a
+# sidecar (history.terms.jsonl). At launch the recap ranks recent entries
+# against cheap local signals instead of blindly taking the last few.
+RECAP_STOPWORDS = frozenset(
+    "the a an and or of to in on for with by is are was were be it this that from at as into via not no "
+    "md py json txt session general legacy".split())
+RECAP_SKIP_DIRS = frozenset(["node_modules", "__pycache__", "venv", "dist", "build", "target"])
+RECAP_CANDIDATES = 500
+RECAP_BUDGET_S = 0.05
+RECAP_HALF_LIFE_DAYS = 14.0
+RECAP_RECENT_FILE_AGE = 2 * 86400
+
+def tokenize_terms(text):
+    return [t for t in re.split(r"[^a-z0-9]+", str(text).lower())
+            if len(t) > 1 and not t.isdigit() and t not in RECAP_STOPWORDS]
+
+def term_vector(entry):
+    """L2-normalized term weights from the entry topic (and, at half weight, the files it touched)."""
+    weights = {}
+    for term in tokenize_terms(entry.get("topic", "")):
+        weights[term] = weights.get(term, 0.0) + 1.0
+    for path in entry.get("paths", []):
+        for term in tokenize_terms(path):
+            weights[term] = weights.get(term, 0.0) + 0.5
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {term: round(w / norm, 4) for term, w in weights.items()}
+
+# Near-duplicate detection: MinHash signatures over word + character-trigram
+# shingles of the topic's goal (the text before "->"; outcomes like "done" or
+# "fixed" say little about the theme), stored with each ledger entry at save
+# time. LSH banding keeps clustering roughly linear in the number of entries.
+# Topics whose numbered tokens differ ("report 3" vs "report 4", "#12" vs
+# "#13") name different things and are never merged.
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 32
+MINHASH_THRESHOLD = 0.6
+MINHASH_STOPWORDS = frozenset("the a an and or of to in on for with by is are was were be it this that from at as into via not no".split())
+MINHASH_RECAP_WINDOW = 8  # recap clusters only the best limit * window candidates
+_MINHASH_ROW = struct.Struct(">16I")
+
+def _stem(word):
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+def _topic_words(text):
+    goal = str(text).split("->")[0]
+    return [_stem(w) for w in re.split(r"[^a-z0-9]+", goal.lower()) if w and w not in MINHASH_STOPWORDS]
+
+def topic_markers(text):
+    """The goal's tokens containing digits (issue numbers, versions, ids)."""
+    return frozenset(w for w in _topic_words(text) if any(c.isdigit() for c in w))
+
+def topic_shingles(text):
+    words = _topic_words(text)
+    joined = " ".join(words)
+    return set(words) | {joined[i:i + 3] for i in range(len(joined) - 2)}
+
+def minhash_signature(text):
+    """
+    Hex-encoded b-bit MinHash of the topic's shingles: the 64 hash functions
+    are the 32-bit words of four keyed blake2b digests, and only the low 16
+    bits of each minimum are kept.
+    """
+    rows = []
+    for shingle in topic_shingles(text):
+        data = shingle.encode()
+        row = ()
+        for seed in (b"gemonade-mh-0", b"gemonade-mh-1", b"gemonade-mh-2", b"gemonade-mh-3"):
+            row += _MINHASH_ROW.unpack(hashlib.blake2b(data, digest_size=64, person=seed).digest())
+        rows.append(row)
+    if not rows:
+        return ""
+    return "".join(f"{value & 0xFFFF:04x}" for value in map(min, zip(*rows)))
+
+def entry_signature(entry):
+    """The stored signature, or one computed from the topic for older entries."""
+    sig = entry.get("minhash")
+    if not sig or len(sig) != MINHASH_PERMUTATIONS * 4:
+        sig = minhash_signature(entry.get("topic", ""))
+    return sig
+
+def _signature_values(sig):
+    return struct.unpack(f">{MINHASH_PERMUTATIONS}H", bytes.fromhex(sig)) if sig else ()
+
+def minhash_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: the fraction of matching permutations."""
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(map(operator.eq, _signature_values(sig_a), _signature_values(sig_b))) / MINHASH_PERMUTATIONS
+
+def cluster_entries(entries, threshold=MINHASH_THRESHOLD):
+    """
+    Groups near-duplicate entries. Walking newest first, each entry joins the
+    most similar existing cluster leader (found through LSH band buckets) if
+    the estimated similarity reaches threshold and both name the same numbered
+    tokens (topic_markers), otherwise it leads a new cluster. Comparing against leaders only avoids single-linkage chaining.
+    Returns lists of indices into `entries`, each ascending (leader last).
+    """
+    width = 4 * MINHASH_PERMUTATIONS // MINHASH_BANDS
+    buckets = [{} for _ in range(MINHASH_BANDS)]
+    clusters = {}
+    for idx in range(len(entries) - 1, -1, -1):
+        sig = entry_signature(entries[idx])
+        keys = [sig[band * width:(band + 1) * width] for band in range(MINHASH_BANDS)] if sig else []
+        values = _signature_values(sig)
+        markers = topic_markers(entries[idx].get("topic", ""))
+        candidates = {leader for band, key in enumerate(keys) for leader in buckets[band].get(key, ())}
+        best, best_matches = None, threshold * MINHASH_PERMUTATIONS
+        for leader in candidates:
+            if clusters[leader][2] != markers:
+                continue
+            matches = sum(map(operator.eq, values, clusters[leader][0]))
+            if matches >= best_matches:
+                best, best_matches = leader, matches
+        if best is None:
+            clusters[idx] = (values, [idx], markers)
+            for band, key in enumerate(keys):
+                buckets[band].setdefault(key, []).append(idx)
+        else:
+            clusters[best][1].append(idx)
+    return [sorted(members) for _, members, _ in clusters.values()]
+
+def collapse_entries(entries, order, limit=None):
+    """
+    Keeps one entry per near-duplicate cluster: the newest member, annotated
+    with "similar" (how many others it stands for). `order` lists indices by
+    preference and clusters are returned in that order. With `limit`, only the
+    first limit * MINHASH_RECAP_WINDOW preferred entries are clustered, which
+    bounds the cost on the launch path.
+    """
+    window = order[:limit * MINHASH_RECAP_WINDOW] if limit else order
+    chronological = sorted(window)
+    members_of = {}
+    for members in cluster_entries([entries[idx] for idx in chronological]):
+        group = [chronological[i] for i in members]
+        for idx in group:
+            members_of[idx] = group
+    picked, seen = [], set()
+    for idx in window:
+        members = members_of[idx]
+        if members[-1] in seen:
+            continue
+        seen.add(members[-1])
+        entry = dict(entries[members[-1]])
+        if len(members) > 1:
+            entry["similar"] = len(members) - 1
+        picked.append((members[-1], entry))
+        if limit and len(picked) == limit:
+            break
+    return picked
+
+def ledger_clusters(ledger_path):
+    """Groups a whole ledger into near-duplicate clusters, largest (then most recent) first."""
+    entries = read_ledger(ledger_path)
+    clusters = [{"size": len(members), "topic": entries[members[-1]].get("topic", ""),
+                 "latest": entries[members[-1]].get("display_date", ""), "newest": members[-1],
+                 "entries": [entries[idx] for idx in members]}
+                for members in cluster_entries(entries)]
+    clusters.sort(key=lambda c: (c["size"], c["newest"]), reverse=True)
+    for cluster in clusters:
+        del cluster["newest"]
+    return clusters
+
+def index_session_terms(session_dir, entry, config=None):
+    """Records the entry's term vector in the ledger sidecar (idempotent)."""
+    append_ledger_entry(Path(session_dir) / "history.terms.jsonl",
+                        {"file": entry.get("file"), "terms": term_vector(entry)})
+
+def _read_jsonl_tail(path, count):
+    entries = []
+    if path.exists():
+        for line in read_ledger_tail(path, max_bytes=count * 1024)[-count:]:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                pass
+    return entries
+
+def load_recap_candidates(ledger_path, limit=RECAP_CANDIDATES):
+    """Returns [(entry, vector)] for the newest ledger entries, oldest first."""
+    ledger_path = Path(ledger_path)
+    sidecar = ledger_path.with_name("history.terms.jsonl")
+
+    def compute():
+        vectors = {v.get("file"): v.get("terms", {}) for v in _read_jsonl_tail(sidecar, limit * 2)}
+        return [(entry, vectors.get(entry.get("file")) or term_vector(entry))
+                for entry in _read_jsonl_tail(ledger_path, limit)]
+
+    return warm(("recap_candidates", str(ledger_path), limit), [ledger_path, sidecar], compute)
+
+def find_repo_root(start):
+    start = Path(start).resolve()
+    for candidate in [start] + list(start.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+def collect_recap_signals(cwd, budget_s=RECAP_BUDGET_S):
+    """
+    Builds a query vector from the current branch name, the cwd subpath inside
+    the repo and recently modified files. Pure filesystem reads, bounded by budget_s.
+    """
+    deadline = time.monotonic() + budget_s
+    query = {}
+
+    def add(text, weight):
+        for term in tokenize_terms(text):
+            query[term] = query.get(term, 0.0) + weight
+
+    root = find_repo_root(cwd)
+    if not root:
+        return query
+    try:
+        branch, _ = read_git_head(resolve_git_dir(root))
+        if branch and not branch.startswith("refs/"):
+            add(branch, 1.0)
+    except OSError:
+        pass
+    rel = os.path.relpath(Path(cwd).resolve(), root)
+    if rel != ".":
+        add(rel, 1.0)
+
+    cutoff = time.time() - RECAP_RECENT_FILE_AGE
+    stack = [str(root)]
+    while stack and time.monotonic() < deadline:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for item in it:
+                    if item.name.startswith(".") or item.name in RECAP_SKIP_DIRS:
+                        continue
+                    if item.is_dir(follow_symlinks=False):
+                        stack.append(item.path)
+                    elif item.is_file(follow_symlinks=False) and item.stat().st_mtime >= cutoff:
+                        add(os.path.relpath(item.path, root), 0.5)
+        except OSError:
+            continue
+    return query
+
+def _entry_age_days(entry, now):
+    try:
+        return max(0.0, (now - datetime.strptime(entry.get("date", ""), "%Y%m%d_%H%M").timestamp()) / 86400)
+    except ValueError:
+        return None
+
+def select_recap_entries(ledger_path, limit=5, cwd=None, budget_s=RECAP_BUDGET_S):
+    """
+    Picks the top-k ledger entries by similarity to the local signals plus a
+    recency decay, returned in chronological order. Near-duplicate topics are
+    collapsed into their newest entry (with a "similar" count) so one theme
+    cannot take every slot. Falls back to the newest entries when there are no
+    signals or the time budget runs out.
+    """
+    started = time.monotonic()
+    candidates = load_recap_candidates(ledger_path)
+    entries = [entry for entry, _ in candidates]
+    newest_first = list(range(len(entries) - 1, -1, -1))
+
+    query = collect_recap_signals(cwd or os.getcwd(), budget_s * 0.6) if len(candidates) > limit else {}
+    if not query or time.monotonic() - started > budget_s:
+        order = newest_first
+    else:
+        qnorm = math.sqrt(sum(w * w for w in query.values()))
+        now = time.time()
+        count = len(candidates)
+        scored = []
+        for idx, (entry, vector) in enumerate(candidates):
+            similarity = sum(w * vector.get(term, 0.0) for term, w in query.items()) / qnorm
+            age = _entry_age_days(entry, now)
+            if age is None:
+                age = (count - 1 - idx) * 0.25
+            scored.append((similarity + 0.25 * 0.5 ** (age / RECAP_HALF_LIFE_DAYS), idx))
+        order = [idx for _, idx in sorted(scored, reverse=True)]
+
+    top = collapse_entries(entries, order, limit)
+    return [entry for _, entry in sorted(top, key=lambda item: item[0])]
+
+# --- Project Digest ---
+# A compact orientation block (layout, recent commits, changes since the last
+# session) cached per repo and keyed by HEAD + index mtime, so the model does
+# not spend its first tool calls rediscovering the project.
+DIGEST_MAX_ENTRIES = 30
+DIGEST_MAX_COMMITS = 8
+DIGEST_MAX_CHANGED = 25
+
+def resolve_git_dir(root):
+    git_path = Path(root) / ".git"
+    if git_path.is_file():
+        # Worktrees / submodules: ".git" is a pointer file
+        target = git_path.read_text().strip().split("gitdir:", 1)[-1].strip()
+        return (Path(root) / target).resolve()
+    return git_path
+
+def git_common_dir(git_dir):
+    """Where shared refs live: a worktree's git dir names the main one in 'commondir'."""
+    try:
+        return (git_dir / (git_dir / "commondir").read_text().strip()).resolve()
+    except OSError:
+        return git_dir
+
+def read_git_head(git_dir):
+    """Returns (branch or None, commit sha or None) without invoking git."""
+    head = (git_dir / "HEAD").read_text().strip()
+    if not head.startswith("ref: "):
+        return None, head
+    ref = head[5:]
+    branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+    common_dir = git_common_dir(git_dir)
+    for ref_file in dict.fromkeys([git_dir / ref, common_dir / ref]):
+        if ref_file.exists():
+            return branch, ref_file.read_text().strip()
+    packed = common_dir / "packed-refs"
+    if packed.exists():
+        for line in packed.read_text().splitlines():
+            if line.endswith(" " + ref):
+                return branch, line.split(" ", 1)[0]
+    return branch, None
+
+def read_git_index_paths(git_dir):
+    """Lists tracked paths straight from .git/index (versions 2 and 3). Returns None if unreadable."""
+    try:
+        data = (git_dir / "index").read_bytes()
+    except OSError:
+        return None
+    if data[:4] != b"DIRC":
+        return None
+    version, count = struct.unpack(">II", data[4:12])
+    if version not in (2, 3):
+        return None
+    paths, pos = [], 12
+    for _ in range(count):
+        flags = struct.unpack(">H", data[pos + 60:pos + 62])[0]
+        name_start = pos + 62 + (2 if version == 3 and flags & 0x4000 else 0)
+        name_end = data.index(b"\0", name_start)
+        paths.append(data[name_start:name_end].decode(errors="replace"))
+        pos += (name_end - pos + 8) & ~7
+    return paths
+
+def summarize_layout(paths):
+    """Top-level entries with tracked file counts."""
+    counts = {}
+    for path in paths:
+        top, sep, _ = path.partition("/")
+        key = top + "/" if sep else top
+        counts[key] = counts.get(key, 0) + 1
+    dirs = sorted((k, v) for k, v in counts.items() if k.endswith("/"))
+    files = sorted(k for k in counts if not k.endswith("/"))
+    lines = [f"{name} ({n} files)" for name, n in dirs] + files
+    if len(lines) > DIGEST_MAX_ENTRIES:
+        lines = lines[:DIGEST_MAX_ENTRIES] + [f"... {len(lines) - DIGEST_MAX_ENTRIES} more"]
+    return lines
+
+def _git_lines(root, args):
+    try:
+        out = subprocess.run(["git"] + args, cwd=root, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    return out.stdout.splitlines() if out.returncode == 0 else []
+
+def digest_cache_path(root):
+    return STATE_DIR / "digests" / f"{Path(root).name}-{hashlib.sha1(str(root).encode()).hexdigest()[:10]}.json"
+
+def build_project_digest(root):
+    """
+    Returns the digest dict for a repo, rebuilding only the parts whose inputs
+    moved: layout when the index changes, commits and changed files when HEAD
+    (or the last-session marker) changes.
+    """
+    root = Path(root)
+    git_dir = resolve_git_dir(root)
+    branch, head = read_git_head(git_dir)
+    try:
+        index_mtime = (git_dir / "index").stat().st_mtime_ns
+    except OSError:
+        index_mtime = 0
+
+    cache_file = digest_cache_path(root)
+    try:
+        cache = json.loads(cache_file.read_text())
+    except (OSError, ValueError):
+        cache = {}
+    last_session_head = cache.get("last_session_head")
+
+    changed = False
+    if cache.get("index_mtime") != index_mtime or "layout" not in cache:
+        paths = read_git_index_paths(git_dir)
+        if paths is None:
+            paths = _git_lines(root, ["ls-files"])
+        cache["layout"] = summarize_layout(paths)
+        cache["index_mtime"] = index_mtime
+        changed = True
+    if cache.get("head") != head or "commits" not in cache:
+        cache["commits"] = _git_lines(root, ["log", f"-{DIGEST_MAX_COMMITS}", "--format=%h %s"]) if head else []
+        cache["head"] = head
+        changed = True
+    if cache.get("changed_base") != [last_session_head, head]:
+        files = []
+        if last_session_head and head and last_session_head != head:
+            files = _git_lines(root, ["diff", "--name-only", f"{last_session_head}..{head}"])
+        cache["changed_files"] = files
+        cache["changed_base"] = [last_session_head, head]
+        changed = True
+    cache["branch"] = branch
+
+    if changed:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(cache_file, json.dumps(cache, indent=2))
+    return cache
+
+def mark_digest_session(root):
+    """Remembers HEAD at session start so the next digest can list what changed since."""
+    cache_file = digest_cache_path(root)
+    try:
+        cache = json.loads(cache_file.read_text())
+    except (OSError, ValueError):
+        return
+    cache["last_session_head"] = cache.get("head")
+    atomic_write_text(cache_file, json.dumps(cache, indent=2))
+
+def format_project_digest(project_ctx, digest):
+    head = (digest.get("head") or "")[:7] or "no commits"
+    out = f"\n# 🗺️ Project Digest: {project_ctx} @ {digest.get('branch') or 'detached'} ({head})\n"
+    out += "## Layout\n" + "".join(f"- {line}\n" for line in digest.get("layout", []))
+    if digest.get("commits"):
+        out += "## Recent Commits\n" + "".join(f"- {line}\n" for line in digest["commits"])
+    files = digest.get("changed_files", [])
+    if files:
+        shown = files[:DIGEST_MAX_CHANGED]
+        out += "## Changed Since Last Session\n" + "".join(f"- {f}\n" for f in shown)
+        if len(files) > len(shown):
+            out += f"- ... {len(files) - len(shown)} more\n"
+    return out + "\n"
+
+# --- Resume Packs ---
+# save_session.py writes session_<...>.resume.json next to each session
+# Markdown; 'gemonade resume' injects it instead of the model re-reading the log.
+RESUME_SUFFIX = ".resume.json"
+
+def resume_pack_path(session_md):
+    session_md = Path(session_md)
+    return session_md.with_name(session_md.stem + RESUME_SUFFIX)
+
+def find_resume_pack(config, ref="latest", persona=None, project=None):
+    """
+    Resolves a resume pack: 'latest' (optionally within persona/project), a
+    session file path, or a fragment of a session file name or id.
+    """
+    ref = ref or "latest"
+    if ref != "latest" and (ref.endswith(".md") or ref.endswith(RESUME_SUFFIX)) and Path(ref).exists():
+        path = Path(ref)
+        return path if path.name.endswith(RESUME_SUFFIX) else resume_pack_path(path)
+
+    sessions = Path(config["G_KNOWLEDGE_DIR"]) / "sessions"
+    candidates = []
+    for project_dir in sessions.glob(f"{persona or '*'}/{project or '*'}"):
+        if project_dir.parent.name != "archive":
+            candidates += iter_session_files(project_dir, f"session_*{RESUME_SUFFIX}")
+    if ref != "latest":
+        fragment = Path(ref).name.replace(RESUME_SUFFIX, "").replace(".md", "")
+        candidates = [p for p in candidates if fragment in p.name]
+        if len({p.name for p in candidates}) > 1:
+            names = ", ".join(sorted({p.name[:-len(RESUME_SUFFIX)] for p in candidates})[:5])
+            raise ValueError(f"Session '{ref}' is ambiguous: {names}")
+    if not candidates:
+        raise FileNotFoundError(f"No resume pack found for '{ref}'" + (f" in {persona}/{project}" if persona or project else "") + ".")
+    # Names start with session_YYYYMMDD_HHMMSS, so the newest sorts last
+    return max(candidates, key=lambda p: p.name)
+
+def format_resume_pack(pack):
+    out = f"\n# ⏯️ Resuming Session: {pack['session']}\n"
+    out += f"- **Goal:** {pack.get('goal') or 'unknown'}\n"
+    if pack.get("outcome"): out += f"- **Outcome:** {pack['outcome']}\n"
+    if pack.get("files"): out += f"- **Files touched:** {', '.join(pack['files'])}\n"
+    if pack.get("commands"):
+        out += "## Commands Run\n" + "".join(f"- `{cmd}`\n" for cmd in pack["commands"])
+    if pack.get("open_questions"):
+        out += "## Unresolved\n" + "".join(f"- {q}\n" for q in pack["open_questions"])
+    if pack.get("final_turn"):
+        out += "## Last Response\n" + pack["final_turn"] + "\n"
+    out += "Continue from here; the full transcript is only needed for details not listed above.\n\n"
+    return out
+
+# --- Tool Workers ---
+# Gems can opt in with "tool_worker": {"preload": ["pandas", ...]} in gem.json.
+# A warm interpreter per gem forks each Python tool call (tools/tool_worker.py);
+# shims placed first on PATH route the model's tool invocations to it.
+TOOL_WORKER_SCRIPT = GEMONADE_HOME / "tools" / "tool_worker.py"
+
+def _is_python_tool(path):
+    if path.name.startswith((".", "_")) or not path.is_file():
+        return False
+    if path.suffix == ".py":
+        return True
+    try:
+        with open(path, "rb") as f:
+            return b"python" in f.readline()
+    except OSError:
+        return False
+
+def tool_worker_spec(gem_home):
+    """Returns the worker settings for a gem, or None if it has not opted in."""
+    gem_home = Path(gem_home)
+    try:
+        data = json.loads((gem_home / "gem.json").read_text())
+    except (OSError, ValueError):
+        return None
+    settings = data.get("tool_worker")
+    if not settings or not (gem_home / "tools").is_dir():
+        return None
+    settings = settings if isinstance(settings, dict) else {}
+    venv_python = gem_home / ".venv" / "bin" / "python"
+    return {
+        "gem_home": str(gem_home),
+        "python": str(venv_python) if venv_python.exists() else sys.executable,
+        "preload": [str(m) for m in settings.get("preload", [])],
+        "tools": sorted(str(p) for p in (gem_home / "tools").iterdir() if _is_python_tool(p)),
+    }
+
+def start_tool_worker(spec, persona):
+    """Launches the gem's worker and writes one shim per tool. Returns a handle for stop_tool_worker."""
+    work_dir = STATE_DIR / "workers" / f"{persona}_{os.getpid()}"
+    bin_dir = work_dir / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    sock_path = work_dir / "w.sock"
+
+    cmd = [spec["python"], str(TOOL_WORKER_SCRIPT), str(sock_path)]
+    for module in spec["preload"]:
+        cmd += ["--preload", module]
+    with open(work_dir / "worker.log", "w") as log:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+
+    for tool in spec["tools"]:
+        shim = bin_dir / Path(tool).name
+        shim.write_text(
+            f"#!{sys.executable} -S\n"
+            "import sys\n"
+            f"sys.path.insert(0, {str(TOOL_WORKER_SCRIPT.parent)!r})\n"
+            "from tool_worker import call\n"
+            f"sys.exit(call({str(sock_path)!r}, {tool!r}, sys.argv[1:], {spec['python']!r}))\n"
+        )
+        shim.chmod(0o755)
+    log_debug(f"Tool worker for '{persona}' (pid {proc.pid}) serving {len(spec['tools'])} tools")
+    return {"proc": proc, "dir": work_dir, "bin": bin_dir, "socket": sock_path}
+
+def stop_tool_worker(worker):
+    proc = worker["proc"]
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    shutil.rmtree(worker["dir"], ignore_errors=True)
+
+# --- Tool Result Cache ---
+# Tools described in a gem's mcp.json can opt into memoization:
+#   "cache": {"ttl": 3600, "inputs": ["src/**/*.py", "{target}"]}
+# 'gemonade tool run' keys results by the working directory, the expanded
+# command, the referenced env values and the content hashes of the input files
+# (and of the gem files the command references), so edits invalidate entries
+# automatically. A declared input that does not exist yet is keyed as missing.
+TOOL_PARAM = re.compile(r"\{(\w+)\}")
+TOOL_HASH_MEMO_MAX = 4096  # hashes.json entries kept per gem (least recently used dropped)
+
+def tool_cache_dir():
+    return STATE_DIR / "tool_cache"
+
+def load_gem_tools(gem_home):
+    """Returns {tool name: tool definition} for the runnable tools (name + executable) in the gem's mcp.json."""
+    try:
+        data = json.loads((Path(gem_home) / "mcp.json").read_text())
+    except (OSError, ValueError):
+        return {}
+    tools = data.get("tools") if isinstance(data, dict) else None
+    if not isinstance(tools, list):
+        return {}
+    return {tool["name"]: tool for tool in tools
+            if isinstance(tool, dict) and tool.get("name") and tool.get("executable")}
+
+def _fill_params(text, params):
+    def replace(match):
+        if match.group(1) not in params:
+            raise ValueError(f"Missing tool argument '{match.group(1)}'.")
+        return str(params[match.group(1)])
+    return TOOL_PARAM.sub(replace, text)
+
+def expand_tool_command(tool, params, gem_home):
+    """Builds argv; relative arguments naming files inside the gem are made absolute."""
+    for name in tool.get("inputSchema", {}).get("required", []):
+        if name not in params:
+            raise ValueError(f"Missing tool argument '{name}'.")
+    argv = [tool["executable"]]
+    for arg in tool.get("arguments", []):
+        value = _fill_params(arg, params)
+        if not os.path.isabs(value) and (Path(gem_home) / value).is_file():
+            value = str(Path(gem_home) / value)
+        argv.append(value)
+    return argv
+
+def tool_input_files(tool, params, cwd):
+    """Files the tool's cache depends on; literal inputs are listed even when missing."""
+    files = set()
+    for pattern in tool.get("cache", {}).get("inputs", []):
+        pattern = os.path.join(cwd, _fill_params(pattern, params))
+        if not glob.has_magic(pattern) and not os.path.exists(pattern):
+            files.add(pattern)
+            continue
+        for match in glob.glob(pattern, recursive=True):
+            if os.path.isdir(match):
+                for root, _, names in os.walk(match):
+                    files.update(os.path.join(root, n) for n in names)
+            elif os.path.isfile(match):
+                files.add(match)
+    return sorted(files)
+
+def _hash_files(paths, memo):
+    """
+    Content hashes, reusing memo entries whose size/mtime are unchanged. A path
+    that cannot be read hashes as "missing", so creating it later changes the key.
+    """
+    hashes, now = [], time.time()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            memo.pop(path, None)
+            hashes.append((path, "missing"))
+            continue
+        stamp = [st.st_size, st.st_mtime_ns]
+        cached = memo.get(path)
+        if not cached or cached[0] != stamp:
+            digest = hashlib.sha256()
+            try:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+            except OSError:
+                hashes.append((path, "missing"))
+                continue
+            cached = [stamp, digest.hexdigest()]
+        memo[path] = [cached[0], cached[1], now]
+        hashes.append((path, cached[1]))
+    return hashes
+
+def _prune_hash_memo(memo, limit=TOOL_HASH_MEMO_MAX):
+    """Keeps the `limit` most recently used memo entries."""
+    if len(memo) <= limit:
+        return memo
+    recent = sorted(memo, key=lambda path: memo[path][2] if len(memo[path]) > 2 else 0, reverse=True)[:limit]
+    return {path: memo[path] for path in recent}
+
+def tool_cache_key(gem, tool, argv, env, input_hashes, cwd):
+    key = hashlib.sha256()
+    key.update(json.dumps([gem, tool["name"], os.path.realpath(cwd), argv, sorted(env.items()),
+                           input_hashes]).encode())
+    return key.hexdigest()
+
+def _record_tool_stat(gem_dir, event):
+    gem_dir.mkdir(parents=True, exist_ok=True)
+    fd = os.open(gem_dir / "stats.jsonl", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (json.dumps(event) + "\n").encode())
+    finally:
+        os.close(fd)
+
+def evict_tool_cache(limit_bytes):
+    """Drops least-recently-used results until the cache fits in limit_bytes."""
+    entries = []
+    for path in tool_cache_dir().glob("*/results/*.json"):
+        try:
+            st = path.stat()
+            entries.append((st.st_mtime, st.st_size, path))
+        except OSError:
+            pass
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+    return total
+
+def run_gem_tool(gem, tool_name, params, config, cwd=None, use_cache=True):
+    """
+    Runs a gem tool from mcp.json, replaying a memoized result when the tool is
+    cacheable and nothing it depends on changed. Returns returncode, stdout,
+    stderr, cached and duration_s.
+    """
+    gem_home = Path(resolve_persona(gem, config)["path"])
+    tool = load_gem_tools(gem_home).get(tool_name)
+    if not tool:
+        raise FileNotFoundError(f"Tool '{tool_name}' is not declared in {gem}/mcp.json.")
+    cwd = cwd or os.getcwd()
+    argv = expand_tool_command(tool, params, gem_home)
+    env = {k: os.path.expandvars(v) for k, v in tool.get("env", {}).items()}
+    settings = tool.get("cache")
+    gem_dir = tool_cache_dir() / gem
+
+    key = result_file = None
+    if settings and use_cache:
+        memo_file = gem_dir / "hashes.json"
+        try:
+            memo = json.loads(memo_file.read_text())
+        except (OSError, ValueError):
+            memo = {}
+        gem_files = [a for a in argv[1:] if a.startswith(str(gem_home) + os.sep)]
+        input_hashes = _hash_files(gem_files + tool_input_files(tool, params, cwd), memo)
+        env_digest = {k: hashlib.sha256(v.encode()).hexdigest() for k, v in env.items()}
+        key = tool_cache_key(gem, tool, argv, env_digest, input_hashes, cwd)
+        result_file = gem_dir / "results" / f"{key}.json"
+        gem_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(memo_file, json.dumps(_prune_hash_memo(memo)))
+
+        try:
+            cached = json.loads(result_file.read_text())
+        except (OSError, ValueError):
+            cached = None
+        if cached and time.time() - cached["created"] <= float(settings.get("ttl", 3600)):
+            os.utime(result_file)  # LRU
+            _record_tool_stat(gem_dir, {"ts": time.time(), "tool": tool_name, "cache": "hit",
+                                        "saved_s": cached["duration_s"]})
+            return dict(cached, cached=True)
+
+    start = time.perf_counter()
+    with timed(f"tool:{gem}/{tool_name}"):
+        proc = subprocess.run(argv, cwd=cwd, env=dict(os.environ, **env), capture_output=True,
+                              text=True, errors="replace")
+    result = {"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr,
+              "duration_s": round(time.perf_counter() - start, 4), "created": time.time(), "cached": False}
+
+    if result_file:
+        _record_tool_stat(gem_dir, {"ts": time.time(), "tool": tool_name, "cache": "miss",
+                                    "duration_s": result["duration_s"]})
+        if proc.returncode == 0:
+            result_file.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(result_file, json.dumps(result))
+            evict_tool_cache(float(config.get("GEMONADE_TOOL_CACHE_MB", 200)) * 1024 * 1024)
+    return result
+
+def tool_cache_report(gem=None):
+    """Hit/miss counts and time saved per gem and tool."""
+    rows = {}
+    for stats_file in sorted(tool_cache_dir().glob("*/stats.jsonl")):
+        gem_name = stats_file.parent.name
+        if gem and gem_name != gem:
+            continue
+        for line in stats_file.read_text().splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            row = rows.setdefault((gem_name, event["tool"]), {"gem": gem_name, "tool": event["tool"],
+                                                              "hits": 0, "misses": 0, "saved_s": 0.0})
+            if event["cache"] == "hit":
+                row["hits"] += 1
+                row["saved_s"] += event.get("saved_s", 0)
+            else:
+                row["misses"] += 1
+    for row in rows.values():
+        row["hit_rate"] = row["hits"] / (row["hits"] + row["misses"])
+        row["saved_s"] = round(row["saved_s"], 2)
+    return sorted(rows.values(), key=lambda r: (r["gem"], r["tool"]))
+
+def gem_tools_prompt(gem, gem_home):
+    """Prompt block telling the model how to call the gem's declared tools."""
+    tools = load_gem_tools(gem_home)
+    if not tools:
+        return ""
+    out = "\n# 🧰 Gem Tools\nRun these through the Gemonade runner (results of cached tools are reused while their inputs are unchanged):\n"
+    for name, tool in sorted(tools.items()):
+        cmd = " ".join([f"gemonade tool run {gem} {name}"] +
+                       [f"{p}=<{p}>" for p in tool.get("inputSchema", {}).get("properties", {})])
+        cached = f" (cached {tool['cache'].get('ttl', 3600)}s)" if tool.get("cache") else ""
+        out += f"- `{cmd}`: {tool.get('description', '')}{cached}\n"
+    return out + "\n"
+
+# --- Tool Call Analytics ---
+# save_session.py reduces each session's tool calls to a compact record
+# (session_<...>.tools.json) and folds it into STATE_DIR/tool_stats.json.
+# Re-saving a session replaces its earlier contribution.
+TOOL_STATS_SUFFIX = ".tools.json"
+TOOL_STAT_FIELDS = ("calls", "errors", "redundant", "timed", "total_ms", "result_bytes")
+
+def tool_stats_path(session_md):
+    session_md = Path(session_md)
+    return session_md.with_name(session_md.stem + TOOL_STATS_SUFFIX)
+
+def tool_rollup_path():
+    return STATE_DIR / "tool_stats.json"
+
+def duration_bucket(ms):
+    """Log2 histogram bucket: bucket b holds durations up to 2**b ms."""
+    return 0 if ms < 1 else int(math.log2(ms)) + 1
+
+def read_tool_rollup():
+    try:
+        return json.loads(tool_rollup_path().read_text())
+    except (OSError, ValueError):
+        return {"sessions": 0, "tools": {}}
+
+def _fold_tool_record(tools, record, sign):
+    for key, stat in record.get("tools", {}).items():
+        agg = tools.setdefault(key, {f: 0 for f in TOOL_STAT_FIELDS} | {"sessions": 0, "max_ms": 0, "buckets": {}})
+        for field in TOOL_STAT_FIELDS:
+            agg[field] += sign * stat.get(field, 0)
+        agg["sessions"] += sign
+        for bucket, n in stat.get("buckets", {}).items():
+            agg["buckets"][bucket] = agg["buckets"].get(bucket, 0) + sign * n
+        if sign > 0:
+            agg["max_ms"] = max(agg["max_ms"], stat.get("max_ms", 0))
+        if agg["sessions"] <= 0:
+            del tools[key]
+
+@contextmanager
+def tool_stats_lock():
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(STATE_DIR / "tool_stats.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+def _apply_tool_rollup(record, previous):
+    rollup = read_tool_rollup()
+    if previous:
+        _fold_tool_record(rollup["tools"], previous, -1)
+        rollup["sessions"] -= 1
+    _fold_tool_record(rollup["tools"], record, 1)
+    rollup["sessions"] += 1
+    rollup["updated"] = time.time()
+    atomic_write_text(tool_rollup_path(), json.dumps(rollup))
+    return rollup
+
+def update_tool_rollup(record, previous=None):
+    """Adds one session record to the rollup (removing `previous`, its earlier version)."""
+    with tool_stats_lock():
+        return _apply_tool_rollup(record, previous)
+
+def store_tool_stats(path, record):
+    """
+    Writes a session's stats record and swaps it into the rollup. Reading the
+    earlier record, writing the new one and updating the rollup share one lock,
+    so concurrent saves of a session cannot count it twice. Returns False when
+    there was nothing to record.
+    """
+    with tool_stats_lock():
+        try:
+            previous = json.loads(Path(path).read_text())
+        except (OSError, ValueError):
+            previous = None
+        if not record["tools"] and not previous:
+            return False
+        atomic_write_text(path, json.dumps(record))
+        _apply_tool_rollup(record, previous)
+    return True
+
+def _bucket_percentile(buckets, pct):
+    total = sum(buckets.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(buckets, key=int):
+        seen += buckets[bucket]
+        if seen * 100 >= total * pct:
+            return float(2 ** int(bucket)) if int(bucket) else 1.0
+    return None
+
+def tool_stats_report(gem=None, sort="time"):
+    """Rows per (gem, tool): calls, error rate, redundancy, mean/p95 (upper bound)/max ms, result size."""
+    rows = []
+    for key, agg in read_tool_rollup()["tools"].items():
+        gem_name, tool = key.split("\t", 1)
+        if gem and gem_name != gem:
+            continue
+        calls = agg["calls"] or 1
+        rows.append({"gem": gem_name, "tool": tool, "calls": agg["calls"], "sessions": agg["sessions"],
+                     "error_rate": agg["errors"] / calls, "redundant": agg["redundant"],
+                     "mean_ms": agg["total_ms"] / agg["timed"] if agg["timed"] else None,
+                     "p95_ms": _bucket_percentile(agg["buckets"], 95), "max_ms": agg["max_ms"],
+                     "total_ms": agg["total_ms"], "avg_result_bytes": agg["result_bytes"] / calls})
+    keys = {"time": "total_ms", "calls": "calls", "errors": "error_rate", "redundant": "redundant"}
+    return sorted(rows, key=lambda r: (-(r[keys[sort]] or 0), r["gem"], r["tool"]))
+
+# --- Blueprint Index ---
+# Gems keep reference docs in blueprints/. Instead of pasting them into the
+# prompt, an index of their sections (byte offsets + hashes) is kept in
+# STATE_DIR/blueprints.json: the prompt lists section ids and
+# tools/blueprint.py serves one section at a time.
+BLUEPRINT_INDEX_VERSION = 1
+BLUEPRINT_EXTS = (".md", ".txt")
+BLUEPRINT_TOC_LIMIT = 40
+BLUEPRINT_REF = re.compile(r"\{\{BLUEPRINT:\s*([^}]+?)\s*\}\}")
+
+def blueprint_index_path():
+    return STATE_DIR / "blueprints.json"
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "section"
+
+def _blueprint_files(gem_home):
+    folder = Path(gem_home) / "blueprints"
+    if not folder.is_dir():
+        return []
+    return sorted(p for p in folder.rglob("*") if p.suffix in BLUEPRINT_EXTS and p.is_file())
+
+def _blueprint_fingerprint(gem_home):
+    h = hashlib.sha1()
+    for path in _blueprint_files(gem_home):
+        st = path.stat()
+        h.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+def split_blueprint(data):
+    """(level, title, offset, length) per Markdown heading block of `data` (bytes); fences are respected."""
+    blocks, offset, in_fence = [], 0, False
+    for line in data.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith(b"```"):
+            in_fence = not in_fence
+        elif not in_fence and stripped.startswith(b"#"):
+            level = len(stripped) - len(stripped.lstrip(b"#"))
+            title = stripped[level:].strip().decode("utf-8", "replace")
+            if level <= 6 and title:
+                blocks.append([level, title, offset])
+        offset += len(line)
+    if not blocks or data[:blocks[0][2]].strip():
+        blocks.insert(0, [0, "Introduction", 0])
+    return [(level, title, start, (blocks[i + 1][2] if i + 1 < len(blocks) else len(data)) - start)
+            for i, (level, title, start) in enumerate(blocks)]
+
+def index_gem_blueprints(gem, gem_home):
+    """Index entry for one gem: every blueprint file with its sections."""
+    files = []
+    for path in _blueprint_files(gem_home):
+        data = path.read_bytes()
+        doc = path.relative_to(Path(gem_home) / "blueprints").with_suffix("").as_posix()
+        sections, used = [], set()
+        for level, title, offset, length in split_blueprint(data):
+            slug = base = _slug(title)
+            n = 2
+            while slug in used:
+                slug, n = f"{base}-{n}", n + 1
+            used.add(slug)
+            chunk = data[offset:offset + length]
+            sections.append({"id": f"{gem}/{doc}#{slug}", "title": title, "level": level, "offset": offset,
+                             "length": length, "sha256": hashlib.sha256(chunk).hexdigest(),
+                             "refs": BLUEPRINT_REF.findall(chunk.decode("utf-8", "replace"))})
+        title = next((s["title"] for s in sections if s["level"] == 1), doc)
+        files.append({"doc": f"{gem}/{doc}", "path": str(path), "title": title, "sections": sections})
+    return {"home": str(gem_home), "fingerprint": _blueprint_fingerprint(gem_home), "files": files}
+
+def _blueprint_gem_dirs(config):
+    """Gem homes by name, resolved with the same priority as personas."""
+    root = Path(config["G_PACKAGE_ROOT"])
+    gems = {}
+    for folder in [root / "local", root / "installed"] + team_package_dirs(config) + [root / "core"]:
+        if folder.is_dir():
+            for gem_home in sorted(p for p in folder.iterdir() if (p / "blueprints").is_dir()):
+                gems.setdefault(gem_home.name, gem_home)
+    return gems
+
+def read_blueprint_index():
+    try:
+        index = json.loads(blueprint_index_path().read_text())
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == BLUEPRINT_INDEX_VERSION else None
+
+def _write_blueprint_index(index):
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(blueprint_index_path(), json.dumps(index))
+
+def build_blueprint_index(config):
+    """Re-indexes gems whose blueprints changed (run at install/update/uninstall)."""
+    with timed("blueprint_index"):
+        old_index = read_blueprint_index() or {}
+        previous = old_index.get("gems", {})
+        gems = {}
+        for name, gem_home in _blueprint_gem_dirs(config).items():
+            old = previous.get(name)
+            if old and old["home"] == str(gem_home) and old["fingerprint"] == _blueprint_fingerprint(gem_home):
+                gems[name] = old
+            else:
+                gems[name] = index_gem_blueprints(name, gem_home)
+        # Resolved references stay valid only while no gem changed
+        refs = old_index.get("refs", {}) if gems == previous else {}
+        index = {"version": BLUEPRINT_INDEX_VERSION, "gems": gems, "refs": refs}
+        _write_blueprint_index(index)
+    return index
+
+def reindex_blueprints(config):
+    """Lifecycle hook: a broken blueprint must not fail an install."""
+    try:
+        build_blueprint_index(config)
+    except Exception as e:
+        print_err(f"Blueprint index not updated: {e}")
+
+def refresh_gem_blueprints(gem, gem_home, config):
+    """Index for a launch: only re-indexes `gem` itself if its blueprints were edited."""
+    index = read_blueprint_index()
+    has_blueprints = (Path(gem_home) / "blueprints").is_dir()
+    entry = index["gems"].get(gem) if index else None
+    if not entry and not has_blueprints:
+        return index
+    if index is None:
+        return build_blueprint_index(config)
+    if entry and entry["home"] == str(gem_home) and entry["fingerprint"] == _blueprint_fingerprint(gem_home):
+        return index
+    if has_blueprints:
+        index["gems"][gem] = index_gem_blueprints(gem, gem_home)
+    else:
+        index["gems"].pop(gem, None)
+    index["refs"] = {}
+    _write_blueprint_index(index)
+    return index
+
+def _all_sections(index):
+    for gem in index["gems"].values():
+        for doc in gem["files"]:
+            for section in doc["sections"]:
+                yield doc, section
+
+def resolve_blueprint_ref(index, ref, from_gem=None):
+    """
+    Resolves a section id or a short reference ('doc#section' within from_gem,
+    'gem/doc' for a whole document's first section, or a bare '#section'
+    searched across all gems). Results are memoized in the index.
+    """
+    key = f"{from_gem or ''}:{ref}"
+    if key in index.setdefault("refs", {}):
+        return index["refs"][key]
+    doc_part, _, slug = ref.strip().partition("#")
+    candidates = []
+    if doc_part and from_gem and "/" not in doc_part:
+        candidates.append(f"{from_gem}/{doc_part}")
+    if doc_part:
+        candidates.append(doc_part)
+    resolved = None
+    for doc, section in _all_sections(index):
+        if candidates and doc["doc"] not in candidates:
+            continue
+        if (slug and section["id"].endswith("#" + _slug(slug))) or (not slug and section is doc["sections"][0]):
+            # A match in the referencing gem wins over other gems
+            if resolved is None or section["id"].startswith(f"{from_gem}/"):
+                resolved = section["id"]
+    index["refs"][key] = resolved
+    return resolved
+
+def read_blueprint_section(index, section_id, config=None):
+    """
+    Returns (section entry, text, index). Re-indexes the gem if the file changed
+    since indexing; the returned index is then the refreshed one.
+    """
+    gem = section_id.split("/", 1)[0]
+    for attempt in range(2):
+        for doc, section in _all_sections(index):
+            if section["id"] == section_id:
+                with open(doc["path"], "rb") as f:
+                    f.seek(section["offset"])
+                    chunk = f.read(section["length"])
+                if hashlib.sha256(chunk).hexdigest() == section["sha256"]:
+                    return section, chunk.decode("utf-8", "replace"), index
+                break
+        if attempt or gem not in index["gems"]:
+            break
+        index = refresh_gem_blueprints(gem, Path(index["gems"][gem]["home"]), config or load_config())
+    raise KeyError(f"Unknown blueprint section '{section_id}'.")
+
+def blueprints_prompt(gem, gem_home, config):
+    """Compact table of contents for the gem's blueprints (ids, titles, sizes)."""
+    try:
+        entry = (refresh_gem_blueprints(gem, gem_home, config) or {"gems": {}})["gems"].get(gem)
+    except OSError as e:
+        log_debug(f"Blueprint index unavailable: {e}")
+        return ""
+    if not entry or not entry["files"]:
+        return ""
+    out = "\n# 📐 Blueprints\nReference docs are not inlined. Read a section with `blueprint.py <id>` (several ids allowed):\n"
+    shown = 0
+    for doc in entry["files"]:
+        out += f"- {doc['title']} (`{doc['doc']}`)\n"
+        for section in doc["sections"]:
+            if section["level"] > 2:
+                continue
+            if shown == BLUEPRINT_TOC_LIMIT:
+                break
+            out += f"  - `{section['id']}` {section['title']} ({section['length'] / 1024:.1f} KB)\n"
+            shown += 1
+    total = sum(len(doc["sections"]) for doc in entry["files"])
+    if total > shown:
+        out += f"- ... {total - shown} more sections: `blueprint.py --list {gem}`\n"
+    return out + "\n"
+
 # --- Runtime Engine ---
-def run_persona(persona, project_flag, scope, config, dry_run=False):
+def read_prompt_file(path):
+    """Reads a prompt source (core standard, persona), warm-cached inside the daemon."""
+    return warm(("text", str(path)), [path], lambda: Path(path).read_text())
+
+def build_recap(ledger_path, limit=5, mode="relevance", cwd=None):
+    """Formats the Recap block: the most relevant (or simply the newest) ledger entries."""
+    ledger_path = Path(ledger_path)
+    if not ledger_path.exists():
+        return ""
+    try:
+        if mode == "recent":
+            entries = [entry for entry, _ in load_recap_candidates(ledger_path)[-limit:]]
+        else:
+            entries = select_recap_entries(ledger_path, limit, cwd)
+        recap = "\n# 🧠 Recent Memory (The Recap)\n"
+        for entry in entries:
+            date = entry.get('display_date', 'Unknown Date')
+            topic = entry.get('topic', 'No Topic')
+            file = entry.get('file', '')
+            similar = f"; +{entry['similar']} similar" if entry.get("similar") else ""
+            recap += f"- **{date}**: {topic} (Ref: `{file}`{similar})\n"
+        return recap + "\n"
+    except Exception as e:
+        return f"\n# ⚠️ Memory Error: Could not read history: {e}\n"
+
+def scope_view_links(knowledge_dir, scope, persona, project_ctx):
+    """Maps view-relative paths to the real knowledge paths a scope may see."""
+    sessions = knowledge_dir / "sessions"
+    links = {}
+    # Shared, non-session knowledge (blueprints, references) is visible in every scope
+    if knowledge_dir.exists():
+        for entry in knowledge_dir.iterdir():
+            if entry.name != "sessions" and not entry.name.startswith("."):
+                links[entry.name] = entry
+    if scope == "global":
+        if sessions.exists():
+            for entry in sessions.iterdir():
+                links[f"sessions/{entry.name}"] = entry
+    elif scope == "persona":
+        links[f"sessions/{persona}"] = sessions / persona
+    else:
+        links[f"sessions/{persona}/{project_ctx}"] = sessions / persona / project_ctx
+    return links
+
+def ensure_scope_view(knowledge_dir, scope, persona, project_ctx):
+    """
+    Materializes (or incrementally repairs) a symlink farm under STATE_DIR/views
+    that mirrors the knowledge layout but only contains what the scope allows.
+    Views are keyed by scope/persona/project and reused across launches.
+    """
+    key = {"global": "all", "persona": persona}.get(scope, f"{persona}@{project_ctx}")
+    view_dir = STATE_DIR / "views" / scope / key
+    links = scope_view_links(knowledge_dir, scope, persona, project_ctx)
+
+    for rel, target in links.items():
+        link = view_dir / rel
+        if link.is_symlink():
+            if os.readlink(link) == str(target):
+                continue
+            link.unlink()
+        link.parent.mkdir(parents=True, exist_ok=True)
+        os.symlink(target, link)
+
+    # Drop links (and the directories holding them) that the scope no longer grants
+    for root, dirs, files in os.walk(view_dir, topdown=False):
+        for name in dirs + files:
+            path = Path(root) / name
+            if path.is_symlink():
+                if path.relative_to(view_dir).as_posix() not in links:
+                    path.unlink()
+            elif path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+    return view_dir
+
+def build_session_state(persona, project_flag, scope, config, with_personas=None, base_env=None, cwd=None, pid=None, digest=None, resume=None):
+    """
+    Resolves everything a session needs (persona board, project, recap, system
+    prompt, environment) without launching anything. Shared by dry runs, real
+    launches and gemonade-daemon.
+    """
+    base_env = os.environ if base_env is None else base_env
     persona_file = find_persona_file(persona, config)
     if not persona_file:
         raise FileNotFoundError(f"Persona '{persona}' not found.")
 
-    project_ctx = detect_project_context(project_flag)
+    # Composite Sessions: the primary persona owns the session; others join the board
+    board = [(persona, persona_file)]
+    for extra in with_personas or []:
+        if extra in [name for name, _ in board]:
+            continue
+        extra_file = find_persona_file(extra, config)
+        if not extra_file:
+            raise FileNotFoundError(f"Persona '{extra}' not found.")
+        board.append((extra, extra_file))
+
+    if project_flag or base_env.get("GEMONADE_PROJECT"):
+        project_ctx = detect_project_context(project_flag, cwd, base_env)
+    else:
+        work_dir = cwd or os.getcwd()
+        project_ctx = warm(("project", work_dir), [work_dir], lambda: detect_project_context(None, work_dir, base_env), ttl=30)
     knowledge_dir = Path(config["G_KNOWLEDGE_DIR"])
     session_dir = knowledge_dir / "sessions" / persona / project_ctx
     session_dir.mkdir(parents=True, exist_ok=True)
-    STATE_DIR.mkdir(parents=True, exist_ok=True)
 
     scope_md = f"# ⚠️ Active Access Scope: {scope.upper()}\n"
     if scope == "global":
@@ -374,43 +2804,42 @@ def run_persona(persona, project_flag, scope, config, dry_run=False):
         scope_md += f"PROJECT isolation active for '{project_ctx}'.\n"
 
     ledger_path = session_dir / "history.jsonl"
-    recent_history = ""
-    if ledger_path.exists():
+    recent_history = build_recap(ledger_path, mode=config.get("GEMONADE_RECAP_MODE", "relevance"), cwd=cwd)
+    view_dir = ensure_scope_view(knowledge_dir, scope, persona, project_ctx)
+
+    if digest is None:
+        digest = config.get("GEMONADE_PROJECT_DIGEST", "off").lower() in ("on", "1", "true", "yes")
+    repo_root = find_repo_root(cwd or os.getcwd()) if digest else None
+    project_digest = ""
+    if repo_root and repo_root.name == project_ctx:
         try:
-            lines = ledger_path.read_text().splitlines()
-            last_5 = lines[-5:]
-            recent_history = "\n# 🧠 Recent Memory (The Recap)\n"
-            for line in last_5:
-                try:
-                    entry = json.loads(line)
-                    date = entry.get('display_date', 'Unknown Date')
-                    topic = entry.get('topic', 'No Topic')
-                    file = entry.get('file', '')
-                    recent_history += f"- **{date}**: {topic} (Ref: `{file}`)\n"
-                except: pass
-            recent_history += "\n"
+            project_digest = format_project_digest(project_ctx, build_project_digest(repo_root))
         except Exception as e:
-            recent_history = f"\n# ⚠️ Memory Error: Could not read history: {e}\n"
+            log_debug(f"Project digest unavailable: {e}")
+
+    resume_md = format_resume_pack(json.loads(Path(resume).read_text())) if resume else ""
 
     core_persona_path = Path(config["G_CORE_PERSONA"])
-    system_md_content = ""
-    if core_persona_path.exists():
-        system_md_content += core_persona_path.read_text() + "\n\n"
-    
-    if recent_history:
-        system_md_content += recent_history
-        
-    system_md_content += scope_md + "\n\n"
-    system_md_content += persona_file.read_text()
+    core_md = read_prompt_file(core_persona_path) if core_persona_path.exists() else ""
+    persona_md = get_composite_prompt(board) if len(board) > 1 else read_prompt_file(persona_file)
+    persona_md += gem_tools_prompt(persona, persona_file.parent)
+    persona_md += blueprints_prompt(persona, persona_file.parent, config)
 
-    system_md_file = STATE_DIR / f"system_{persona}_{os.getpid()}.md"
-    system_md_file.write_text(system_md_content)
+    layout = prompt_layout(config)
+    system_md_content, stable_chars = assemble_system_prompt(
+        core_md, persona_md, [recent_history, resume_md, project_digest, scope_md + "\n\n"], layout)
+    stable_prefix = system_md_content[:stable_chars].encode()
 
-    env = os.environ.copy()
-    env["GEMINI_SYSTEM_MD"] = str(system_md_file)
-    env["GEMONADE_PROJECT"] = project_ctx
-    env["GEMONADE_PERSONA"] = persona
-    env["GEMONADE_SCOPE"] = scope
+    system_md_file = STATE_DIR / f"system_{persona}_{pid or os.getpid()}.md"
+
+    env = {
+        "GEMINI_SYSTEM_MD": str(system_md_file),
+        "GEMONADE_PROJECT": project_ctx,
+        "GEMONADE_PERSONA": persona,
+        "GEMONADE_SCOPE": scope,
+        "GEMONADE_KNOWLEDGE_VIEW": str(view_dir),
+        "VIRTUAL_ENV": base_env.get("VIRTUAL_ENV"),
+    }
 
     gem_home = persona_file.parent
     paths = []
@@ -418,34 +2847,629 @@ def run_persona(persona, project_flag, scope, config, dry_run=False):
     if (gem_home / ".venv" / "bin").exists(): 
         paths.append(str(gem_home / ".venv" / "bin"))
         env["VIRTUAL_ENV"] = str(gem_home / ".venv")
+    for _, extra_file in board[1:]:
+        if (extra_file.parent / "tools").exists(): paths.append(str(extra_file.parent / "tools"))
     
     core_tools = GEMONADE_HOME / "tools"
     if core_tools.exists(): paths.append(str(core_tools))
-    if paths: env["PATH"] = ":".join(paths) + ":" + env.get("PATH", "")
+    env["PATH"] = ":".join(paths + [base_env.get("PATH", "")]) if paths else base_env.get("PATH")
+
+    return {
+        "project_context": project_ctx,
+        "scope": scope,
+        "persona": persona,
+        "personas": [name for name, _ in board],
+        "session_dir": str(session_dir),
+        "ledger_bytes": ledger_path.stat().st_size if ledger_path.exists() else 0,
+        "digest_repo": str(repo_root) if project_digest else None,
+        "resume_pack": str(resume) if resume else None,
+        "prompt_cache": {"layout": layout, "stable_prefix_bytes": len(stable_prefix),
+                         "stable_prefix_sha256": hashlib.sha256(stable_prefix).hexdigest()},
+        "tool_worker": tool_worker_spec(gem_home),
+        "env": env,
+        "knowledge_view": str(view_dir),
+        "command": ["gemini", "--include-directories", str(view_dir)],
+        "system_prompt_content": system_md_content
+    }
+
+def start_live_capture(saver, session_dir, project_ctx, persona, launch_id, since):
+    """Starts the saver in --follow mode so messages reach the session Markdown while the chat runs."""
+    state_file = STATE_DIR / "captures" / f"{persona}_{os.getpid()}.json"
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    proc = subprocess.Popen([sys.executable, str(saver), str(session_dir), "--project", project_ctx,
+                             "--follow", "--capture-state", str(state_file), "--since", str(since),
+                             "--claim", launch_id],
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    return {"proc": proc, "state_file": state_file}
+
+SESSION_CLAIM_MAX_AGE = 7 * 86400
+
+def session_log_header(path):
+    """sessionId/projectHash/startTime of a Gemini log, read from its first bytes only."""
+    with open(path, 'rb') as f:
+        head = f.read(4096).decode('utf-8', errors='replace')
+    return {key: m.group(1) for key in ("sessionId", "projectHash", "startTime")
+            if (m := re.search(rf'"{key}"\s*:\s*"([^"]*)"', head))}
+
+def claim_session_log(session_id, owner):
+    """Claims a Gemini session for one launch. True if `owner` holds the claim."""
+    claims = STATE_DIR / "captures" / "claims"
+    claims.mkdir(parents=True, exist_ok=True)
+    claim = claims / re.sub(r'[^A-Za-z0-9_.-]', '_', session_id)
+    try:
+        fd = os.open(claim, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        try:
+            return claim.read_text() == owner
+        except OSError:
+            return False
+    with os.fdopen(fd, 'w') as f:
+        f.write(owner)
+    cutoff = time.time() - SESSION_CLAIM_MAX_AGE
+    for old in claims.iterdir():
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
+    return True
+
+def find_session_log_since(since, owner=None, cwd=None):
+    """
+    This launch's Gemini session log. Only logs of the project's chat dir
+    (Gemini keys it by the sha256 of the working directory) that started at
+    or after `since` qualify, so parallel chats elsewhere are never picked.
+    The earliest start wins; with an `owner`, the log is claimed for it and
+    logs claimed by another launch in the same project are skipped.
+    """
+    project_hash = hashlib.sha256((cwd or os.getcwd()).encode()).hexdigest()
+    candidates = []
+    for path in glob.glob(os.path.join(GEMINI_TMP_DIR, "*", "chats", "session-*.json")):
+        try:
+            if os.path.getmtime(path) < since - 1:
+                continue
+            head = session_log_header(path)
+            started = datetime.fromisoformat(head["startTime"].replace('Z', '+00:00')).timestamp()
+        except (OSError, KeyError, ValueError):
+            continue
+        if head.get("projectHash", Path(path).parent.parent.name) == project_hash and started >= since - 1:
+            candidates.append((started, path, head.get("sessionId") or os.path.basename(path)))
+    for _, path, session_id in sorted(candidates):
+        if owner is None or claim_session_log(session_id, owner):
+            return path
+    return None
+
+def stop_live_capture(capture):
+    """Stops the watcher and returns save-job fields that let the final save resume from it."""
+    proc = capture["proc"]
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    try:
+        captured = json.loads(capture["state_file"].read_text())
+    except (OSError, ValueError):
+        return {}
+    return {"capture_state": str(capture["state_file"]), "log_file": captured["log_file"]}
+
+def run_persona(persona, project_flag, scope, config, dry_run=False, with_personas=None, digest=None, resume=None):
+    resume = str(resume) if resume else None
+    request = {"persona": persona, "project_flag": project_flag, "scope": scope, "with_personas": with_personas,
+               "digest": digest, "resume": resume}
+    with timed("build_session") as sizes:
+        state = daemon_request({"op": "session", "config": config, "args": request,
+                                "env": dict(os.environ), "cwd": os.getcwd(), "pid": os.getpid()})
+        sizes["daemon"] = state is not None
+        if state is None:
+            state = build_session_state(persona, project_flag, scope, config, with_personas=with_personas, digest=digest,
+                                        resume=resume)
+        sizes["prompt_bytes"] = len(state["system_prompt_content"].encode())
+        sizes["stable_prefix_bytes"] = state.get("prompt_cache", {}).get("stable_prefix_bytes", 0)
+        sizes["ledger_bytes"] = state.get("ledger_bytes", 0)
+        sizes["personas"] = len(state["personas"])
 
     if dry_run:
-        state = {
-            "project_context": project_ctx,
-            "scope": scope,
-            "persona": persona,
-            "env": {k: env.get(k) for k in ["GEMONADE_PROJECT", "GEMONADE_SCOPE", "GEMONADE_PERSONA", "GEMINI_SYSTEM_MD", "VIRTUAL_ENV", "PATH"]},
-            "command": ["gemini", "--include-directories", str(knowledge_dir)],
-            "system_prompt_content": system_md_content
-        }
-        if system_md_file.exists(): system_md_file.unlink()
         return state
 
+    project_ctx = state["project_context"]
+    if state.get("digest_repo"):
+        mark_digest_session(state["digest_repo"])
+    system_md_file = Path(state["env"]["GEMINI_SYSTEM_MD"])
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    system_md_file.write_text(state["system_prompt_content"])
+
+    env = os.environ.copy()
+    env.update({k: v for k, v in state["env"].items() if v is not None})
+
+    worker = None
+    if state.get("tool_worker"):
+        try:
+            worker = start_tool_worker(state["tool_worker"], persona)
+            env["PATH"] = f"{worker['bin']}:{env.get('PATH', '')}"
+        except OSError as e:
+            print_err(f"Tool worker unavailable, tools will start cold: {e}")
+
+    saver = Path(config["G_SAVER_SCRIPT"])
+    launch_id, launched_at = uuid.uuid4().hex, time.time()
+    capture = None
+    if saver.exists() and config.get("GEMONADE_LIVE_CAPTURE", "on").lower() not in ("off", "0", "false", "no"):
+        capture = start_live_capture(saver, state["session_dir"], project_ctx, persona, launch_id, launched_at)
+
     print_msg("💎", f"Gemonade: [{persona}] @ [{project_ctx}] (Scope: {scope})")
+    hint = update_hint(persona, config)
+    if hint: print_msg("⬆️", hint)
     try:
-        subprocess.run(["gemini", "--include-directories", str(knowledge_dir)], env=env)
+        with timed("chat"):
+            subprocess.run(state["command"], env=env)
     finally:
+        if worker: stop_tool_worker(worker)
         if system_md_file.exists(): system_md_file.unlink()
-        saver = Path(config["G_SAVER_SCRIPT"])
         if saver.exists():
-            run_proc([sys.executable, str(saver), str(session_dir), "--project", project_ctx])
+            # Post-processing runs in a detached worker so the shell returns immediately
+            # Pin this chat's log now; by the time the job runs another chat may be newer
+            payload = {"session_dir": state["session_dir"], "project": project_ctx, "saver": str(saver),
+                       "log_file": find_session_log_since(launched_at, owner=launch_id)}
+            if capture: payload.update({k: v for k, v in stop_live_capture(capture).items() if v})
+            enqueue_job("save", payload)
+            if archive_due():
+                enqueue_job("archive", {"retention_days": config.get("GEMONADE_RETENTION_DAYS", "30"),
+                                        "knowledge_dir": config["G_KNOWLEDGE_DIR"]})
+            spawn_job_worker()
+            print_msg("💾", "Session queued for saving (see 'gemonade jobs').")
+
+# --- Post-Session Job Queue ---
+# Durable queue under STATE_DIR/jobs: one JSON file per job, moved between
+# pending/ -> running/ -> done/ | failed/ with atomic renames.
+JOB_STATES = ("pending", "running", "done", "failed")
+JOB_MAX_ATTEMPTS = 3
+JOB_DONE_KEEP = 50
+ARCHIVE_INTERVAL = 24 * 3600
+# Kinds that touch shared mounts drain in their own lane (own worker and lock)
+JOB_LANES = {"team_refresh": "team", "team_hydrate": "team"}
+
+def job_lane(kind):
+    return JOB_LANES.get(kind, "default")
+
+def jobs_dir():
+    return STATE_DIR / "jobs"
+
+def _write_job(path, job):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(job, indent=2))
+    os.replace(tmp, path)
+
+def enqueue_job(kind, payload, max_attempts=JOB_MAX_ATTEMPTS):
+    """Adds a job to the queue and returns its id. Ids sort by creation time."""
+    for state in JOB_STATES:
+        (jobs_dir() / state).mkdir(parents=True, exist_ok=True)
+    job_id = f"{time.time_ns()}_{kind}_{random.randrange(16**6):06x}"
+    job = {"id": job_id, "kind": kind, "payload": payload, "attempts": 0,
+           "max_attempts": max_attempts, "not_before": 0, "created": time.time(), "error": None}
+    _write_job(jobs_dir() / "pending" / f"{job_id}.json", job)
+    log_debug(f"Queued job {job_id}")
+    return job_id
+
+def list_jobs(state):
+    folder = jobs_dir() / state
+    if not folder.exists():
+        return []
+    jobs = []
+    for path in sorted(folder.glob("*.json")):
+        try:
+            jobs.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            pass
+    return jobs
+
+def _job_save(payload, config):
+    """Renders the session Markdown, then queues the ledger and index updates."""
+    session_dir = Path(payload["session_dir"])
+    entry_file = STATE_DIR / "jobs" / f".entry_{os.getpid()}_{time.time_ns()}.json"
+    cmd = [sys.executable, payload["saver"], str(session_dir), "--project", payload["project"],
+           "--no-ledger", "--entry-out", str(entry_file)]
+    if payload.get("log_file"):
+        cmd += ["--log-file", payload["log_file"]]
+    if payload.get("capture_state"):
+        cmd += ["--capture-state", payload["capture_state"]]
+    try:
+        run_proc(cmd)
+        entry = json.loads(entry_file.read_text())
+    finally:
+        if entry_file.exists(): entry_file.unlink()
+    enqueue_job("ledger", {"session_dir": str(session_dir), "entry": entry})
+    enqueue_job("index", {"session_dir": str(session_dir), "entry": entry})
+
+def _job_ledger(payload, config):
+    append_ledger_entry(Path(payload["session_dir"]) / "history.jsonl", payload["entry"])
+
+# Callables (session_dir, entry, config) run by 'index' jobs after a session is recorded.
+SESSION_INDEXERS = [index_session_terms]
+
+def _job_index(payload, config):
+    for indexer in SESSION_INDEXERS:
+        indexer(Path(payload["session_dir"]), payload["entry"], config)
+
+def archive_due():
+    stamp = jobs_dir() / "last_archive"
+    return not stamp.exists() or time.time() - stamp.stat().st_mtime > ARCHIVE_INTERVAL
+
+def _job_archive(payload, config):
+    script = GEMONADE_HOME / "tools" / "cleanup_sessions.sh"
+    env = os.environ.copy()
+    env["G_KNOWLEDGE_DIR"] = payload["knowledge_dir"]
+    subprocess.run(["bash", str(script), str(payload["retention_days"])], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    (jobs_dir() / "last_archive").touch()
+
+def _job_outdated(payload, config):
+    check_outdated(config)
+
+def _job_team_refresh(payload, config):
+    sync_team_root(payload["root"])
+
+def _job_team_hydrate(payload, config):
+    path = Path(payload["path"])
+    if path.exists() and not (path / ".venv").exists():
+        hydrate_gem(path)
+
+JOB_HANDLERS = {
+    "save": _job_save,
+    "ledger": _job_ledger,
+    "index": _job_index,
+    "archive": _job_archive,
+    "outdated": _job_outdated,
+    "team_refresh": _job_team_refresh,
+    "team_hydrate": _job_team_hydrate,
+}
+
+def _run_job(path, config):
+    running = jobs_dir() / "running" / path.name
+    os.replace(path, running)
+    job = json.loads(running.read_text())
+    job["attempts"] += 1
+    try:
+        handler = JOB_HANDLERS.get(job["kind"])
+        if not handler:
+            raise ValueError(f"Unknown job kind '{job['kind']}'.")
+        handler(job["payload"], config)
+    except Exception as e:
+        detail = getattr(e, "stderr", None) or getattr(e, "stdout", None) or ""
+        job["error"] = f"{e} {detail}".strip()[-500:]
+        if job["attempts"] < job["max_attempts"]:
+            job["not_before"] = time.time() + 2 ** job["attempts"]
+            _write_job(jobs_dir() / "pending" / path.name, job)
+        else:
+            _write_job(jobs_dir() / "failed" / path.name, job)
+        running.unlink()
+        return False
+    job["error"] = None
+    job["finished"] = time.time()
+    _write_job(jobs_dir() / "done" / path.name, job)
+    running.unlink()
+    return True
+
+def _job_in_lane(path, lane):
+    try:
+        job = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    return job if job_lane(job.get("kind")) == lane else None
+
+def drain_jobs(config, wait=True, lane="default"):
+    """
+    Processes queued jobs of one lane until none are runnable. Only one worker
+    drains a lane at a time (advisory lock); a second worker exits immediately.
+    With wait=True, jobs backing off for a retry are waited for.
+    """
+    for state in JOB_STATES:
+        (jobs_dir() / state).mkdir(parents=True, exist_ok=True)
+    lock_name = "worker.lock" if lane == "default" else f"worker-{lane}.lock"
+    with open(jobs_dir() / lock_name, "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            log_debug("Another job worker is active.")
+            return 0
+
+        # Jobs left in running/ belong to a worker that died mid-job
+        for stale in (jobs_dir() / "running").glob("*.json"):
+            if _job_in_lane(stale, lane):
+                os.replace(stale, jobs_dir() / "pending" / stale.name)
+
+        processed = 0
+        while True:
+            now = time.time()
+            pending = sorted((jobs_dir() / "pending").glob("*.json"))
+            ready, delays = [], []
+            for path in pending:
+                job = _job_in_lane(path, lane)
+                if job is None:
+                    continue
+                not_before = job.get("not_before", 0)
+                if not_before <= now: ready.append(path)
+                else: delays.append(not_before - now)
+            if ready:
+                _run_job(ready[0], config)
+                processed += 1
+            elif delays and wait:
+                time.sleep(min(delays))
+            else:
+                break
+
+        done = sorted((jobs_dir() / "done").glob("*.json"))
+        for old in done[:-JOB_DONE_KEEP]:
+            old.unlink()
+        return processed
+
+def spawn_job_worker(lane="default"):
+    """Starts a detached worker that drains a lane after the terminal is released."""
+    subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "jobs", "work", "--lane", lane],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+def print_jobs_status():
+    counts = {state: len(list_jobs(state)) for state in JOB_STATES}
+    print_msg("📋", "Job queue: " + ", ".join(f"{counts[s]} {s}" for s in JOB_STATES))
+    for state in ("running", "pending", "failed"):
+        for job in list_jobs(state):
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["created"]))
+            line = f"  [{state}] {job['kind']:<8} {when} (attempt {job['attempts']}/{job['max_attempts']})"
+            if job.get("error"): line += f" - {job['error']}"
+            print(line)
+
+# --- Daemon (gemonade-daemon) ---
+# A per-user server on a Unix socket that keeps the gem registry, ledger
+# recaps, project resolution and compiled prompts warm between invocations.
+def daemon_socket_path():
+    return STATE_DIR / "daemon.sock"
+
+def daemon_request(payload, timeout=2.0):
+    """
+    Sends one request to a running daemon (see core/daemon_client.py). Returns
+    None when none is reachable, or when it runs older code and is being replaced.
+    """
+    reply = daemon_client.current_request(daemon_socket_path(), payload, timeout)
+    if reply is None:
+        log_debug("Daemon unavailable or restarting; running in-process.")
+        return None
+    if not reply.get("ok"):
+        raise RuntimeError(reply.get("error", "Daemon request failed."))
+    return reply["result"]
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            reply = {"ok": True, "result": handle_daemon_request(request, self.server)}
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        reply["version"] = self.server.version
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def handle_daemon_request(request, server):
+    op = request.get("op")
+    if op == "ping":
+        return {"pid": os.getpid(), "uptime": round(time.time() - server.started, 1), "version": server.version,
+                "cache_entries": len(WARM_CACHE.entries), "hits": WARM_CACHE.hits, "misses": WARM_CACHE.misses}
+    if op == "list":
+        return get_gems_list(request["config"])
+    if op == "session":
+        args = request["args"]
+        return build_session_state(args["persona"], args.get("project_flag"), args["scope"], request["config"],
+                                   with_personas=args.get("with_personas"), digest=args.get("digest"),
+                                   resume=args.get("resume"),
+                                   base_env=request.get("env", {}),
+                                   cwd=request.get("cwd"), pid=request.get("pid"))
+    if op == "cli":
+        return daemon_cli(request)
+    if op == "stop":
+        threading.Thread(target=server.shutdown, daemon=True).start()
+        return {"stopping": os.getpid()}
+    raise ValueError(f"Unknown daemon operation '{op}'.")
+
+def daemon_cli(request):
+    """
+    Runs a thin-client command from warm state: `list` and `run --dry-run`.
+    Returns {"stdout", "stderr", "code"}, or None for anything else (the
+    client then runs the full CLI).
+    """
+    try:
+        _, args = parse_cli_args(request["argv"])
+    except SystemExit:
+        return None
+    if args.verbose or not (args.command == "list" or (args.command == "run" and args.dry_run)):
+        return None
+    started = time.perf_counter()
+    result = {"stdout": "", "stderr": "", "code": 0}
+    try:
+        config, env = config_for_env(request.get("env", {}))
+        if args.command == "list":
+            result["stdout"] = render_gem_list(list_gems(config))
+        else:
+            state = build_session_state(args.gem, args.project, args.scope, config, with_personas=args.with_personas,
+                                        digest=args.digest, base_env=env, cwd=request.get("cwd"), pid=request.get("pid"))
+            result["stdout"] = json.dumps(state, indent=2) + "\n"
+    except Exception as e:
+        result.update(stderr=f"❌ Error: {e}\n", code=1)
+    record_metric(args.command, "total", time.perf_counter() - started, daemon=True)
+    return result
+
+def serve_daemon(replace=False):
+    """
+    Runs the daemon in the foreground until stopped. With `replace`, a running
+    daemon on older code is stopped first (see daemon_client.current_request).
+    """
+    global WARM_CACHE
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    sock_path = daemon_socket_path()
+    version = daemon_client.code_version()
+    # Startup is serialized so racing replacements cannot orphan each other's sockets
+    with open(STATE_DIR / "daemon.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        running = daemon_client.request(sock_path, {"op": "ping"})
+        if running is not None:
+            if not replace or running.get("version") == version:
+                raise RuntimeError("gemonade-daemon is already running.")
+            daemon_client.request(sock_path, {"op": "stop"})
+            deadline = time.monotonic() + 3.0
+            while sock_path.exists() and time.monotonic() < deadline:
+                time.sleep(0.02)
+        if sock_path.exists():
+            sock_path.unlink()
+
+        WARM_CACHE = WarmCache()
+        old_umask = os.umask(0o077)
+        try:
+            server = _DaemonServer(str(sock_path), _DaemonHandler)
+        finally:
+            os.umask(old_umask)
+    server.started = time.time()
+    server.version = version
+    inode = sock_path.stat().st_ino
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            # A replacement may already own the path
+            if sock_path.stat().st_ino == inode: sock_path.unlink()
+        except FileNotFoundError:
+            pass
+
+def start_daemon(wait=3.0):
+    """Spawns a detached daemon and waits until it answers."""
+    status = daemon_request({"op": "ping"})
+    if status is not None:
+        return status
+    daemon_client.spawn_daemon()
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        status = daemon_request({"op": "ping"})
+        if status is not None:
+            return status
+        time.sleep(0.05)
+    raise RuntimeError("gemonade-daemon did not start.")
+
+# --- Public API ---
+# Structured, non-printing entry points for embedding Gemonade (re-exported by
+# the `core` package). main() is a formatter over these; config defaults to
+# ~/.gemonade_config.
+@contextmanager
+def quiet():
+    """Suppresses progress output (print_msg) for the duration of an API call."""
+    token = QUIET.set(True)
+    try:
+        yield
+    finally:
+        QUIET.reset(token)
+
+def resolve_persona(name, config=None):
+    """Returns where a persona lives: name, category, gem path, persona file and manifest."""
+    config = config or load_config()
+    persona_file = find_persona_file(validate_gem_name(name), config)
+    if not persona_file:
+        raise FileNotFoundError(f"Persona '{name}' not found.")
+    gem_home = persona_file.parent
+    try:
+        manifest = json.loads((gem_home / "gem.json").read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    category = gem_home.parent.name
+    if STATE_DIR / "team_cache" in gem_home.parents or str(gem_home.parent) in team_roots(config):
+        category = "team"
+    return {
+        "name": name,
+        "category": category,
+        "path": str(gem_home),
+        "persona_file": str(persona_file),
+        "manifest": manifest,
+    }
+
+def render_gem_list(gems_by_cat):
+    """The `gemonade list` output for list_gems() data."""
+    lines = []
+    for cat, gems in gems_by_cat.items():
+        title = {"LOCAL": "Private & Custom", "INSTALLED": "Community Gems", "TEAM": "Shared Team Gems"}.get(cat, "Built-in Standards")
+        lines.append(f"{cat} ({title})")
+        if not gems: lines.append("  (none)")
+        else: lines += [f"  - {gem['name']:<15} : {gem['description']}" for gem in gems]
+        lines.append("")
+    return "".join(line + "\n" for line in lines)
+
+def list_gems(config=None):
+    """Gems by category: {"LOCAL": [{"name", "description"}], "INSTALLED": [...], "CORE": [...]}."""
+    config = config or load_config()
+    # Inside the daemon the registry is already warm
+    gems_by_cat = daemon_request({"op": "list", "config": config}) if WARM_CACHE is None else None
+    if gems_by_cat is None:
+        gems_by_cat = get_gems_list(config)
+    return {cat: [{"name": name, "description": desc} for name, desc in gems] for cat, gems in gems_by_cat.items()}
+
+def install(source, config=None):
+    """Installs a gem from a Git URL, owner/repo or local folder. Returns its name, path and receipt."""
+    config = config or load_config()
+    with quiet():
+        name = install_gem(source, config)
+    path = Path(config["G_PACKAGE_ROOT"]) / "installed" / name
+    return {"name": name, "path": str(path), "receipt": read_receipt(path)}
+
+def uninstall(name, config=None):
+    config = config or load_config()
+    target = get_safe_installed_path(config, name)
+    removed = target.exists()
+    if removed:
+        shutil.rmtree(target)
+        reindex_blueprints(config)
+    return {"name": name, "path": str(target), "removed": removed}
+
+def update(name, config=None):
+    """Updates an installed gem via git pull, or by re-installing from its recorded source."""
+    config = config or load_config()
+    target = get_safe_installed_path(config, name)
+    if not target.exists():
+        raise FileNotFoundError(f"Gem '{name}' not found.")
+    with quiet():
+        if (target / ".git").exists():
+            run_proc(["git", "pull"], cwd=target)
+            hydrate_gem(target)
+            optimize_gem(target)
+            reindex_blueprints(config)
+            return {"name": name, "method": "git", "receipt": read_receipt(target)}
+        source = (read_receipt(target) or {}).get("source")
+        if not source:
+            raise ValueError(f"Gem '{name}' has no recorded source. Reinstall it to enable updates.")
+        # Installs drop .git: re-install from the source recorded in the receipt
+        new_name = install_gem(source.get("url") or source.get("path"), config)
+    return {"name": new_name, "method": "reinstall", "source": source,
+            "receipt": read_receipt(get_safe_installed_path(config, new_name))}
+
+def recap(persona, project=None, config=None, limit=5, cwd=None):
+    """Ledger entries the next session would be shown, oldest first."""
+    config = config or load_config()
+    project_ctx = detect_project_context(project, cwd)
+    ledger = Path(config["G_KNOWLEDGE_DIR"]) / "sessions" / validate_gem_name(persona) / project_ctx / "history.jsonl"
+    if not ledger.exists():
+        return []
+    if config.get("GEMONADE_RECAP_MODE", "relevance") == "recent":
+        return [entry for entry, _ in load_recap_candidates(ledger)[-limit:]]
+    return select_recap_entries(ledger, limit=limit, cwd=cwd)
+
+def history(persona, project=None, config=None, clusters=False):
+    """The persona/project ledger: entries oldest first, or near-duplicate clusters."""
+    config = config or load_config()
+    ledger = Path(config["G_KNOWLEDGE_DIR"]) / "sessions" / validate_gem_name(persona) / detect_project_context(project) / "history.jsonl"
+    if clusters:
+        return ledger_clusters(ledger)
+    return read_ledger(ledger)
 
 # --- Main CLI ---
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(description="Gemonade: The Gemini CLI Persona Wrapper")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output for debugging")
     subparsers = parser.add_subparsers(dest="command")
@@ -454,60 +3478,290 @@ def main():
     run_p.add_argument("gem", nargs="?", default="general")
     run_p.add_argument("--project", help="Project context")
     run_p.add_argument("--scope", default="project", choices=["project", "persona", "global"])
+    run_p.add_argument("--with", dest="with_personas", action="append", default=[], metavar="GEM", help="Add a persona to a composite session (repeatable)")
+    run_p.add_argument("--digest", action="store_true", default=None, help="Inject a cached project digest (layout, commits, changes)")
     run_p.add_argument("--dry-run", action="store_true")
 
+    resume_p = subparsers.add_parser("resume", help="Start a session from a previous session's resume pack")
+    resume_p.add_argument("session", nargs="?", default="latest", help="'latest', a session file, or part of its name/id")
+    resume_p.add_argument("--gem", help="Persona to resume with (default: the session's own)")
+    resume_p.add_argument("--project", help="Project context (default: the session's own; 'latest' looks here)")
+    resume_p.add_argument("--scope", default="project", choices=["project", "persona", "global"])
+    resume_p.add_argument("--dry-run", action="store_true")
+
     subparsers.add_parser("list", help="List available Gems")
     subparsers.add_parser("config", help="Show current config")
     subparsers.add_parser("install", help="Install a Gem").add_argument("source")
     subparsers.add_parser("uninstall", help="Uninstall a Gem").add_argument("name")
     subparsers.add_parser("update", help="Update a Gem").add_argument("name")
+    outdated_p = subparsers.add_parser("outdated", help="Check installed Gems for updates")
+    outdated_p.add_argument("--timeout", type=float, default=OUTDATED_TIMEOUT, help="Per-gem timeout in seconds")
+    subparsers.add_parser("doctor", help="Report a Gem's footprint and cold-start time").add_argument("name")
+    team_p = subparsers.add_parser("team", help="Show or refresh the local mirrors of team package roots")
+    team_p.add_argument("action", nargs="?", default="status", choices=["status", "sync"])
     
     search_p = subparsers.add_parser("search", help="Search GitHub for Gems")
     search_p.add_argument("query", nargs="?", default="")
 
-    if len(sys.argv) == 1: args = parser.parse_args(["run", "general"])
-    elif sys.argv[1] not in subparsers.choices and not sys.argv[1].startswith("-"): args = parser.parse_args(["run"] + sys.argv[1:])
-    else: args = parser.parse_args()
+    jobs_p = subparsers.add_parser("jobs", help="Show or process the post-session job queue")
+    jobs_p.add_argument("action", nargs="?", default="status", choices=["status", "work", "retry"])
+    jobs_p.add_argument("--lane", default="default", choices=sorted({"default", *JOB_LANES.values()}),
+                        help="Queue lane drained by 'work' (default: default)")
+
+    stats_p = subparsers.add_parser("stats", help="Usage and performance statistics")
+    stats_sub = stats_p.add_subparsers(dest="stats_command", required=True)
+    perf_p = stats_sub.add_parser("perf", help="Latency percentiles per command and phase")
+    perf_p.add_argument("--since", default="7d", help="Time window, e.g. 30m, 24h, 7d (default: 7d)")
+    perf_p.add_argument("--command", dest="filter_command", help="Only show this command")
+    tools_p = stats_sub.add_parser("tools", help="Per-tool call counts, latency, errors and redundancy from saved sessions")
+    tools_p.add_argument("--gem", help="Only show this gem's tools")
+    tools_p.add_argument("--sort", default="time", choices=["time", "calls", "errors", "redundant"])
+
+    migrate_p = subparsers.add_parser("migrate-layout", help="Move session files to the flat or monthly (YYYY/MM) layout")
+    migrate_p.add_argument("--to", dest="layout", choices=SESSION_LAYOUTS, default="monthly")
+
+    sync_p = subparsers.add_parser("sync", help="Move knowledge/ between machines as delta bundles")
+    sync_sub = sync_p.add_subparsers(dest="sync_command", required=True)
+    for action, help_text in (("export", "Write the changes a peer does not have yet"),
+                              ("import", "Apply a bundle (ledgers are merged)"),
+                              ("ack", "Record that the peer imported the last export"),
+                              ("status", "Show what the next export would send")):
+        action_p = sync_sub.add_parser(action, help=help_text)
+        if action in ("export", "import"):
+            action_p.add_argument("bundle", help="Bundle path (.tar.gz)")
+        if action == "ack":
+            action_p.add_argument("--id", dest="bundle_id", help="Bundle id to acknowledge (default: the newest export)")
+        action_p.add_argument("--peer", default="default", help="Name of the other machine (default: 'default')")
+        if action == "export":
+            action_p.add_argument("--full", action="store_true", help="Ignore what the peer already has")
+
+    history_p = subparsers.add_parser("history", help="Show a persona's session ledger")
+    history_p.add_argument("gem", nargs="?", default="general")
+    history_p.add_argument("--project", help="Project context")
+    history_p.add_argument("--clusters", action="store_true", help="Group near-duplicate sessions")
+    history_p.add_argument("--limit", type=int, default=20, help="Rows to show (default: 20)")
+
+    tool_p = subparsers.add_parser("tool", help="Run gem tools (with result caching) and report cache stats")
+    tool_sub = tool_p.add_subparsers(dest="tool_command", required=True)
+    tool_run_p = tool_sub.add_parser("run", help="Run a tool declared in a gem's mcp.json")
+    tool_run_p.add_argument("gem")
+    tool_run_p.add_argument("tool")
+    tool_run_p.add_argument("params", nargs="*", metavar="KEY=VALUE")
+    tool_run_p.add_argument("--no-cache", action="store_true", help="Always execute (results are not stored)")
+    tool_sub.add_parser("report", help="Per-gem cache hit/miss report").add_argument("gem", nargs="?")
+
+    daemon_p = subparsers.add_parser("daemon", help="Manage the warm gemonade-daemon")
+    daemon_p.add_argument("action", choices=["start", "stop", "status", "serve"])
+    daemon_p.add_argument("--replace", action="store_true", help="With serve: take over from a running daemon")
+
+    return parser, subparsers
+
+def parse_cli_args(argv):
+    """(parser, args) for a command line; a bare gem name means `run <gem>`."""
+    parser, subparsers = build_parser()
+    if not argv: argv = ["run", "general"]
+    elif argv[0] not in subparsers.choices and not argv[0].startswith("-"): argv = ["run"] + argv
+    return parser, parser.parse_args(argv)
+
+def main():
+    parser, args = parse_cli_args(sys.argv[1:])
 
     # Apply Global Flags
     FLAGS["verbose"] = args.verbose
+    FLAGS["command"] = args.command
     config = load_config()
+    started = time.perf_counter()
 
     try:
         if args.command == "run":
-            state = run_persona(args.gem, args.project, args.scope, config, dry_run=args.dry_run)
+            state = run_persona(args.gem, args.project, args.scope, config, dry_run=args.dry_run, with_personas=args.with_personas, digest=args.digest)
+            if args.dry_run: print(json.dumps(state, indent=2))
+        elif args.command == "resume":
+            latest = args.session == "latest"
+            pack = find_resume_pack(config, args.session, persona=args.gem if latest else None,
+                                    project=(args.project or detect_project_context()) if latest else None)
+            owner, origin, _ = session_location(pack, config)
+            persona, project = args.gem or owner, args.project or origin
+            if not args.dry_run: print_msg("⏯️", f"Resuming {pack.name[:-len(RESUME_SUFFIX)]} ({owner} @ {origin})")
+            state = run_persona(persona, project, args.scope, config, dry_run=args.dry_run, resume=pack)
             if args.dry_run: print(json.dumps(state, indent=2))
         elif args.command == "list":
-            for cat, gems in get_gems_list(config).items():
-                title = f"{cat} (Private & Custom)" if cat == "LOCAL" else f"{cat} (Community Gems)" if cat == "INSTALLED" else f"{cat} (Built-in Standards)"
-                print(title)
-                if not gems: print("  (none)")
-                else: 
-                    for name, desc in gems: print(f"  - {name:<15} : {desc}")
-                print("")
+            print(render_gem_list(list_gems(config)), end="")
         elif args.command == "install":
-            name = install_gem(args.source, config)
-            print_msg("✅", f"Installation of '{name}' complete.")
+            print_msg("📦", f"Installing {args.source}...")
+            result = install(args.source, config)
+            print_msg("✅", f"Installation of '{result['name']}' complete.")
         elif args.command == "uninstall":
-            target = get_safe_installed_path(config, args.name)
-            if target.exists():
-                shutil.rmtree(target)
-                print_msg("🗑️", f"Uninstalled {args.name}")
+            result = uninstall(args.name, config)
+            if result["removed"]: print_msg("🗑️", f"Uninstalled {args.name}")
             else: print_err(f"Gem '{args.name}' not found.")
         elif args.command == "update":
-            target = get_safe_installed_path(config, args.name)
-            if target.exists():
-                print_msg("⬇️", f"Updating {args.name}...")
-                run_proc(["git", "pull"], cwd=target)
-                hydrate_gem(target)
-            else: print_err(f"Gem '{args.name}' not found.")
+            print_msg("⬇️", f"Updating {args.name}...")
+            result = update(args.name, config)
+            print_msg("✅", f"Updated '{result['name']}' ({result['method']}).")
+        elif args.command == "outdated":
+            results = check_outdated(config, timeout=args.timeout)
+            if not results: print_msg("📭", "No installed Gems.")
+            for r in results:
+                icon = {"outdated": "⬆️", "current": "✅", "error": "❌"}.get(r["status"], "❔")
+                versions = f"{r['installed']} -> {r['latest']}" if r["status"] == "outdated" else (r["installed"] or "")
+                print(f"  {icon} {r['name']:<20} {r['status']:<9} {versions} {r['detail']}".rstrip())
+        elif args.command == "doctor":
+            report = diagnose_gem(resolve_persona(args.name, config)["path"])
+            print_msg("🩺", f"{report['name']} ({report['path']})")
+            print(f"   Footprint   : {report['footprint_bytes'] / 1048576:.1f} MB in {report['files']} files (venv {report['venv_bytes'] / 1048576:.1f} MB)")
+            print(f"   Interpreter : {report['interpreter']} (start {report['interpreter_start_s'] * 1000:.0f} ms)")
+            if not report["receipt"]: print("   Receipt     : missing (reinstall or 'gemonade update' to optimize)")
+            elif report["drift"]: print(f"   Receipt     : changed since install: {', '.join(report['drift'])}")
+            else: print("   Receipt     : up to date")
+            for tool in report["tools"]:
+                print(f"   - {tool['name']:<24} cold start {tool['cold_start_s'] * 1000:7.0f} ms  ({len(tool['imports'])} imports)")
+        elif args.command == "team":
+            roots = team_roots(config)
+            if not roots: print_msg("ℹ️", "No team roots configured (set G_TEAM_ROOTS in ~/.gemonade_config).")
+            for root in roots:
+                if args.action == "sync":
+                    try:
+                        index = sync_team_root(root)
+                    except (OSError, RuntimeError) as e:
+                        print_err(str(e))
+                        continue
+                else:
+                    index = read_team_index(team_mirror_dir(root))
+                if index is None:
+                    print_msg("❔", f"{root}: not mirrored yet")
+                    continue
+                age = time.time() - index.get("checked_at", 0)
+                print_msg("🗂️", f"{root}: {len(index['gems'])} gems, checked {age:.0f}s ago ({team_mirror_dir(root)})")
+                for name, gem in sorted(index["gems"].items()):
+                    print(f"  - {name:<15} {gem['version'] or '?':<10} {gem['hash'][:12]}")
         elif args.command == "config":
             for k, v in config.items(): print(f"{k:<25} = {v}")
         elif args.command == "search":
             search_gems(args.query)
+        elif args.command == "jobs":
+            if args.action == "work":
+                drain_jobs(config, lane=args.lane)
+            elif args.action == "retry":
+                failed = list_jobs("failed")
+                for job in failed:
+                    job.update({"attempts": 0, "not_before": 0, "error": None})
+                    _write_job(jobs_dir() / "pending" / f"{job['id']}.json", job)
+                    (jobs_dir() / "failed" / f"{job['id']}.json").unlink()
+                print_msg("🔁", f"Re-queued {len(failed)} failed job(s).")
+                for lane in sorted({job_lane(job["kind"]) for job in failed}):
+                    spawn_job_worker(lane)
+            else:
+                print_jobs_status()
+        elif args.command == "stats" and args.stats_command == "tools":
+            rows = tool_stats_report(args.gem, args.sort)
+            if not rows:
+                print_msg("📭", "No tool calls recorded yet" + (f" for '{args.gem}'." if args.gem else "."))
+            else:
+                print_msg("🛠️", f"Tool calls across {read_tool_rollup()['sessions']} saved sessions (ms; P95 is a bucket upper bound)")
+                print(f"  {'GEM':<14} {'TOOL':<28} {'CALLS':>6} {'MEAN':>8} {'P95':>8} {'MAX':>8} {'ERR%':>6} {'REDUND':>6} {'AVG KB':>7}")
+                for r in rows:
+                    ms = lambda v: f"{v:>8.0f}" if v is not None else f"{'-':>8}"
+                    print(f"  {r['gem'][:14]:<14} {r['tool'][:28]:<28} {r['calls']:>6} {ms(r['mean_ms'])} {ms(r['p95_ms'])} "
+                          f"{ms(r['max_ms'] or None)} {r['error_rate'] * 100:>6.1f} {r['redundant']:>6} {r['avg_result_bytes'] / 1024:>7.1f}")
+        elif args.command == "stats" and args.stats_command == "perf":
+            events = load_metrics(since=time.time() - parse_window(args.since))
+            if args.filter_command:
+                events = [e for e in events if e.get("command") == args.filter_command]
+            summary = aggregate_metrics(events)
+            if not summary:
+                print_msg("📭", f"No metrics recorded in the last {args.since}.")
+            else:
+                print_msg("📈", f"Performance over the last {args.since} ({len(events)} events, ms)")
+                print(f"  {'COMMAND':<12} {'PHASE':<22} {'N':>6} {'P50':>10} {'P95':>10} {'P99':>10}")
+                for row in summary:
+                    print(f"  {str(row['command']):<12} {str(row['phase']):<22} {row['count']:>6} "
+                          f"{row['p50']:>10.1f} {row['p95']:>10.1f} {row['p99']:>10.1f}")
+        elif args.command == "migrate-layout":
+            results = migrate_layout(config, args.layout)
+            moved, rewritten = sum(r["moved"] for r in results), sum(r["rewritten"] for r in results)
+            for r in results:
+                if r["moved"] or r["rewritten"]:
+                    print(f"  {r['persona']}/{r['project']}: {r['moved']} files moved, {r['rewritten']} ledger entries updated")
+            print_msg("✅", f"Layout '{args.layout}': {moved} files moved, {rewritten} ledger entries updated in {len(results)} projects.")
+            if session_layout(config) != args.layout:
+                print_msg("💡", f"Set GEMONADE_SESSION_LAYOUT=\"{args.layout}\" in ~/.gemonade_config so new sessions follow it.")
+        elif args.command == "sync":
+            if args.sync_command == "export":
+                result = sync_export(config, args.bundle, args.peer, args.full)
+                print_msg("📤", f"Exported {result['files']} changed files ({result['bytes'] / 1024:.1f} KB, "
+                                f"bundle {result['bundle_bytes'] / 1024:.1f} KB) to {result['bundle']}")
+            elif args.sync_command == "import":
+                result = sync_import(config, args.bundle, args.peer)
+                print_msg("📥", f"Imported {result['written']} files ({result['unchanged']} unchanged), "
+                                f"merged {result['merged_entries']} ledger entries.")
+                for rel in result["conflicts"]:
+                    print_msg("⚠️", f"Changed on both machines, kept local: {rel} (incoming saved as .sync-conflict)")
+                if result["acked"]:
+                    print_msg("🤝", f"Peer '{args.peer}' acknowledged export {result['acked']}.")
+            elif args.sync_command == "ack":
+                acked = sync_ack(args.peer, args.bundle_id)
+                if not acked:
+                    print_err(f"No pending export for peer '{args.peer}'" + (f" with id {args.bundle_id}." if args.bundle_id else "."))
+                    sys.exit(1)
+                print_msg("🤝", f"Peer '{args.peer}' baseline advanced to export {acked}.")
+            else:
+                plan = sync_plan(config, args.peer)
+                print_msg("🔄", f"{len(plan)} files pending for peer '{args.peer}'")
+                for rel, entry, mode, offset in plan[:50]:
+                    print(f"  {mode:<6} {(entry['size'] - offset) / 1024:>8.1f} KB  {rel}")
+        elif args.command == "history":
+            rows = history(args.gem, args.project, config, clusters=args.clusters)
+            if not rows: print_msg("📭", f"No sessions recorded for '{args.gem}' in this project.")
+            elif args.clusters:
+                print_msg("🧩", f"{len(rows)} themes across {sum(c['size'] for c in rows)} sessions")
+                for cluster in rows[:args.limit]:
+                    print(f"  [{cluster['size']:>3}] {cluster['topic']}  (latest: {cluster['latest']})")
+                    if cluster["size"] > 1:
+                        for entry in cluster["entries"][-3:-1][::-1]:
+                            print(f"         · {entry.get('display_date', '')}: {entry.get('topic', '')}")
+            else:
+                for entry in rows[-args.limit:]:
+                    print(f"  - {entry.get('display_date', ''):<40} {entry.get('topic', '')}  ({entry.get('file', '')})")
+        elif args.command == "tool" and args.tool_command == "run":
+            malformed = [p for p in args.params if "=" not in p]
+            if malformed:
+                parser.error(f"tool arguments must be key=value, got: {' '.join(malformed)}")
+            params = dict(p.split("=", 1) for p in args.params)
+            result = run_gem_tool(args.gem, args.tool, params, config, use_cache=not args.no_cache)
+            sys.stdout.write(result["stdout"])
+            sys.stderr.write(result["stderr"])
+            if result["returncode"]: sys.exit(result["returncode"])
+        elif args.command == "tool":
+            rows = tool_cache_report(args.gem)
+            if not rows: print_msg("📭", "No cached tool calls recorded.")
+            else:
+                print_msg("🧰", "Tool result cache")
+                print(f"  {'GEM':<20} {'TOOL':<24} {'HITS':>6} {'MISSES':>7} {'HIT%':>6} {'SAVED':>9}")
+                for r in rows:
+                    print(f"  {r['gem']:<20} {r['tool']:<24} {r['hits']:>6} {r['misses']:>7} {r['hit_rate']:>6.0%} {r['saved_s']:>8.1f}s")
+        elif args.command == "daemon":
+            if args.action == "serve":
+                serve_daemon(replace=args.replace)
+            elif args.action == "start":
+                status = start_daemon()
+                print_msg("🔥", f"gemonade-daemon running (pid {status['pid']}) on {daemon_socket_path()}")
+            elif args.action == "stop":
+                if daemon_request({"op": "stop"}) is None: print_msg("💤", "gemonade-daemon is not running.")
+                else: print_msg("🛑", "gemonade-daemon stopped.")
+            else:
+                status = daemon_request({"op": "ping"})
+                if status is None: print_msg("💤", "gemonade-daemon is not running (commands run in-process).")
+                else:
+                    print_msg("🔥", f"gemonade-daemon pid {status['pid']}, up {status['uptime']}s")
+                    print(f"   Cache: {status['cache_entries']} entries, {status['hits']} hits / {status['misses']} misses")
     except Exception as e:
         print_err(str(e))
         sys.exit(1)
+    finally:
+        # Long-lived processes (daemon, queue worker) have no meaningful total
+        if args.command and args.command not in ("daemon", "jobs"):
+            record_metric(args.command, "total", time.perf_counter() - started)
 
 if __name__ == "__main__":
     main()
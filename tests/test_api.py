@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+import core
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+class TestPublicAPI(BaseGemonadeTest):
+    """The structured API exported by the `core` package, called in-process."""
+
+    def test_resolve_persona(self):
+        info = core.resolve_persona("smoke-gem", self.config)
+        self.assertEqual(info["category"], "local")
+        self.assertEqual(info["manifest"]["version"], "0.1.0")
+        self.assertTrue(info["persona_file"].endswith("local/smoke-gem/persona.md"))
+        with self.assertRaises(FileNotFoundError):
+            core.resolve_persona("ghost", self.config)
+        with self.assertRaises(ValueError):
+            core.resolve_persona("../etc", self.config)
+
+    def test_list_gems(self):
+        gems = core.list_gems(self.config)
+        self.assertEqual(set(gems), {"LOCAL", "INSTALLED", "CORE"})
+        self.assertEqual([g["name"] for g in gems["LOCAL"]], ["smoke-gem"])
+        self.assertIn("Be a dummy.", gems["LOCAL"][0]["description"])
+
+    def test_install_update_uninstall_are_silent(self):
+        source = self.create_gem(self.temp_env, "api-gem", "Embedded")
+        with mock.patch("builtins.print") as printed:
+            result = core.install(str(source), self.config)
+            updated = core.update("api-gem", self.config)
+        printed.assert_not_called()
+        self.assertEqual(result["name"], "api-gem")
+        self.assertEqual(result["receipt"]["source"]["type"], "path")
+        self.assertEqual(updated["method"], "reinstall")
+
+        self.assertTrue(core.uninstall("api-gem", self.config)["removed"])
+        self.assertFalse(core.uninstall("api-gem", self.config)["removed"])
+
+    def test_quiet_is_scoped_to_the_calling_thread(self):
+        import threading
+        entered, release = threading.Event(), threading.Event()
+        def quiet_caller():
+            with gemonade.quiet():
+                entered.set()
+                release.wait(5)
+        worker = threading.Thread(target=quiet_caller)
+        worker.start()
+        entered.wait(5)
+        with mock.patch("builtins.print") as printed:
+            gemonade.print_msg("✅", "still visible")
+        release.set()
+        worker.join()
+        printed.assert_called_once()
+
+    def test_session_state_and_recap(self):
+        state = core.build_session_state("smoke-gem", "api-proj", "project", self.config)
+        self.assertEqual(state["project_context"], "api-proj")
+        self.assertIn("Be a dummy.", state["system_prompt_content"])
+
+        self.assertEqual(core.recap("smoke-gem", "api-proj", self.config), [])
+        ledger = self.knowledge_dir / "sessions" / "smoke-gem" / "api-proj" / "history.jsonl"
+        for i in range(3):
+            gemonade.append_ledger_entry(ledger, {"date": f"2026010{i + 1}_1200", "display_date": f"Jan {i + 1}",
+                                                  "file": f"session_{i}.md", "topic": f"Topic {i}"})
+        entries = core.recap("smoke-gem", "api-proj", self.config, limit=2)
+        self.assertEqual([e["file"] for e in entries], ["session_1.md", "session_2.md"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import json
+from tests.test_helper import BaseGemonadeTest
+from tools import benchmark
+
+class TestBenchmarkHarness(BaseGemonadeTest):
+
+    PARAMS = {"gems": 6, "personas": 1, "projects": 2, "sessions": 10, "ledger_lines": 50, "log_mb": 0.05}
+
+    def test_sandbox_generation(self):
+        """The synthetic tree has the requested shape."""
+        sandbox = benchmark.build_sandbox(self.temp_env / "bench", self.PARAMS)
+        self.assertEqual(len(list((sandbox / "packages").glob("*/*/persona.md"))), 7)
+        self.assertEqual(len(list((sandbox / "knowledge" / "sessions").glob("*/*/session_*.md"))), 10)
+        ledger = sandbox / "knowledge" / "sessions" / benchmark.HOT_PERSONA / benchmark.HOT_PROJECT / "history.jsonl"
+        self.assertEqual(len(ledger.read_text().splitlines()), 50)
+        self.assertGreater(len(json.loads((sandbox / "session-bench.json").read_text())["messages"]), 0)
+
+    def test_benchmarks_run_against_sandbox(self):
+        """Commands run isolated from the real HOME and report timings."""
+        sandbox = benchmark.build_sandbox(self.temp_env / "bench", self.PARAMS)
+        results = benchmark.run_benchmarks(sandbox, repeat=1, only=["list", "search"])
+        self.assertEqual(set(results), {"list", "search"})
+        self.assertGreater(results["list"]["median_s"], 0)
+
+    def test_regression_threshold(self):
+        """Only slowdowns beyond threshold plus slack are reported."""
+        baseline = {"results": {"list": {"median_s": 1.0}, "reindex": {"median_s": 1.0}}}
+        current = {"list": {"median_s": 1.2}, "reindex": {"median_s": 1.5}, "search": {"median_s": 9.0}}
+        regressions = benchmark.compare_to_baseline(current, baseline, threshold=0.25, slack_s=0.0)
+        self.assertEqual([r["benchmark"] for r in regressions], ["reindex"])
+
+if __name__ == "__main__":
+    unittest.main()
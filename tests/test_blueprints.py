@@ -0,0 +1,85 @@
+import sys
+import json
+import unittest
+import subprocess
+from tests.test_helper import BaseGemonadeTest, PROJECT_ROOT
+from core import gemonade
+
+READER = PROJECT_ROOT / "tools" / "blueprint.py"
+
+GUIDE = """# AWS Guide
+Intro text.
+
+## Least Privilege
+Grant only what is needed. {{BLUEPRINT: shared/policies#review}}
+
+```bash
+# not a heading
+aws iam list-roles
+```
+
+## Least Privilege
+Second section with the same title.
+"""
+
+class TestBlueprintIndex(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        src = self.create_gem(self.temp_env / "src", "aws", "Cloud help")
+        (src / "blueprints").mkdir()
+        (src / "blueprints" / "iam.md").write_text(GUIDE)
+        shared = self.create_gem(self.local_pkg, "shared", "Shared policies")
+        (shared / "blueprints").mkdir()
+        (shared / "blueprints" / "policies.md").write_text("# Policies\n## Review\nTwo approvals.\n")
+        gemonade.install(str(src), self.config)
+
+    def test_index_built_at_install(self):
+        index = gemonade.read_blueprint_index()
+        self.assertEqual(sorted(index["gems"]), ["aws", "shared"])
+        doc = index["gems"]["aws"]["files"][0]
+        self.assertEqual(doc["title"], "AWS Guide")
+        ids = [s["id"] for s in doc["sections"]]
+        self.assertEqual(ids, ["aws/iam#aws-guide", "aws/iam#least-privilege", "aws/iam#least-privilege-2"])
+        section = doc["sections"][1]
+        raw = GUIDE.encode()[section["offset"]:section["offset"] + section["length"]]
+        self.assertTrue(raw.startswith(b"## Least Privilege\nGrant"))
+        self.assertIn(b"aws iam list-roles", raw)
+
+        self.assertEqual(gemonade.resolve_blueprint_ref(index, "shared/policies#review"), "shared/policies#review")
+        self.assertEqual(gemonade.resolve_blueprint_ref(index, "iam#least-privilege", "aws"), "aws/iam#least-privilege")
+        self.assertIsNone(gemonade.resolve_blueprint_ref(index, "#nowhere"))
+        self.assertIn(":#nowhere", index["refs"])
+
+    def test_prompt_carries_toc_only(self):
+        state = gemonade.build_session_state("aws", "p", "project", self.config)
+        prompt = state["system_prompt_content"]
+        self.assertIn("`aws/iam#least-privilege` Least Privilege", prompt)
+        self.assertNotIn("Grant only what is needed", prompt)
+
+    def test_reader_serves_sections_and_follows_edits(self):
+        result = subprocess.run([sys.executable, str(READER), "aws/iam#least-privilege"],
+                                env=self.env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Grant only what is needed. [see `blueprint.py shared/policies#review`]", result.stdout)
+        self.assertNotIn("Second section", result.stdout)
+        self.assertIn("aws:shared/policies#review", json.loads(gemonade.blueprint_index_path().read_text())["refs"])
+
+        # Edited after indexing: the stale offset is detected by hash and the gem re-indexed
+        policies = self.local_pkg / "shared" / "blueprints" / "policies.md"
+        policies.write_text("# Policies\nPreamble grew.\n## Review\nThree approvals.\n")
+        index = gemonade.read_blueprint_index()
+        _, text, fresh = gemonade.read_blueprint_section(index, "shared/policies#review", self.config)
+        self.assertEqual(text, "## Review\nThree approvals.\n")
+        self.assertEqual(fresh, gemonade.read_blueprint_index())
+
+        # The reader re-indexes the same way and leaves the fresh index on disk
+        policies.write_text("# Policies\nPreamble grew again.\n## Review\nFour approvals.\n")
+        result = subprocess.run([sys.executable, str(READER), "aws/iam#least-privilege", "shared/policies#review"],
+                                env=self.env, capture_output=True, text=True)
+        self.assertIn("Four approvals.", result.stdout)
+        on_disk = gemonade.read_blueprint_index()["gems"]["shared"]
+        self.assertEqual(on_disk["fingerprint"], gemonade._blueprint_fingerprint(self.local_pkg / "shared"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import json
+import os
+import sys
+import time
+import subprocess
+from tests.test_helper import BaseGemonadeTest, PROJECT_ROOT
+from core import gemonade
+
+CLIENT = PROJECT_ROOT / "core" / "daemon_client.py"
+
+class TestGemonadeDaemon(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config = gemonade.load_config(self.config_file)
+        result = self.run_cli(["daemon", "start"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def tearDown(self):
+        self.run_cli(["daemon", "stop"])
+        super().tearDown()
+
+    def test_status_reports_running(self):
+        """The daemon answers pings on its socket."""
+        result = self.run_cli(["daemon", "status"])
+        self.assertIn("gemonade-daemon pid", result.stdout)
+
+    def test_list_served_and_invalidated(self):
+        """Registry answers come from the daemon and track new gems."""
+        gems = gemonade.daemon_request({"op": "list", "config": self.config})
+        self.assertIn("smoke-gem", [g[0] for g in gems["LOCAL"]])
+
+        self.create_gem(self.local_pkg, "late-gem", "Arrived later.")
+        result = self.run_cli(["list"])
+        self.assertIn("late-gem", result.stdout)
+
+    def test_dry_run_matches_in_process(self):
+        """A daemon-built session state matches the in-process one."""
+        result = self.run_cli(["run", "smoke-gem", "--project=test-proj", "--dry-run"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        via_daemon = json.loads(result.stdout)
+
+        env = dict(self.env, GEMONADE_NO_DAEMON="1")
+        local = self.run_cli(["run", "smoke-gem", "--project=test-proj", "--dry-run"], env=env)
+        in_process = json.loads(local.stdout)
+        self.assertEqual(via_daemon["system_prompt_content"], in_process["system_prompt_content"])
+        self.assertEqual(via_daemon["env"]["PATH"], in_process["env"]["PATH"])
+
+    def test_daemon_errors_surface_to_client(self):
+        """Unknown personas fail the same way as in-process runs."""
+        result = self.run_cli(["run", "missing-gem", "--dry-run"])
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("Persona 'missing-gem' not found.", result.stderr)
+
+    def run_client(self, args):
+        """Runs the thin client and reports whether it had to import the full core."""
+        script = (f"import sys; sys.path.insert(0, {str(CLIENT.parent)!r}); sys.argv = ['gemonade'] + {args!r}\n"
+                  "import daemon_client\n"
+                  "try: daemon_client.main(sys.argv[1:])\n"
+                  "finally: print('core imported' if 'gemonade' in sys.modules else 'thin', file=sys.stderr)")
+        return subprocess.run([sys.executable, "-c", script], env=self.env, capture_output=True, text=True)
+
+    def test_thin_client_served_without_core(self):
+        """list and run --dry-run are answered by the daemon without importing the core."""
+        result = self.run_client(["list"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("smoke-gem", result.stdout)
+        self.assertIn("thin", result.stderr)
+        self.assertEqual(result.stdout, self.run_cli(["list"], env=dict(self.env, GEMONADE_NO_DAEMON="1")).stdout)
+
+        result = self.run_client(["smoke-gem", "--project=test-proj", "--dry-run"])
+        self.assertEqual(json.loads(result.stdout)["project_context"], "test-proj")
+        self.assertIn("thin", result.stderr)
+
+        result = self.run_client(["missing-gem", "--dry-run"])
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Persona 'missing-gem' not found.", result.stderr)
+
+    def test_stale_daemon_is_replaced(self):
+        """A daemon started before the code changed is restarted; the command itself runs in-process."""
+        old_pid = gemonade.daemon_request({"op": "ping"})["pid"]
+        st = CLIENT.stat()
+        os.utime(CLIENT, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        try:
+            result = self.run_client(["list"])
+            self.assertIn("smoke-gem", result.stdout)
+            self.assertIn("core imported", result.stderr)
+            deadline = time.time() + 5
+            status = None
+            while time.time() < deadline:
+                status = gemonade.daemon_request({"op": "ping"})
+                if status and status["pid"] != old_pid:
+                    break
+                time.sleep(0.05)
+            self.assertNotEqual(status and status["pid"], old_pid)
+            self.assertEqual(status["version"], gemonade.daemon_client.code_version())
+        finally:
+            os.utime(CLIENT, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import subprocess
+from unittest import mock
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+class TestProjectDigest(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.repo = self.temp_env / "webapp"
+        (self.repo / "src").mkdir(parents=True)
+        (self.repo / "src" / "app.py").write_text("print('hi')\n")
+        (self.repo / "README.md").write_text("# webapp\n")
+        self.git("init", "-q", "-b", "main")
+        self.git("config", "user.email", "t@example.com")
+        self.git("config", "user.name", "Tester")
+        self.commit("Initial layout")
+
+    def git(self, *args):
+        subprocess.run(["git"] + list(args), cwd=self.repo, check=True, capture_output=True)
+
+    def commit(self, message):
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message)
+
+    def test_pure_python_git_reads(self):
+        """HEAD and tracked paths are read without spawning git."""
+        git_dir = gemonade.resolve_git_dir(self.repo)
+        branch, sha = gemonade.read_git_head(git_dir)
+        expected = subprocess.run(["git", "rev-parse", "HEAD"], cwd=self.repo, capture_output=True, text=True).stdout.strip()
+        self.assertEqual((branch, sha), ("main", expected))
+        self.assertEqual(sorted(gemonade.read_git_index_paths(git_dir)), ["README.md", "src/app.py"])
+
+    def test_worktree_reads_shared_refs(self):
+        """A worktree's branch ref (loose or packed) lives in the main git dir."""
+        tree = self.temp_env / "webapp-feature"
+        self.git("worktree", "add", "-q", "-b", "feature", str(tree))
+        self.git("pack-refs", "--all")
+        git_dir = gemonade.resolve_git_dir(tree)
+        expected = subprocess.run(["git", "rev-parse", "HEAD"], cwd=tree, capture_output=True, text=True).stdout.strip()
+        self.assertEqual(gemonade.read_git_head(git_dir), ("feature", expected))
+
+        (tree / "new.txt").write_text("x\n")
+        subprocess.run(["git", "add", "-A"], cwd=tree, check=True)
+        subprocess.run(["git", "commit", "-q", "-m", "Feature work"], cwd=tree, check=True, capture_output=True)
+        expected = subprocess.run(["git", "rev-parse", "HEAD"], cwd=tree, capture_output=True, text=True).stdout.strip()
+        self.assertEqual(gemonade.read_git_head(git_dir), ("feature", expected))
+
+    def test_cache_hit_and_incremental_rebuild(self):
+        """Unchanged HEAD reuses the cache; a new commit refreshes commits and changed files."""
+        digest = gemonade.build_project_digest(self.repo)
+        self.assertIn("src/ (1 files)", digest["layout"])
+        gemonade.mark_digest_session(self.repo)
+
+        with mock.patch.object(gemonade, "_git_lines", side_effect=AssertionError("git spawned")):
+            self.assertEqual(gemonade.build_project_digest(self.repo)["head"], digest["head"])
+
+        (self.repo / "src" / "db.py").write_text("DB = 1\n")
+        self.commit("Add database module")
+        digest = gemonade.build_project_digest(self.repo)
+        self.assertIn("src/ (2 files)", digest["layout"])
+        self.assertIn("Add database module", digest["commits"][0])
+        self.assertEqual(digest["changed_files"], ["src/db.py"])
+
+        text = gemonade.format_project_digest("webapp", digest)
+        self.assertIn("# 🗺️ Project Digest: webapp @ main", text)
+        self.assertIn("## Changed Since Last Session\n- src/db.py", text)
+
+    def test_session_state_opt_in(self):
+        """The digest is only injected when requested and the repo matches the project."""
+        state = gemonade.build_session_state("smoke-gem", None, "project", self.config, cwd=self.repo)
+        self.assertNotIn("Project Digest", state["system_prompt_content"])
+
+        state = gemonade.build_session_state("smoke-gem", None, "project", self.config, cwd=self.repo, digest=True)
+        self.assertIn("Project Digest: webapp", state["system_prompt_content"])
+        self.assertEqual(state["digest_repo"], str(self.repo))
+
+        state = gemonade.build_session_state("smoke-gem", "other", "project", self.config, cwd=self.repo, digest=True)
+        self.assertNotIn("Project Digest", state["system_prompt_content"])
+
+if __name__ == "__main__":
+    unittest.main()
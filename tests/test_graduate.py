@@ -0,0 +1,89 @@
+import unittest
+import json
+from unittest import mock
+from tests.test_helper import BaseGemonadeTest
+from tools import gem_2_extension
+
+class TestGemGraduation(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.gem = self.local_pkg / "smoke-gem"
+        (self.gem / "tools" / "scan.py").write_text("print('scan')\n")
+        (self.gem / "blueprints").mkdir()
+        (self.gem / "blueprints" / "guide.md").write_text("# Guide\n")
+        self.target = self.temp_env / "graduates" / "smoke-gem"
+
+    def test_sync_creates_extension(self):
+        """A first sync produces the full extension layout."""
+        summary = gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        self.assertIn("gemini-extension.json", summary["regenerated"])
+        self.assertIn("GEMINI.md", summary["regenerated"])
+        self.assertIn("tools/scan.py", summary["copied"])
+        manifest = json.loads((self.target / "gemini-extension.json").read_text())
+        self.assertEqual(manifest["name"], "smoke-gem")
+        self.assertFalse((self.target / "persona.md").exists())
+
+    def test_sync_is_incremental(self):
+        """Only changed, added or removed files are touched on re-sync."""
+        gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+
+        summary = gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        self.assertEqual(summary, {"copied": [], "removed": [], "regenerated": []})
+
+        (self.gem / "tools" / "scan.py").write_text("print('scan v2')\n")
+        (self.gem / "blueprints" / "guide.md").unlink()
+        summary = gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        self.assertEqual(summary["copied"], ["tools/scan.py"])
+        self.assertEqual(summary["removed"], ["blueprints/guide.md"])
+        self.assertEqual(summary["regenerated"], [])
+        self.assertFalse((self.target / "blueprints").exists())
+        self.assertIn("v2", (self.target / "tools" / "scan.py").read_text())
+
+    def test_persona_change_regenerates_context(self):
+        """Editing persona.md refreshes GEMINI.md without rewriting the manifest."""
+        gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        (self.gem / "persona.md").write_text("# smoke-gem\n- **Objective:** Be sharper.")
+        summary = gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        self.assertEqual(summary["regenerated"], ["GEMINI.md"])
+        self.assertIn("sharper", (self.target / "GEMINI.md").read_text())
+
+    def test_untracked_files_are_preserved(self):
+        """Files the sync never wrote are left alone."""
+        gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        (self.target / "notes.txt").write_text("mine")
+        gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        self.assertTrue((self.target / "notes.txt").exists())
+
+    def test_sync_state_is_not_shipped(self):
+        """The sync state lives next to the graduate, and a legacy in-tree copy is moved out."""
+        (self.target).mkdir(parents=True)
+        (self.target / gem_2_extension.LEGACY_SYNC_STATE_FILE).write_text(json.dumps({"files": {}, "sources": {}}))
+        gem_2_extension.sync_extension(self.gem, self.target, verbose=False)
+        self.assertFalse((self.target / gem_2_extension.LEGACY_SYNC_STATE_FILE).exists())
+        self.assertEqual([p.name for p in self.target.glob(".*")], [])
+        self.assertTrue(gem_2_extension.sync_state_path(self.target).exists())
+
+    def test_watch_survives_a_half_saved_manifest(self):
+        """A broken gem.json or a vanished file is reported and retried, not fatal."""
+        manifest = self.gem / "gem.json"
+        good = manifest.read_text()
+        ticks = []
+        def tick(_):
+            ticks.append(1)
+            if len(ticks) == 1:
+                manifest.write_text("{")
+            elif len(ticks) == 2:
+                manifest.write_text(good)
+                (self.gem / "tools" / "scan.py").write_text("print('scan v2')\n")
+            else:
+                raise KeyboardInterrupt
+        with mock.patch.object(gem_2_extension.time, "sleep", side_effect=tick), \
+                mock.patch.object(gem_2_extension, "hash_with_state",
+                                  side_effect=[FileNotFoundError("scan.py")] + [mock.DEFAULT] * 50,
+                                  wraps=gem_2_extension.hash_with_state):
+            gem_2_extension.watch_gem(self.gem, self.target.parent, interval=0)
+        self.assertIn("v2", (self.target / "tools" / "scan.py").read_text())
+
+if __name__ == "__main__":
+    unittest.main()
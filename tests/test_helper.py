@@ -10,6 +10,8 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from core import gemonade
+
 class BaseGemonadeTest(unittest.TestCase):
     def setUp(self):
         """Setup a localized Gemonade environment for each test."""
@@ -40,15 +42,26 @@ class BaseGemonadeTest(unittest.TestCase):
             f.write(f'G_CORE_PERSONA="{PROJECT_ROOT}/core/CORE_PERSONA.md"\n')
             f.write(f'G_SAVER_SCRIPT="{PROJECT_ROOT}/tools/save_session.py"\n')
 
-        # Environment Overrides
+        # Environment Overrides (load_config exports into os.environ)
+        self._orig_environ = os.environ.copy()
         self.env = os.environ.copy()
         self.env["HOME"] = str(self.temp_env)
+
+        # In-process calls must not touch the real ~/.gemonade
+        self._orig_state_dir = gemonade.STATE_DIR
+        gemonade.STATE_DIR = self.temp_env / ".gemonade"
         
         # Dummy Gem
         self.create_gem(self.local_pkg, "smoke-gem", "Be a dummy.")
 
+        # Config for in-process API calls (no CLI spawn needed)
+        self.config = gemonade.load_config(self.config_file)
+
     def tearDown(self):
         """Cleanup."""
+        gemonade.STATE_DIR = self._orig_state_dir
+        os.environ.clear()
+        os.environ.update(self._orig_environ)
         if self.temp_env.exists():
             shutil.rmtree(self.temp_env)
 
@@ -65,8 +78,8 @@ class BaseGemonadeTest(unittest.TestCase):
         return gem_dir
 
 
-    def run_cli(self, args):
+    def run_cli(self, args, env=None):
         """Helper to run the core CLI via subprocess."""
         cli_path = PROJECT_ROOT / "core" / "gemonade.py"
         cmd = [sys.executable, str(cli_path)] + args
-        return subprocess.run(cmd, env=self.env, capture_output=True, text=True)
+        return subprocess.run(cmd, env=env or self.env, capture_output=True, text=True)
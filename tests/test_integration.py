@@ -14,6 +14,30 @@ class TestGemonadeIntegration(BaseGemonadeTest):
         self.assertEqual(state["project_context"], "test-proj")
         self.assertEqual(state["scope"], "global")
         self.assertIn("Active Access Scope: GLOBAL", state["system_prompt_content"])
+        self.assertEqual(state["command"][-1], state["knowledge_view"])
+        self.assertNotEqual(state["knowledge_view"], str(self.knowledge_dir))
+
+    def test_run_with_composite(self):
+        """Verify '--with' merges personas with a single core header."""
+        self.create_gem(self.local_pkg, "co-gem", "Be a co-pilot.")
+        result = self.run_cli(["run", "smoke-gem", "--with", "co-gem", "--project=test-proj", "--dry-run"])
+        self.assertEqual(result.returncode, 0)
+
+        state = json.loads(result.stdout)
+        prompt = state["system_prompt_content"]
+        self.assertEqual(state["personas"], ["smoke-gem", "co-gem"])
+        self.assertEqual(prompt.count("Active Access Scope"), 1)
+        self.assertIn("Be a co-pilot.", prompt)
+        self.assertIn("Be a dummy.", prompt)
+
+    def test_stats_perf(self):
+        """Commands record timings that 'stats perf' aggregates."""
+        self.run_cli(["list"])
+        self.run_cli(["run", "smoke-gem", "--project=test-proj", "--dry-run"])
+        result = self.run_cli(["stats", "perf", "--since", "1h"])
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("build_session", result.stdout)
+        self.assertIn("list", result.stdout)
 
     def test_install_lifecycle(self):
         """Test full install/uninstall via CLI."""
@@ -0,0 +1,99 @@
+import unittest
+import json
+import os
+import hashlib
+from datetime import datetime, timezone
+from unittest import mock
+from tests.test_helper import BaseGemonadeTest, PROJECT_ROOT
+from core import gemonade
+
+class TestGemonadeJobs(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config = gemonade.load_config(self.config_file)
+        self.session_dir = self.knowledge_dir / "sessions" / "smoke-gem" / "test-proj"
+        self.session_dir.mkdir(parents=True)
+        self.log_file = self.temp_env / "session-test.json"
+        self.log_file.write_text(json.dumps({
+            "sessionId": "abc123",
+            "startTime": "2026-01-02T03:04:05Z",
+            "messages": [
+                {"type": "user", "content": "Refactor the parser"},
+                {"type": "gemini", "content": "Done."}
+            ]
+        }))
+
+    def test_save_pipeline(self):
+        """A queued save renders Markdown and records the ledger via follow-up jobs."""
+        gemonade.enqueue_job("save", {
+            "session_dir": str(self.session_dir), "project": "test-proj",
+            "saver": str(PROJECT_ROOT / "tools" / "save_session.py"), "log_file": str(self.log_file)
+        })
+        processed = gemonade.drain_jobs(self.config)
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(len(list(self.session_dir.glob("session_*.md"))), 1)
+        ledger = (self.session_dir / "history.jsonl").read_text().splitlines()
+        self.assertEqual(len(ledger), 1)
+        self.assertEqual(json.loads(ledger[0])["topic"], "Refactor the parser")
+        self.assertEqual([j["kind"] for j in gemonade.list_jobs("done")], ["save", "ledger", "index"])
+
+    def test_ledger_job_is_idempotent(self):
+        """Retried ledger jobs do not duplicate entries."""
+        entry = {"date": "20260102_0304", "file": "session_x.md", "topic": "t"}
+        for _ in range(2):
+            gemonade.enqueue_job("ledger", {"session_dir": str(self.session_dir), "entry": entry})
+        gemonade.drain_jobs(self.config)
+        self.assertEqual(len((self.session_dir / "history.jsonl").read_text().splitlines()), 1)
+
+    def test_save_job_pins_the_chat_log(self):
+        """The save payload names the log the chat wrote, even without live capture."""
+        tmp_dir = self.temp_env / ".gemini" / "tmp"
+        chats = tmp_dir / hashlib.sha256(os.getcwd().encode()).hexdigest() / "chats"
+        chats.mkdir(parents=True)
+        def chat(cmd, env=None):
+            started = datetime.now(timezone.utc).isoformat()
+            (chats / "session-new.json").write_text(json.dumps({"sessionId": "new", "startTime": started}))
+        self.config["GEMONADE_LIVE_CAPTURE"] = "off"
+        with mock.patch.object(gemonade, "GEMINI_TMP_DIR", str(tmp_dir)), \
+                mock.patch.object(gemonade, "daemon_request", return_value=None), \
+                mock.patch.object(gemonade.subprocess, "run", side_effect=chat), \
+                mock.patch.object(gemonade, "spawn_job_worker"):
+            gemonade.run_persona("smoke-gem", None, "project", self.config)
+        saves = [j for j in gemonade.list_jobs("pending") if j["kind"] == "save"]
+        self.assertEqual(saves[0]["payload"]["log_file"], str(chats / "session-new.json"))
+
+    def test_failures_retry_then_park(self):
+        """Failing jobs back off, retry, and end up in failed/."""
+        calls = []
+        def flaky(payload, config):
+            calls.append(payload)
+            raise RuntimeError("boom")
+        gemonade.JOB_HANDLERS["flaky"] = flaky
+        try:
+            gemonade.enqueue_job("flaky", {"n": 1}, max_attempts=2)
+            gemonade.drain_jobs(self.config, wait=False)
+            pending = gemonade.list_jobs("pending")
+            self.assertEqual(pending[0]["attempts"], 1)
+            self.assertIn("boom", pending[0]["error"])
+
+            # Skip the backoff and let the second attempt fail for good
+            job_path = gemonade.jobs_dir() / "pending" / f"{pending[0]['id']}.json"
+            job_path.write_text(json.dumps(dict(pending[0], not_before=0)))
+            gemonade.drain_jobs(self.config, wait=False)
+        finally:
+            del gemonade.JOB_HANDLERS["flaky"]
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(gemonade.list_jobs("pending"), [])
+        self.assertEqual(len(gemonade.list_jobs("failed")), 1)
+
+    def test_jobs_status_command(self):
+        """'gemonade jobs' summarizes the queue."""
+        result = self.run_cli(["jobs"])
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("Job queue:", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
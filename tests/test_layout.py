@@ -0,0 +1,100 @@
+import sys
+import json
+import threading
+import unittest
+import subprocess
+from tests.test_helper import BaseGemonadeTest, PROJECT_ROOT
+from core import gemonade
+
+SAVER = PROJECT_ROOT / "tools" / "save_session.py"
+
+class TestSessionLayout(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.project_dir = self.knowledge_dir / "sessions" / "smoke-gem" / "p"
+
+    def save(self, session_id, start):
+        log = self.temp_env / "logs" / f"{session_id}.json"
+        log.parent.mkdir(parents=True, exist_ok=True)
+        log.write_text(json.dumps({"sessionId": session_id, "startTime": start, "messages": [
+            {"type": "user", "content": f"Task {session_id}"},
+            {"type": "gemini", "content": "done", "toolCalls": [{"name": "run_shell_command", "args": {"command": "ls"}}]}]}))
+        result = subprocess.run([sys.executable, str(SAVER), str(self.project_dir), "--project", "p", "--log-file", str(log)],
+                                env=self.env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def ledger(self, name="history.jsonl"):
+        return [json.loads(line) for line in (self.project_dir / name).read_text().splitlines()]
+
+    def test_monthly_layout_for_new_sessions(self):
+        with open(self.config_file, "a") as f:
+            f.write('GEMONADE_SESSION_LAYOUT="monthly"\n')
+        self.save("aaaa0001", "2026-03-04T05:06:07Z")
+        self.assertTrue((self.project_dir / "2026" / "03" / "session_20260304_050607_aaaa0001.md").exists())
+        self.assertTrue((self.project_dir / "2026" / "03" / "session_20260304_050607_aaaa0001.resume.json").exists())
+        self.assertEqual(self.ledger()[0]["file"], "2026/03/session_20260304_050607_aaaa0001.md")
+        self.assertEqual(gemonade.find_resume_pack(self.config).parent, self.project_dir / "2026" / "03")
+
+        result = self.run_cli(["resume", "--project", "p", "--dry-run"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout)["persona"], "smoke-gem")
+
+    def test_migration_is_resumable_and_keeps_references(self):
+        self.save("bbbb0001", "2026-01-31T23:00:00Z")
+        self.save("bbbb0002", "2026-02-01T08:00:00Z")
+        # An interrupted earlier run already moved one session but not its sidecars or ledger
+        (self.project_dir / "2026" / "01").mkdir(parents=True)
+        (self.project_dir / "session_20260131_230000_bbbb0001.md").rename(
+            self.project_dir / "2026" / "01" / "session_20260131_230000_bbbb0001.md")
+        self.assertEqual(len(gemonade.iter_session_files(self.project_dir)), 2)
+
+        results = gemonade.migrate_layout(self.config, "monthly")
+        self.assertEqual(results, [{"persona": "smoke-gem", "project": "p", "moved": 5, "rewritten": 4}])
+        for entry in self.ledger() + self.ledger("history.terms.jsonl"):
+            self.assertTrue((self.project_dir / entry["file"]).exists(), entry["file"])
+        self.assertEqual(sorted(p.name for p in (self.project_dir / "2026" / "02").iterdir()),
+                         ["session_20260201_080000_bbbb0002.md", "session_20260201_080000_bbbb0002.resume.json",
+                          "session_20260201_080000_bbbb0002.tools.json"])
+        self.assertEqual(gemonade.migrate_layout(self.config, "monthly")[0]["moved"], 0)
+
+        result = self.run_cli(["migrate-layout", "--to", "flat"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertFalse((self.project_dir / "2026").exists())
+        self.assertEqual([e["file"] for e in self.ledger()],
+                         ["session_20260131_230000_bbbb0001.md", "session_20260201_080000_bbbb0002.md"])
+
+    def test_rewrite_does_not_lose_concurrent_appends(self):
+        ledger = self.temp_env / "history.jsonl"
+        ledger.write_text("")
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from core.gemonade import append_ledger_entry;"
+            "[append_ledger_entry(sys.argv[2], {'file': f'w{sys.argv[3]}_{i}.md'}) for i in range(50)]"
+        )
+        procs = [subprocess.Popen([sys.executable, "-c", script, str(PROJECT_ROOT), str(ledger), str(w)]) for w in range(4)]
+        while any(proc.poll() is None for proc in procs):
+            gemonade.rewrite_ledger(ledger, lambda e: dict(e, file=gemonade.session_relpath(e["file"], "flat"), seen=True))
+        self.assertEqual(len({json.loads(line)["file"] for line in ledger.read_text().splitlines()}), 200)
+
+    def test_replace_waits_for_the_ledger_lock(self):
+        """A re-index replaces the ledger and its term sidecar only while holding the lock appenders use."""
+        ledger = self.temp_env / "history.jsonl"
+        ledger.write_text(json.dumps({"file": "old.md"}) + "\n")
+        sidecar = ledger.with_name("history.terms.jsonl")
+        sidecar.write_text(json.dumps({"file": "old.md", "terms": {"stale": 1.0}}) + "\n")
+        with gemonade.locked_ledger(ledger):
+            replacer = threading.Thread(target=gemonade.replace_ledger,
+                                        args=(ledger, [{"file": "new.md", "topic": "Parser rewrite"}]))
+            replacer.start()
+            replacer.join(0.3)
+            self.assertTrue(replacer.is_alive())
+            self.assertIn("old.md", ledger.read_text())
+        replacer.join()
+        gemonade.append_ledger_entry(ledger, {"file": "later.md"})
+        self.assertEqual([e["file"] for e in gemonade.read_ledger(ledger)], ["new.md", "later.md"])
+        self.assertEqual(gemonade.read_ledger(sidecar), [{"file": "new.md", "terms": gemonade.term_vector(
+            {"topic": "Parser rewrite"})}])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import shutil
+import unittest
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+class TestInstallOptimization(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.source = self.create_gem(self.local_pkg, "fast-gem", "Be fast.")
+        (self.source / "tools" / "report.py").write_text("import json\nimport helper\nprint(json.dumps(helper.VALUE))\n")
+        (self.source / "tools" / "helper.py").write_text("VALUE = 1\n")
+
+    def test_install_writes_receipt_and_bytecode(self):
+        result = self.run_cli(["install", str(self.source)])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        installed = self.installed_pkg / "fast-gem"
+
+        receipt = json.loads((installed / gemonade.RECEIPT_FILE).read_text())
+        self.assertEqual(receipt["source"], {"type": "path", "path": str(self.source.resolve())})
+        self.assertEqual([e["name"] for e in receipt["entrypoints"]], ["helper.py", "report.py"])
+        self.assertEqual(receipt["entrypoints"][1]["kind"], "python")
+        self.assertTrue(receipt["dependency_fingerprint"])
+        self.assertTrue(list((installed / "tools" / "__pycache__").glob("helper.*.pyc")))
+
+    def test_prune_venv_keeps_top_level_modules(self):
+        site = self.source / ".venv" / "lib" / "python3.11" / "site-packages"
+        (site / "heavylib" / "tests").mkdir(parents=True)
+        (site / "heavylib" / "tests" / "test_big.py").write_text("x" * 1000)
+        (site / "heavylib" / "core.py").write_text("")
+        (site / "test").mkdir()  # a top-level module that happens to be named 'test'
+        (site / "heavylib-1.0.dist-info").mkdir()
+
+        self.assertEqual(gemonade.prune_venv(self.source), 1000)
+        self.assertFalse((site / "heavylib" / "tests").exists())
+        self.assertTrue((site / "heavylib" / "core.py").exists())
+        self.assertTrue((site / "test").exists())
+
+    def test_doctor_reports_footprint_and_drift(self):
+        self.run_cli(["install", str(self.source)])
+        shutil.rmtree(self.source)  # the local copy would shadow the installed one
+        result = self.run_cli(["doctor", "fast-gem"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Footprint", result.stdout)
+        self.assertIn("Receipt     : up to date", result.stdout)
+        self.assertIn("report.py", result.stdout)
+
+        (self.installed_pkg / "fast-gem" / "tools" / "helper.py").write_text("VALUE = 2\n")
+        result = self.run_cli(["doctor", "fast-gem"])
+        self.assertIn("changed since install: helper.py", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
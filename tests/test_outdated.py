@@ -0,0 +1,79 @@
+import json
+import time
+import unittest
+import subprocess
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+class TestOutdated(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.remote = self.temp_env / "remote.git"
+        self.work = self.temp_env / "work"
+        subprocess.run(["git", "init", "-q", "--bare", str(self.remote)], check=True)
+        self.create_gem(self.temp_env, "work", "Remote gem")
+        for args in (["init", "-q"], ["config", "user.email", "t@example.com"], ["config", "user.name", "T"],
+                     ["add", "-A"], ["commit", "-q", "-m", "v1"], ["push", "-q", str(self.remote), "HEAD"]):
+            self.git(*args)
+        self.first_commit = self.git("rev-parse", "HEAD").strip()
+
+    def git(self, *args):
+        return subprocess.run(["git"] + list(args), cwd=self.work, check=True, capture_output=True, text=True).stdout
+
+    def install_with_receipt(self, name, source):
+        dest = self.create_gem(self.installed_pkg, name, "Installed")
+        (dest / gemonade.RECEIPT_FILE).write_text(json.dumps({"name": name, "source": source}))
+        return dest
+
+    def test_concurrent_check_against_bare_repo(self):
+        git_source = {"type": "git", "url": str(self.remote), "commit": self.first_commit}
+        self.install_with_receipt("git-gem", git_source)
+        self.install_with_receipt("pinned-gem", dict(git_source))
+        self.install_with_receipt("missing-gem", {"type": "git", "url": str(self.temp_env / "nope.git"), "commit": "abc"})
+        self.create_gem(self.installed_pkg, "legacy-gem", "No receipt")
+
+        (self.work / "persona.md").write_text("# v2\n")
+        self.git("commit", "-qam", "v2")
+        self.git("push", "-q", str(self.remote), "HEAD")
+        latest = self.git("rev-parse", "HEAD").strip()
+        gemonade.atomic_write_text(self.installed_pkg / "pinned-gem" / gemonade.RECEIPT_FILE,
+                                   json.dumps({"source": dict(git_source, commit=latest)}))
+
+        results = {r["name"]: r for r in gemonade.check_outdated(self.config, timeout=10)}
+        self.assertEqual(results["git-gem"]["status"], "outdated")
+        self.assertEqual(results["git-gem"]["latest"], latest[:7])
+        self.assertEqual(results["pinned-gem"]["status"], "current")
+        self.assertEqual(results["missing-gem"]["status"], "error")
+        self.assertEqual(results["legacy-gem"]["status"], "unknown")
+
+        # 'run' reads the hint from the cache only
+        self.assertIn("gemonade update git-gem", gemonade.update_hint("git-gem", self.config))
+        self.assertIsNone(gemonade.update_hint("pinned-gem", self.config))
+
+    def test_stale_cache_queues_background_refresh(self):
+        self.install_with_receipt("path-gem", {"type": "path", "path": str(self.work)})
+        (self.work / "gem.json").write_text(json.dumps({"name": "work", "version": "0.2.0"}))
+        gemonade.STATE_DIR.mkdir(parents=True)
+        gemonade.outdated_cache_path().write_text(json.dumps({"checked_at": time.time() - 10 ** 6, "results": []}))
+
+        self.assertIsNone(gemonade.update_hint("path-gem", self.config))
+        self.assertEqual([j["kind"] for j in gemonade.list_jobs("pending")], ["outdated"])
+        gemonade.update_hint("path-gem", self.config)
+        self.assertEqual(len(gemonade.list_jobs("pending")), 1)
+
+        gemonade.drain_jobs(self.config)
+        results = gemonade.read_outdated_cache()["results"]
+        self.assertEqual(results[0]["name"], "path-gem")
+        self.assertEqual((results[0]["status"], results[0]["latest"]), ("outdated", "0.2.0"))
+
+    def test_update_reinstalls_from_receipt(self):
+        self.assertEqual(self.run_cli(["install", str(self.work)]).returncode, 0)
+        (self.work / "persona.md").write_text("# updated\n")
+
+        result = self.run_cli(["update", "work"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual((self.installed_pkg / "work" / "persona.md").read_text(), "# updated\n")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import json
+import subprocess
+from tests.test_helper import BaseGemonadeTest
+from tools import publish
+
+def git(args, cwd):
+    return subprocess.run(["git"] + args, cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+class TestGemPublish(BaseGemonadeTest):
+
+    def make_repo(self, name):
+        """Creates a Gem git repo tracking a local bare remote."""
+        remote = self.temp_env / "remotes" / f"{name}.git"
+        remote.mkdir(parents=True)
+        git(["init", "-q", "--bare"], remote)
+
+        gem = self.create_gem(self.local_pkg, name, f"{name} gem")
+        (gem / "tools" / ".gitkeep").touch()
+        git(["init", "-q"], gem)
+        git(["config", "user.email", "test@example.com"], gem)
+        git(["config", "user.name", "Test"], gem)
+        git(["add", "-A"], gem)
+        git(["commit", "-qm", "init"], gem)
+        git(["remote", "add", "origin", str(remote)], gem)
+        git(["push", "-qu", "origin", "HEAD"], gem)
+        return gem, remote
+
+    def test_plan_is_a_dry_run(self):
+        """--plan lists the actions without changing the Gem."""
+        gem, _ = self.make_repo("alpha")
+        plan = publish.plan_release(gem, "minor")
+        self.assertEqual(plan["new_version"], "0.2.0")
+        self.assertIn(["git", "push", "--follow-tags"], plan["actions"])
+        self.assertEqual(json.loads((gem / "gem.json").read_text())["version"], "0.1.0")
+        self.assertEqual(plan["actions"][-1][0], "sync-metadata")
+        self.assertNotIn("sync-metadata", [a[0] for a in publish.plan_release(gem, "minor", metadata_sync=False)["actions"]])
+
+    def test_failed_push_rolls_back(self):
+        """A rejected push leaves no local tag or bump commit behind."""
+        gem, remote = self.make_repo("alpha")
+        head = git(["rev-parse", "HEAD"], gem)
+        git(["remote", "set-url", "origin", str(self.temp_env / "missing.git")], gem)
+        with self.assertRaises(publish.PublishError):
+            publish.release_gem(gem, "patch", metadata_sync=None)
+        self.assertEqual(git(["tag"], gem), "")
+        self.assertEqual(git(["rev-parse", "HEAD"], gem), head)
+        self.assertEqual(json.loads((gem / "gem.json").read_text())["version"], "0.1.0")
+
+        git(["remote", "set-url", "origin", str(remote)], gem)
+        publish.release_gem(gem, "patch", metadata_sync=None)
+        self.assertIn("v0.1.1", git(["tag"], remote))
+
+    def test_push_that_landed_is_not_rolled_back(self):
+        """If the branch reached the remote but the tag was rejected, the local release is kept."""
+        gem, remote = self.make_repo("alpha")
+        hook = remote / "hooks" / "update"
+        hook.write_text('#!/bin/sh\ncase "$1" in refs/tags/*) exit 1;; esac\n')
+        hook.chmod(0o755)
+        with self.assertRaises(publish.PublishError) as ctx:
+            publish.release_gem(gem, "patch", metadata_sync=None)
+        self.assertTrue(ctx.exception.pushed)
+        self.assertEqual(git(["rev-parse", "HEAD"], gem), git(["rev-parse", "HEAD"], remote))
+        self.assertEqual(git(["tag"], gem), "v0.1.1")
+
+    def test_metadata_failure_is_a_warning(self):
+        """A pushed release whose metadata sync fails is reported ok, with a warning and its output."""
+        gem, remote = self.make_repo("alpha")
+        def broken_sync(path, data, log):
+            log("🔄 Syncing metadata to GitHub...")
+            raise RuntimeError("gh exploded")
+        [result] = publish.publish_many([gem], "patch", metadata_sync=broken_sync)
+        self.assertTrue(result["ok"] and result["pushed"])
+        self.assertEqual(result["output"], ["🔄 Syncing metadata to GitHub..."])
+        self.assertIn("gh exploded", result["warnings"][0])
+        self.assertIn("v0.1.1", git(["tag"], remote))
+
+    def test_release_pushes_commit_and_tag(self):
+        """A release lands the bump commit and annotated tag on the remote in one push."""
+        gem, remote = self.make_repo("alpha")
+        synced = []
+        publish.release_gem(gem, "patch", metadata_sync=lambda path, data, log: synced.append(data["version"]))
+
+        self.assertEqual(synced, ["0.1.1"])
+        self.assertIn("v0.1.1", git(["tag"], remote))
+        self.assertEqual(git(["rev-parse", "HEAD"], gem), git(["rev-parse", "HEAD"], remote))
+
+    def test_batch_collects_failures(self):
+        """One failing Gem does not stop the others."""
+        good, good_remote = self.make_repo("alpha")
+        dirty, _ = self.make_repo("beta")
+        (dirty / "scratch.txt").write_text("uncommitted")
+
+        results = publish.publish_many([good, dirty], "major", jobs=2, metadata_sync=None)
+        by_path = {r["path"]: r for r in results}
+        self.assertTrue(by_path[str(good)]["ok"])
+        self.assertFalse(by_path[str(dirty)]["ok"])
+        self.assertIn("not clean", by_path[str(dirty)]["error"])
+        self.assertIn("v1.0.0", git(["tag"], good_remote))
+        self.assertEqual(json.loads((dirty / "gem.json").read_text())["version"], "0.1.0")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import json
+import tempfile
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+class TestRecapRelevance(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.session_dir = self.knowledge_dir / "sessions" / "smoke-gem" / "proj"
+        self.session_dir.mkdir(parents=True)
+        self.ledger = self.session_dir / "history.jsonl"
+        topics = ["Refactor the parser tokenizer -> done"] + [f"Billing export report {i} -> shipped" for i in range(11)]
+        for i, topic in enumerate(topics):
+            entry = {"date": f"202601{i + 1:02d}_1200", "display_date": f"Jan {i + 1}",
+                     "file": f"session_{i}.md", "topic": topic}
+            gemonade.append_ledger_entry(self.ledger, entry)
+            gemonade.index_session_terms(self.session_dir, entry)
+
+        self.repo = self.temp_env / "repo"
+        (self.repo / ".git").mkdir(parents=True)
+        (self.repo / "src" / "billing").mkdir(parents=True)
+
+    def set_branch(self, name):
+        (self.repo / ".git" / "HEAD").write_text(f"ref: refs/heads/{name}\n")
+
+    def test_sidecar_written_on_index(self):
+        """Term vectors are stored alongside the ledger."""
+        lines = (self.session_dir / "history.terms.jsonl").read_text().splitlines()
+        self.assertEqual(len(lines), 12)
+        self.assertIn("parser", json.loads(lines[0])["terms"])
+
+    def test_branch_pulls_in_relevant_old_entry(self):
+        """An old entry matching the branch outranks recent unrelated ones."""
+        self.set_branch("fix/parser-tokenizer")
+        entries = gemonade.select_recap_entries(self.ledger, limit=5, cwd=self.repo)
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(entries[0]["file"], "session_0.md")
+        self.assertEqual([e["file"] for e in entries], sorted([e["file"] for e in entries], key=lambda f: int(f[8:-3])))
+
+    def test_branch_signal_in_worktree(self):
+        """In a linked worktree the branch is read through the .git pointer file."""
+        git_dir = self.repo / ".git" / "worktrees" / "wt"
+        git_dir.mkdir(parents=True)
+        (git_dir / "HEAD").write_text("ref: refs/heads/fix/parser-tokenizer\n")
+        worktree = self.temp_env / "wt"
+        worktree.mkdir()
+        (worktree / ".git").write_text(f"gitdir: {git_dir}\n")
+        entries = gemonade.select_recap_entries(self.ledger, limit=5, cwd=worktree)
+        self.assertEqual(entries[0]["file"], "session_0.md")
+
+    def test_cwd_subpath_signal(self):
+        """Working inside src/billing favors billing sessions."""
+        self.set_branch("main")
+        entries = gemonade.select_recap_entries(self.ledger, limit=3, cwd=self.repo / "src" / "billing")
+        self.assertTrue(all("Billing" in e["topic"] for e in entries))
+
+    def test_no_signals_falls_back_to_newest(self):
+        """Outside a repo the recap is the newest entries."""
+        with tempfile.TemporaryDirectory() as outside:
+            entries = gemonade.select_recap_entries(self.ledger, limit=5, cwd=outside)
+        self.assertEqual([e["file"] for e in entries], [f"session_{i}.md" for i in range(7, 12)])
+
+        recap = gemonade.build_recap(self.ledger, mode="recent")
+        self.assertIn("session_11.md", recap)
+        self.assertNotIn("session_0.md", recap)
+
+class TestNearDuplicates(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.session_dir = self.knowledge_dir / "sessions" / "smoke-gem" / "dups"
+        self.session_dir.mkdir(parents=True)
+        self.ledger = self.session_dir / "history.jsonl"
+        topics = ["Fix tests -> fixed", "Refactor parser tokenizer -> done", "Fixing the tests -> done",
+                  "Fixing tests -> done", "Add billing export -> shipped", "Fix the tests -> done",
+                  "Deploy docker image -> done"]
+        for i, topic in enumerate(topics):
+            gemonade.append_ledger_entry(self.ledger, {"date": f"202602{i + 1:02d}_1200", "display_date": f"Feb {i + 1}",
+                                                       "file": f"session_{i}.md", "topic": topic,
+                                                       "minhash": gemonade.minhash_signature(topic)})
+
+    def test_signature_similarity(self):
+        sig = gemonade.minhash_signature
+        self.assertEqual(len(sig("Fix tests")), gemonade.MINHASH_PERMUTATIONS * 4)
+        self.assertGreaterEqual(gemonade.minhash_similarity(sig("Fix tests -> fixed"), sig("Fixing the tests -> done")),
+                                gemonade.MINHASH_THRESHOLD)
+        self.assertLess(gemonade.minhash_similarity(sig("Fix tests -> fixed"), sig("Fix test failures -> done")),
+                        gemonade.MINHASH_THRESHOLD)
+        self.assertLess(gemonade.minhash_similarity(sig("Fix tests -> fixed"), sig("Deploy docker image -> done")), 0.2)
+        self.assertEqual(sig(""), "")
+
+    def test_numbered_topics_stay_apart(self):
+        entries = [{"topic": t} for t in ["Billing export report 3", "Billing export report 4", "Billing export report 4"]]
+        self.assertEqual(sorted(gemonade.cluster_entries(entries)), [[0], [1, 2]])
+
+    def test_history_skips_malformed_lines(self):
+        with open(self.ledger, "a") as f:
+            f.write('{"date": "torn\n')
+        self.assertEqual(len(gemonade.history("smoke-gem", "dups", self.config)), 7)
+        self.assertEqual(sum(c["size"] for c in gemonade.history("smoke-gem", "dups", self.config, clusters=True)), 7)
+
+    def test_recap_collapses_repeated_theme(self):
+        """Four 'fix tests' sessions take one recap line with a count."""
+        with tempfile.TemporaryDirectory() as outside:
+            recap = gemonade.build_recap(self.ledger, limit=5, cwd=outside)
+        lines = [l for l in recap.splitlines() if l.startswith("- ")]
+        self.assertEqual(len(lines), 4)
+        self.assertIn("Fix the tests -> done (Ref: `session_5.md`; +3 similar)", recap)
+        self.assertIn("Refactor parser tokenizer", recap)
+
+    def test_history_clusters_cli(self):
+        clusters = gemonade.ledger_clusters(self.ledger)
+        self.assertEqual(clusters[0]["size"], 4)
+        self.assertEqual([e["file"] for e in clusters[0]["entries"]],
+                         ["session_0.md", "session_2.md", "session_3.md", "session_5.md"])
+
+        result = self.run_cli(["history", "smoke-gem", "--project", "dups", "--clusters"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("4 themes across 7 sessions", result.stdout)
+        self.assertIn("[  4] Fix the tests -> done", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
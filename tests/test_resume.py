@@ -0,0 +1,68 @@
+import json
+import sys
+import unittest
+import subprocess
+from tests.test_helper import BaseGemonadeTest, PROJECT_ROOT
+from core import gemonade
+
+SAVER = PROJECT_ROOT / "tools" / "save_session.py"
+
+class TestResumePacks(BaseGemonadeTest):
+
+    def save(self, session_id, start, messages, project="p"):
+        log = self.temp_env / "logs" / f"{session_id}.json"
+        log.parent.mkdir(parents=True, exist_ok=True)
+        log.write_text(json.dumps({"sessionId": session_id, "startTime": start, "messages": messages}))
+        dest = self.knowledge_dir / "sessions" / "smoke-gem" / project
+        result = subprocess.run([sys.executable, str(SAVER), str(dest), "--project", project, "--log-file", str(log)],
+                                env=self.env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return dest
+
+    def test_pack_is_written_and_injected(self):
+        messages = [
+            {"type": "user", "content": "Migrate the billing cron to systemd"},
+            {"type": "gemini", "content": "Looking.", "toolCalls": [
+                {"name": "read_file", "args": {"absolute_path": "/srv/billing/cron.sh"}},
+                {"name": "run_shell_command", "args": {"command": "systemctl list-timers"}},
+                {"name": "run_shell_command", "args": {"command": "crontab -l"}},
+                {"name": "run_shell_command", "args": {"command": "systemctl list-timers"}}]},
+            {"type": "user", "content": "ok"},
+            {"type": "gemini", "content": "Timer unit written. Should it run as root?\n"
+                                          "```summary\nGOAL: Move billing cron\nOUTCOME: billing.timer drafted\n"
+                                          "OPEN: Confirm the service user\n```"},
+        ]
+        dest = self.save("c0ffee00-aaaa", "2026-05-01T10:00:00Z", messages)
+        self.save("0ld5e55-bbbb", "2026-04-01T10:00:00Z", [{"type": "user", "content": "Older work"}])
+
+        pack = json.loads((dest / "session_20260501_100000_c0ffee00.resume.json").read_text())
+        self.assertEqual(pack["goal"], "Move billing cron")
+        self.assertEqual(pack["files"], ["/srv/billing/cron.sh"])
+        self.assertEqual(pack["commands"], ["crontab -l", "systemctl list-timers"])
+        self.assertEqual(pack["open_questions"], ["Confirm the service user"])
+        self.assertEqual(pack["final_turn"], "Timer unit written. Should it run as root?")
+
+        result = self.run_cli(["resume", "--project", "p", "--dry-run"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        state = json.loads(result.stdout)
+        self.assertEqual((state["persona"], state["project_context"]), ("smoke-gem", "p"))
+        self.assertTrue(state["resume_pack"].endswith("c0ffee00.resume.json"))
+        prompt = state["system_prompt_content"]
+        self.assertIn("# ⏯️ Resuming Session: session_20260501_100000_c0ffee00.md", prompt)
+        self.assertIn("- `crontab -l`", prompt)
+        self.assertLess(len(gemonade.format_resume_pack(pack)), 2000)
+
+        older = gemonade.find_resume_pack(self.config, "0ld5e55")
+        self.assertEqual(older.name, "session_20260401_100000_0ld5e55b.resume.json")
+
+    def test_ambiguous_and_missing_refs(self):
+        self.save("aaaa1111", "2026-05-01T10:00:00Z", [{"type": "user", "content": "One"}])
+        self.save("aaaa2222", "2026-05-02T10:00:00Z", [{"type": "user", "content": "Two"}])
+        with self.assertRaises(ValueError):
+            gemonade.find_resume_pack(self.config, "aaaa")
+        with self.assertRaises(FileNotFoundError):
+            gemonade.find_resume_pack(self.config, "latest", project="elsewhere")
+        self.assertIn("aaaa2222", gemonade.find_resume_pack(self.config).name)
+
+if __name__ == "__main__":
+    unittest.main()
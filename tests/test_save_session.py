@@ -0,0 +1,223 @@
+import unittest
+import json
+import sys
+import subprocess
+import time
+from pathlib import Path
+from datetime import datetime, timezone
+from tests.test_helper import BaseGemonadeTest, PROJECT_ROOT
+from tools import save_session
+from unittest.mock import patch
+import hashlib
+import os
+from core import gemonade
+
+SAVER = PROJECT_ROOT / "tools" / "save_session.py"
+
+class TestSessionSaving(BaseGemonadeTest):
+
+    def write_log(self, name, session_id, start="2026-03-04T05:06:07Z", prompt="Fix the build"):
+        log = self.temp_env / "logs" / f"session-{name}.json"
+        log.parent.mkdir(parents=True, exist_ok=True)
+        log.write_text(json.dumps({
+            "sessionId": session_id,
+            "startTime": start,
+            "messages": [{"type": "user", "content": f"{prompt} ({name})"}, {"type": "gemini", "content": "ok"}]
+        }))
+        return log
+
+    def save(self, dest, log):
+        return subprocess.Popen([sys.executable, str(SAVER), str(dest), "--project", "p", "--log-file", str(log)],
+                                env=self.env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    def test_resave_is_stable(self):
+        """Saving the same session twice reuses its file and ledger entry."""
+        dest = self.knowledge_dir / "sessions" / "smoke-gem" / "p"
+        log = self.write_log("one", "8f1c2d3e-aaaa-bbbb")
+        for _ in range(2):
+            self.assertEqual(self.save(dest, log).wait(), 0)
+        files = sorted(dest.glob("session_*.md"))
+        self.assertEqual([f.name for f in files], ["session_20260304_050607_8f1c2d3e.md"])
+        self.assertEqual(len((dest / "history.jsonl").read_text().splitlines()), 1)
+
+    def test_parallel_savers_lose_nothing(self):
+        """N savers in the same minute/persona/project produce N files and N intact ledger lines."""
+        dest = self.knowledge_dir / "sessions" / "smoke-gem" / "p"
+        count = 12
+        logs = [self.write_log(str(i), f"{i:08x}-session") for i in range(count)]
+        procs = [self.save(dest, log) for log in logs]
+        for proc in procs:
+            _, err = proc.communicate()
+            self.assertEqual(proc.returncode, 0, err)
+
+        self.assertEqual(len(list(dest.glob("session_*.md"))), count)
+        self.assertEqual(list(dest.glob(".*.tmp")), [])
+        entries = [json.loads(line) for line in (dest / "history.jsonl").read_text().splitlines()]
+        self.assertEqual(len(entries), count)
+        self.assertEqual(len({e["file"] for e in entries}), count)
+        for entry in entries:
+            self.assertTrue((dest / entry["file"]).exists())
+
+    def test_concurrent_ledger_appends(self):
+        """Interleaved writers never tear or drop ledger lines."""
+        ledger = self.temp_env / "history.jsonl"
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from core.gemonade import append_ledger_entry;"
+            "[append_ledger_entry(sys.argv[2], {'file': f'w{sys.argv[3]}_{i}.md', 'topic': 'x' * 512}) for i in range(40)]"
+        )
+        procs = [subprocess.Popen([sys.executable, "-c", script, str(PROJECT_ROOT), str(ledger), str(w)])
+                 for w in range(6)]
+        for proc in procs:
+            self.assertEqual(proc.wait(), 0)
+        lines = ledger.read_text().splitlines()
+        self.assertEqual(len(lines), 240)
+        self.assertEqual(len({json.loads(line)["file"] for line in lines}), 240)
+
+    def wait_for(self, predicate, timeout=10):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.05)
+        return False
+
+    def append_messages(self, log, *contents):
+        data = json.loads(log.read_text())
+        data["messages"] += [{"type": "user" if i % 2 == 0 else "gemini", "content": c} for i, c in enumerate(contents)]
+        log.write_text(json.dumps(data))
+
+    def test_live_capture_then_incremental_finalize(self):
+        """--follow appends completed messages; the final save only adds the rest."""
+        dest = self.knowledge_dir / "sessions" / "smoke-gem" / "live"
+        log = self.write_log("live", "1234abcd-live")
+        state = self.temp_env / "capture.json"
+        md = dest / "session_20260304_050607_1234abcd.md"
+        watcher = subprocess.Popen([sys.executable, str(SAVER), str(dest), "--project", "p", "--log-file", str(log),
+                                    "--follow", "--capture-state", str(state), "--interval", "0.05"], env=self.env)
+        try:
+            # The newest message is held back while the chat may still update it
+            self.assertTrue(self.wait_for(lambda: md.exists() and "Fix the build (live)" in md.read_text()))
+            self.assertNotIn("## 🤖 Gemini", md.read_text())
+            self.append_messages(log, "Now add tests", "added")
+            self.assertTrue(self.wait_for(lambda: "Now add tests" in md.read_text()))
+        finally:
+            watcher.terminate()
+            watcher.wait()
+        self.assertEqual(json.loads(state.read_text())["message_count"], 3)
+
+        result = subprocess.run([sys.executable, str(SAVER), str(dest), "--project", "p", "--log-file", str(log),
+                                 "--capture-state", str(state)], env=self.env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertFalse(state.exists())
+
+        full = self.temp_env / "full"
+        self.assertEqual(self.save(full, log).wait(), 0)
+        self.assertEqual(md.read_text(), (full / md.name).read_text())
+
+    def test_capture_rerenders_filled_in_tool_results(self):
+        """Ticks parse from the anchor; the open message is re-rendered once its tool result lands."""
+        dest = self.knowledge_dir / "sessions" / "smoke-gem" / "tick"
+        log = self.temp_env / "logs" / "session-tick.json"
+        log.parent.mkdir(parents=True, exist_ok=True)
+        scan = {"id": "m2", "type": "gemini", "content": "Scanning é", "toolCalls": [
+            {"name": "run_shell_command", "args": {"command": "scan --all"}, "status": "executing"}]}
+        data = {"sessionId": "71c4-tick", "startTime": "2026-03-04T05:06:07Z", "messages": [
+            {"id": "m1", "type": "user", "content": "Scan it"}, scan, {"id": "m3", "type": "user", "content": "and?"}]}
+        log.write_text(json.dumps(data, indent=2))
+
+        state = {}
+        save_session.capture_delta(str(log), str(dest), "p", state)
+        self.assertEqual((state["settled"], state["message_count"]), (1, 2))
+        self.assertIsNone(save_session.read_session_log(str(log), state["anchor"])[0])
+
+        scan["toolCalls"][0].update(status="success", resultDisplay="3 issues found")
+        data["messages"].append({"id": "m4", "type": "gemini", "content": "Done"})
+        log.write_text(json.dumps(data, indent=2))
+        save_session.capture_delta(str(log), str(dest), "p", state, final=True)
+        md = Path(state["markdown"]).read_text()
+        self.assertEqual(md.count("Scanning é"), 1)
+        self.assertIn("3 issues found", md)
+        self.assertEqual(state["digest"]["commands"], ["scan --all"])
+        self.assertEqual(state["digest"]["count"], 4)
+
+        full = self.temp_env / "full"
+        self.assertEqual(self.save(full, log).wait(), 0)
+        self.assertEqual(md, (full / Path(state["markdown"]).name).read_text())
+
+    def test_session_log_lookup_ignores_parallel_chats(self):
+        """Only this project's logs started after launch qualify, and a claimed log stays with its launch."""
+        tmp = self.temp_env / "gemini-tmp"
+        ours = tmp / hashlib.sha256(os.getcwd().encode()).hexdigest() / "chats"
+        def chat(chats, name, start):
+            chats.mkdir(parents=True, exist_ok=True)
+            path = chats / f"session-{name}.json"
+            path.write_text(json.dumps({"sessionId": name, "startTime": start, "messages": []}, indent=2))
+            return str(path)
+        since = datetime(2026, 3, 4, 5, 6, 0, tzinfo=timezone.utc).timestamp()
+        chat(ours, "before", "2026-03-04T05:05:00Z")
+        first = chat(ours, "first", "2026-03-04T05:06:03Z")
+        second = chat(ours, "second", "2026-03-04T05:06:05Z")
+        chat(tmp / "elsewhere" / "chats", "other", "2026-03-04T05:06:09Z")
+        for path in tmp.glob("*/chats/*.json"):
+            os.utime(path, (since + 60, since + 60))
+
+        with patch.object(gemonade, "GEMINI_TMP_DIR", str(tmp)):
+            self.assertEqual(gemonade.find_session_log_since(since), first)
+            self.assertEqual(gemonade.find_session_log_since(since, owner="launch-a"), first)
+            self.assertEqual(gemonade.find_session_log_since(since, owner="launch-b"), second)
+            self.assertEqual(gemonade.find_session_log_since(since, owner="launch-a"), first)
+
+    def test_orphaned_watcher_finalizes_session(self):
+        """If the launching process dies, the watcher saves the session and ledger itself."""
+        dest = self.knowledge_dir / "sessions" / "smoke-gem" / "crash"
+        log = self.write_log("crash", "deadbeef-crash")
+        launcher = (f"import subprocess, sys, time; subprocess.Popen([sys.executable, {str(SAVER)!r}, {str(dest)!r}, "
+                    f"'--project', 'p', '--log-file', {str(log)!r}, '--follow', '--capture-state', "
+                    f"{str(self.temp_env / 'capture.json')!r}, '--interval', '0.05']); time.sleep(1)")
+        subprocess.run([sys.executable, "-c", launcher], env=self.env, check=True)
+        ledger = dest / "history.jsonl"
+        self.assertTrue(self.wait_for(ledger.exists))
+        entry = json.loads(ledger.read_text())
+        self.assertEqual(entry["topic"], "Fix the build (crash)")
+        self.assertIn("## 🤖 Gemini", (dest / entry["file"]).read_text())
+
+    def test_tool_stats_rollup(self):
+        """Tool calls are attributed, timed and rolled up; a re-save replaces its contribution."""
+        dest = self.knowledge_dir / "sessions" / "smoke-gem" / "stats"
+        (self.local_pkg / "smoke-gem" / "tools" / "slow_scan.py").write_text("print('scan')\n")
+        log = self.temp_env / "logs" / "session-stats.json"
+        log.parent.mkdir(parents=True, exist_ok=True)
+        shell = lambda cmd, ts, **extra: dict({"name": "run_shell_command", "args": {"command": cmd}, "timestamp": ts,
+                                               "resultDisplay": "x" * 100}, **extra)
+        log.write_text(json.dumps({"sessionId": "5tat5-1", "startTime": "2026-03-04T05:06:07Z", "messages": [
+            {"type": "user", "content": "Profile it"},
+            {"type": "gemini", "content": "", "timestamp": "2026-03-04T05:06:10Z", "toolCalls": [
+                shell("slow_scan.py --deep", "2026-03-04T05:06:13Z"),
+                shell("slow_scan.py --deep", "2026-03-04T05:06:16Z"),
+                shell("gemonade tool run lint check path=src", "2026-03-04T05:06:16.5Z", status="error"),
+                shell("git status", "2026-03-04T05:06:17Z"),
+                {"name": "read_file", "args": {"absolute_path": "/a"}, "durationMs": 7}]}]}))
+
+        for _ in range(2):
+            self.assertEqual(self.save(dest, log).wait(), 0)
+        record = json.loads((dest / "session_20260304_050607_5tat51.tools.json").read_text())
+        scan = record["tools"]["smoke-gem\tslow_scan.py"]
+        self.assertEqual((scan["calls"], scan["redundant"], scan["total_ms"], scan["max_ms"]), (2, 1, 6000.0, 3000.0))
+        self.assertEqual(record["tools"]["lint\tcheck"]["errors"], 1)
+        self.assertEqual(record["tools"]["shell\tgit"]["calls"], 1)
+        self.assertNotIn("smoke-gem\tgit", record["tools"])
+        self.assertEqual(record["tools"]["builtin\tread_file"]["total_ms"], 7.0)
+
+        rollup = json.loads((self.temp_env / ".gemonade" / "tool_stats.json").read_text())
+        self.assertEqual(rollup["sessions"], 1)
+        self.assertEqual(rollup["tools"]["smoke-gem\tslow_scan.py"]["calls"], 2)
+
+        result = subprocess.run([sys.executable, str(PROJECT_ROOT / "core" / "gemonade.py"), "stats", "tools", "--gem", "smoke-gem"],
+                                env=self.env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("slow_scan.py", result.stdout)
+        self.assertNotIn("read_file", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
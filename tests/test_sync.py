@@ -0,0 +1,148 @@
+import io
+import json
+import tarfile
+import unittest
+from contextlib import contextmanager
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+class TestKnowledgeSync(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.laptop = dict(self.config)
+        self.server = dict(self.config, G_KNOWLEDGE_DIR=str(self.temp_env / "server_knowledge"),
+                           GEMONADE_SESSION_LAYOUT="monthly")
+        self.state = {"laptop": gemonade.STATE_DIR, "server": self.temp_env / "server_state"}
+
+    @contextmanager
+    def on(self, machine):
+        gemonade.STATE_DIR = self.state[machine]
+        try:
+            yield self.laptop if machine == "laptop" else self.server
+        finally:
+            gemonade.STATE_DIR = self.state["laptop"]
+
+    def add_session(self, config, name, topic, body="notes"):
+        project = gemonade.Path(config["G_KNOWLEDGE_DIR"]) / "sessions" / "coder" / "app"
+        path = gemonade.locate_session_file(project, name, gemonade.session_layout(config))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# {topic}\n{body}\n")
+        gemonade.append_ledger_entry(project / "history.jsonl", {"file": path.relative_to(project).as_posix(), "topic": topic})
+        return path
+
+    def ledger(self, config):
+        path = gemonade.Path(config["G_KNOWLEDGE_DIR"]) / "sessions" / "coder" / "app" / "history.jsonl"
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    def test_delta_export_and_ledger_merge(self):
+        with self.on("laptop") as cfg:
+            self.add_session(cfg, "session_20260301_090000_aaaa.md", "Laptop work")
+            project = gemonade.Path(cfg["G_KNOWLEDGE_DIR"]) / "sessions" / "coder" / "app"
+            (project / ".history.jsonl.123.tmp").write_text("partial")
+            first = gemonade.sync_export(cfg, self.temp_env / "b1.tar.gz", peer="server")
+        self.assertEqual(first["files"], 2)
+        with tarfile.open(self.temp_env / "b1.tar.gz") as tar:
+            self.assertNotIn("files/sessions/coder/app/.history.jsonl.123.tmp", tar.getnames())
+
+        with self.on("server") as cfg:
+            self.add_session(cfg, "session_20260302_100000_bbbb.md", "Server work")
+            result = gemonade.sync_import(cfg, self.temp_env / "b1.tar.gz", peer="laptop")
+            self.assertEqual((result["written"], result["merged_entries"]), (1, 1))
+            self.assertEqual([e["file"] for e in self.ledger(cfg)],
+                             ["2026/03/session_20260302_100000_bbbb.md", "2026/03/session_20260301_090000_aaaa.md"])
+            self.assertTrue((gemonade.Path(cfg["G_KNOWLEDGE_DIR"]) / "sessions/coder/app/2026/03/session_20260301_090000_aaaa.md").exists())
+
+        with self.on("laptop") as cfg:
+            self.assertEqual(gemonade.sync_ack("server"), first["id"])
+            self.add_session(cfg, "session_20260303_110000_cccc.md", "More laptop work")
+            second = gemonade.sync_export(cfg, self.temp_env / "b2.tar.gz", peer="server")
+        with tarfile.open(self.temp_env / "b2.tar.gz") as tar:
+            meta = json.loads(tar.extractfile("sync.json").read())
+        self.assertEqual(meta["files"]["sessions/coder/app/history.jsonl"]["mode"], "append")
+        self.assertEqual(second["files"], 2)
+        self.assertLess(second["bytes"], 200)
+
+        with self.on("server") as cfg:
+            self.assertEqual(gemonade.sync_import(cfg, self.temp_env / "b2.tar.gz", peer="laptop")["merged_entries"], 1)
+            again = gemonade.sync_import(cfg, self.temp_env / "b2.tar.gz", peer="laptop")
+            self.assertEqual((again["written"], again["unchanged"], again["merged_entries"]), (0, 1, 0))
+            self.assertEqual(len(self.ledger(cfg)), 3)
+
+    def test_baseline_waits_for_acknowledgment(self):
+        with self.on("laptop") as cfg:
+            self.add_session(cfg, "session_20260301_090000_aaaa.md", "Laptop work")
+            first = gemonade.sync_export(cfg, self.temp_env / "lost.tar.gz", peer="server")
+            # The first bundle never arrived, so the next export still carries everything
+            retry = gemonade.sync_export(cfg, self.temp_env / "b1.tar.gz", peer="server")
+            self.assertEqual((first["files"], retry["files"]), (2, 2))
+        with self.on("server") as cfg:
+            gemonade.sync_import(cfg, self.temp_env / "b1.tar.gz", peer="laptop")
+            gemonade.sync_export(cfg, self.temp_env / "back.tar.gz", peer="laptop")
+        with self.on("laptop") as cfg:
+            result = gemonade.sync_import(cfg, self.temp_env / "back.tar.gz", peer="server")
+            self.assertEqual(result["acked"], retry["id"])
+            self.assertEqual(gemonade.sync_plan(cfg, "server"), [])
+            self.assertIsNone(gemonade.sync_ack("server"))
+
+    def test_rejects_incomplete_bundle(self):
+        bundle = self.temp_env / "short.tar.gz"
+        meta = json.dumps({"version": 1, "files": {"sessions/a/b/history.jsonl": {"sha256": "0", "size": 1}}})
+        with tarfile.open(bundle, "w:gz") as tar:
+            info = tarfile.TarInfo("sync.json")
+            info.size = len(meta)
+            tar.addfile(info, io.BytesIO(meta.encode()))
+        with self.assertRaisesRegex(ValueError, "missing, e.g. 'sessions/a/b/history.jsonl'"):
+            gemonade.sync_import(self.config, bundle)
+
+    def test_conflicts_keep_local_copy(self):
+        with self.on("laptop") as cfg:
+            path = self.add_session(cfg, "session_20260301_090000_aaaa.md", "Shared", body="laptop edit")
+            gemonade.sync_export(cfg, self.temp_env / "b.tar.gz")
+        with self.on("server") as cfg:
+            local = self.add_session(cfg, "session_20260301_090000_aaaa.md", "Shared", body="server edit")
+            result = gemonade.sync_import(cfg, self.temp_env / "b.tar.gz")
+        self.assertEqual(result["conflicts"], ["sessions/coder/app/2026/03/session_20260301_090000_aaaa.md"])
+        self.assertIn("server edit", local.read_text())
+        self.assertIn("laptop edit", local.with_name(local.name + ".sync-conflict").read_text())
+
+    def test_rejects_escaping_paths(self):
+        bundle = self.temp_env / "evil.tar.gz"
+        with tarfile.open(bundle, "w:gz") as tar:
+            for name, data in (("sync.json", json.dumps({"version": 1, "files": {"../x": {"sha256": "0", "size": 1}}})),
+                               ("files/../x", "x")):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data.encode()))
+        with self.assertRaises(ValueError):
+            gemonade.sync_import(self.config, bundle)
+        self.assertFalse((self.temp_env / "x").exists())
+
+    def test_rejects_non_regular_members(self):
+        """A declared file that is a symlink in the bundle is refused before anything is written."""
+        bundle = self.temp_env / "link.tar.gz"
+        rel = "sessions/coder/app/notes.md"
+        with tarfile.open(bundle, "w:gz") as tar:
+            meta = json.dumps({"version": 1, "files": {"sessions/coder/app/a.md": {"sha256": "0", "size": 1},
+                                                       rel: {"sha256": "0", "size": 1}}})
+            for name, data in (("sync.json", meta), ("files/sessions/coder/app/a.md", "a")):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data.encode()))
+            link = tarfile.TarInfo(f"files/{rel}")
+            link.type, link.linkname = tarfile.SYMTYPE, "/etc/passwd"
+            tar.addfile(link)
+        with self.assertRaisesRegex(ValueError, "not a regular file"):
+            gemonade.sync_import(self.config, bundle)
+        self.assertFalse((gemonade.Path(self.config["G_KNOWLEDGE_DIR"]) / "sessions/coder/app/a.md").exists())
+
+    def test_conflict_copies_stay_local(self):
+        with self.on("laptop") as cfg:
+            path = self.add_session(cfg, "session_20260301_090000_aaaa.md", "Shared")
+            path.with_name(path.name + ".sync-conflict").write_text("theirs")
+            gemonade.sync_export(cfg, self.temp_env / "b.tar.gz")
+        with tarfile.open(self.temp_env / "b.tar.gz") as tar:
+            self.assertFalse([n for n in tar.getnames() if "sync-conflict" in n])
+
+if __name__ == "__main__":
+    unittest.main()
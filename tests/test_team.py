@@ -0,0 +1,94 @@
+import os
+import time
+import shutil
+import unittest
+from pathlib import Path
+from unittest import mock
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+class TestTeamRoots(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.share = self.temp_env / "nfs" / "gems"
+        self.other = self.temp_env / "nfs" / "other"
+        self.create_gem(self.share, "reviewer", "Review code")
+        self.create_gem(self.share, "shadowed", "Team copy")
+        self.create_gem(self.other, "reviewer", "Second root copy")
+        self.create_gem(self.installed_pkg, "shadowed", "Installed copy")
+        self.create_gem(self.core_pkg, "general", "Core")
+        self.config["G_TEAM_ROOTS"] = f"{self.share}{os.pathsep}{self.other}"
+
+    def test_priority_and_mirroring(self):
+        path = gemonade.find_persona_file("reviewer", self.config)
+        self.assertEqual(path, gemonade.team_mirror_dir(str(self.share)) / "reviewer" / "persona.md")
+        self.assertIn("Review code", path.read_text())
+        self.assertEqual(gemonade.find_persona_file("shadowed", self.config).parent.parent, self.installed_pkg)
+        self.assertEqual(gemonade.resolve_persona("reviewer", self.config)["category"], "team")
+
+        gems = gemonade.get_gems_list(self.config)
+        self.assertEqual(list(gems), ["LOCAL", "INSTALLED", "TEAM", "CORE"])
+        self.assertEqual([name for name, _ in gems["TEAM"]], ["reviewer", "shadowed"])
+        self.assertIn("Review code", gems["TEAM"][0][1])
+
+    def test_launch_uses_mirror_when_share_is_gone(self):
+        gemonade.find_persona_file("reviewer", self.config)
+        shutil.move(str(self.temp_env / "nfs"), str(self.temp_env / "unmounted"))
+        self.config["GEMONADE_TEAM_REFRESH_TTL"] = "0"
+        with mock.patch.object(gemonade, "spawn_job_worker") as spawn:
+            path = gemonade.find_persona_file("reviewer", self.config)
+            gemonade.find_persona_file("reviewer", self.config)
+        self.assertTrue(path.exists())
+        refreshes = [j for j in gemonade.list_jobs("pending") if j["kind"] == "team_refresh"]
+        self.assertEqual(sorted(j["payload"]["root"] for j in refreshes), sorted([str(self.share), str(self.other)]))
+        self.assertEqual(spawn.call_args_list, [mock.call("team")] * 2)
+
+    def test_team_jobs_drain_in_their_own_lane(self):
+        gemonade.enqueue_job("team_refresh", {"root": str(self.share)})
+        gemonade.enqueue_job("outdated", {})
+        with mock.patch.object(gemonade, "check_outdated"):
+            self.assertEqual(gemonade.drain_jobs(self.config, wait=False), 1)
+        self.assertEqual([j["kind"] for j in gemonade.list_jobs("pending")], ["team_refresh"])
+
+        # A save worker is not blocked by a team worker holding its lock
+        with open(gemonade.jobs_dir() / "worker-team.lock", "w") as lock:
+            gemonade.fcntl.flock(lock, gemonade.fcntl.LOCK_EX | gemonade.fcntl.LOCK_NB)
+            self.assertEqual(gemonade.drain_jobs(self.config, wait=False, lane="team"), 0)
+        self.assertEqual(gemonade.drain_jobs(self.config, wait=False, lane="team"), 1)
+        self.assertTrue((gemonade.team_mirror_dir(str(self.share)) / "reviewer").exists())
+
+    def test_first_use_defers_venv_hydration(self):
+        (self.share / "reviewer" / "requirements.txt").write_text("requests\n")
+        with mock.patch.object(gemonade, "hydrate_gem") as hydrate, \
+                mock.patch.object(gemonade, "spawn_job_worker") as spawn:
+            gemonade.find_persona_file("reviewer", self.config)
+        hydrate.assert_not_called()
+        spawn.assert_called_with("team")
+        jobs = [j for j in gemonade.list_jobs("pending") if j["kind"] == "team_hydrate"]
+        self.assertEqual([Path(j["payload"]["path"]).name for j in jobs], ["reviewer"])
+
+    def test_refresh_copies_only_changed_gems(self):
+        first = gemonade.sync_team_root(str(self.share))
+        mirror = gemonade.team_mirror_dir(str(self.share))
+
+        # Same manifest version, different content: the content hash still catches it
+        time.sleep(0.01)
+        (self.share / "reviewer" / "persona.md").write_text("# reviewer\n- **Objective:** Review harder")
+        self.create_gem(self.share, "new-gem", "Fresh")
+        shutil.rmtree(self.share / "shadowed")
+        index = gemonade.sync_team_root(str(self.share))
+
+        self.assertNotEqual(index["gems"]["reviewer"]["hash"], first["gems"]["reviewer"]["hash"])
+        self.assertIn("Review harder", (mirror / "reviewer" / "persona.md").read_text())
+        self.assertEqual(sorted(index["gems"]), ["new-gem", "reviewer"])
+        self.assertFalse((mirror / "shadowed").exists())
+
+        # A touched but identical file is verified by hash and not copied again
+        before = (mirror / "new-gem" / "persona.md").stat().st_mtime_ns
+        os.utime(self.share / "new-gem" / "persona.md")
+        gemonade.sync_team_root(str(self.share))
+        self.assertEqual((mirror / "new-gem" / "persona.md").stat().st_mtime_ns, before)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import time
+import unittest
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+SCAN = """import sys, time
+from pathlib import Path
+Path(sys.argv[2]).open("a").write("ran\\n")
+print("scanned", sys.argv[1], len(Path(sys.argv[1]).read_text()))
+"""
+
+class TestToolCache(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.gem = self.local_pkg / "smoke-gem"
+        (self.gem / "scripts").mkdir()
+        (self.gem / "scripts" / "scan.py").write_text(SCAN)
+        self.runs = self.temp_env / "runs.log"
+        tool = {"name": "scan", "description": "Slow deterministic scan.", "executable": "python3",
+                "arguments": ["scripts/scan.py", "{target}", str(self.runs)],
+                "inputSchema": {"properties": {"target": {"type": "string"}}, "required": ["target"]},
+                "cache": {"ttl": 3600, "inputs": ["{target}"]}}
+        (self.gem / "mcp.json").write_text(json.dumps({"name": "smoke-tools", "tools": [tool]}))
+        self.work = self.temp_env / "work"
+        self.work.mkdir()
+        (self.work / "data.txt").write_text("abc")
+
+    def run_tool(self, **kwargs):
+        return gemonade.run_gem_tool("smoke-gem", "scan", {"target": "data.txt"}, self.config, cwd=str(self.work), **kwargs)
+
+    def executions(self):
+        return len(self.runs.read_text().splitlines()) if self.runs.exists() else 0
+
+    def test_memoizes_until_inputs_change(self):
+        first = self.run_tool()
+        self.assertEqual((first["cached"], first["stdout"]), (False, "scanned data.txt 3\n"))
+        second = self.run_tool()
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["stdout"], first["stdout"])
+        self.assertEqual(self.executions(), 1)
+
+        (self.work / "data.txt").write_text("abcdef")
+        self.assertEqual(self.run_tool()["stdout"], "scanned data.txt 6\n")
+        (self.gem / "scripts" / "scan.py").write_text(SCAN + "# tweaked\n")
+        self.assertFalse(self.run_tool()["cached"])
+        self.run_tool(use_cache=False)
+        self.assertEqual(self.executions(), 4)
+
+        report = gemonade.tool_cache_report("smoke-gem")
+        self.assertEqual((report[0]["hits"], report[0]["misses"]), (1, 3))
+
+    def test_key_includes_working_directory_and_missing_inputs(self):
+        other = self.temp_env / "other"
+        other.mkdir()
+        (other / "data.txt").write_text("abc")
+        first = self.run_tool()
+        elsewhere = gemonade.run_gem_tool("smoke-gem", "scan", {"target": "data.txt"}, self.config, cwd=str(other))
+        self.assertFalse(elsewhere["cached"])
+        self.assertEqual(elsewhere["stdout"], first["stdout"])
+        self.assertEqual(self.executions(), 2)
+
+        # A declared input that does not exist yet is part of the key
+        manifest = json.loads((self.gem / "mcp.json").read_text())
+        manifest["tools"][0]["cache"]["inputs"].append("scan.cfg")
+        (self.gem / "mcp.json").write_text(json.dumps(manifest))
+        self.run_tool()
+        self.assertTrue(self.run_tool()["cached"])
+        (self.work / "scan.cfg").write_text("deep = true\n")
+        self.assertFalse(self.run_tool()["cached"])
+
+    def test_hash_memo_is_bounded(self):
+        memo = {f"/f{i}": [[1, 1], "h", float(i)] for i in range(10)}
+        self.assertEqual(sorted(gemonade._prune_hash_memo(memo, limit=3)), ["/f7", "/f8", "/f9"])
+
+    def test_eviction_is_lru_and_size_bounded(self):
+        results = gemonade.tool_cache_dir() / "smoke-gem" / "results"
+        results.mkdir(parents=True)
+        for i, age in enumerate((300, 200, 100)):
+            path = results / f"{i}.json"
+            path.write_text("x" * 1000)
+            stamp = time.time() - age
+            gemonade.os.utime(path, (stamp, stamp))
+        self.assertEqual(gemonade.evict_tool_cache(2500), 2000)
+        self.assertEqual(sorted(p.name for p in results.iterdir()), ["1.json", "2.json"])
+
+    def test_missing_argument_and_prompt_listing(self):
+        with self.assertRaises(ValueError):
+            gemonade.run_gem_tool("smoke-gem", "scan", {}, self.config)
+        prompt = gemonade.gem_tools_prompt("smoke-gem", self.gem)
+        self.assertIn("`gemonade tool run smoke-gem scan target=<target>`: Slow deterministic scan. (cached 3600s)", prompt)
+
+        # No block for gems without runnable tool declarations
+        (self.gem / "mcp.json").write_text(json.dumps({"name": "servers-only", "mcpServers": {"x": {}},
+                                                       "tools": [{"name": "remote", "description": "MCP-served"}]}))
+        self.assertEqual(gemonade.gem_tools_prompt("smoke-gem", self.gem), "")
+        (self.gem / "mcp.json").unlink()
+        self.assertEqual(gemonade.gem_tools_prompt("smoke-gem", self.gem), "")
+        self.assertNotIn("Gem Tools", gemonade.build_session_state("smoke-gem", "p", "project", self.config)["system_prompt_content"])
+
+    def test_cli_rejects_params_without_value(self):
+        result = self.run_cli(["tool", "run", "smoke-gem", "scan", "data.txt"])
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("key=value, got: data.txt", result.stderr)
+        self.assertEqual(self.executions(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import json
+import unittest
+import subprocess
+from tests.test_helper import BaseGemonadeTest
+from core import gemonade
+
+TOOL = """import sys
+print(" ".join(sys.argv[1:]), sys.stdin.read().strip(), "decimal" in sys.modules)
+sys.exit(4)
+"""
+
+class TestToolWorker(BaseGemonadeTest):
+
+    def setUp(self):
+        super().setUp()
+        self.gem = self.local_pkg / "data-gem"
+        (self.gem / "tools").mkdir(parents=True)
+        (self.gem / "tools" / "crunch.py").write_text(TOOL)
+        (self.gem / "tools" / "notes.txt").write_text("not a tool")
+        (self.gem / "persona.md").write_text("# Data\n")
+        (self.gem / "gem.json").write_text(json.dumps({"name": "data-gem", "tool_worker": {"preload": ["decimal"]}}))
+
+    def call_shim(self, worker):
+        return subprocess.run([str(worker["bin"] / "crunch.py"), "a", "b"], input="rows\n",
+                              capture_output=True, text=True, timeout=10)
+
+    def test_spec_requires_opt_in(self):
+        spec = gemonade.tool_worker_spec(self.gem)
+        self.assertEqual(spec["preload"], ["decimal"])
+        self.assertEqual([os.path.basename(t) for t in spec["tools"]], ["crunch.py"])
+        self.assertIsNone(gemonade.tool_worker_spec(self.local_pkg / "smoke-gem"))
+
+    def test_tool_runs_in_preloaded_worker(self):
+        """Calls fork from the warm interpreter and keep argv, stdin and exit code."""
+        worker = gemonade.start_tool_worker(gemonade.tool_worker_spec(self.gem), "data-gem")
+        try:
+            deadline = time.time() + 5
+            while not worker["socket"].exists() and time.time() < deadline:
+                time.sleep(0.05)
+            result = self.call_shim(worker)
+            self.assertEqual(result.returncode, 4, result.stderr)
+            self.assertEqual(result.stdout.strip(), "a b rows True")
+        finally:
+            gemonade.stop_tool_worker(worker)
+        self.assertFalse(worker["dir"].exists())
+
+    def test_shim_falls_back_to_cold_start(self):
+        """A dead worker degrades to running the tool directly."""
+        worker = gemonade.start_tool_worker(gemonade.tool_worker_spec(self.gem), "data-gem")
+        worker["proc"].kill()
+        worker["proc"].wait()
+        if worker["socket"].exists():
+            worker["socket"].unlink()
+        try:
+            result = self.call_shim(worker)
+            self.assertEqual(result.returncode, 4, result.stderr)
+            self.assertEqual(result.stdout.strip(), "a b rows False")
+        finally:
+            gemonade.stop_tool_worker(worker)
+
+if __name__ == "__main__":
+    unittest.main()
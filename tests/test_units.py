@@ -1,5 +1,7 @@
+import os
 import unittest
 import json
+from unittest import mock
 from pathlib import Path
 from tests.test_helper import BaseGemonadeTest
 from core import gemonade
@@ -47,5 +49,110 @@ class TestGemonadeUnits(BaseGemonadeTest):
         self.assertIn("smoke-gem", [g[0] for g in gems["LOCAL"]])
         self.assertIn("community-gem", [g[0] for g in gems["INSTALLED"]])
 
+    def test_composite_prompt_dedupes_and_caches(self):
+        """Shared persona sections are emitted once and the composite is cached."""
+        shared = "# Standards\n- Be precise."
+        a = self.create_gem(self.local_pkg, "alpha", "Architect")
+        b = self.create_gem(self.local_pkg, "beta", "Operator")
+        (a / "persona.md").write_text(f"# alpha\n- **Objective:** Architect\n\n{shared}\n")
+        (b / "persona.md").write_text(f"# beta\n- **Objective:** Operator\n\n{shared}\n")
+
+        board = [("alpha", a / "persona.md"), ("beta", b / "persona.md")]
+        prompt = gemonade.get_composite_prompt(board)
+        self.assertEqual(prompt.count("- Be precise."), 1)
+        self.assertIn("# 🎭 Persona: beta", prompt)
+        self.assertIn("Operator", prompt)
+
+        cached = list((gemonade.STATE_DIR / "prompt_cache").glob("composite_*.md"))
+        self.assertEqual(len(cached), 1)
+        self.assertEqual(gemonade.get_composite_prompt(board), prompt)
+
+    def test_composite_cache_is_pruned_lru(self):
+        """Writing a composite evicts the least recently used ones beyond PROMPT_CACHE_KEEP."""
+        a = self.create_gem(self.local_pkg, "alpha", "Architect")
+        b = self.create_gem(self.local_pkg, "beta", "Operator")
+        board = [("alpha", a / "persona.md"), ("beta", b / "persona.md")]
+        cache_dir = gemonade.STATE_DIR / "prompt_cache"
+        def revise(n):
+            (b / "persona.md").write_text(f"# beta\n- **Objective:** Operator v{n}\n")
+            return gemonade._load_composite(board)
+        def cached():
+            return sorted(p.read_text().split("Operator ")[1][:2] for p in cache_dir.glob("composite_*.md"))
+
+        with mock.patch.object(gemonade, "PROMPT_CACHE_KEEP", 2):
+            revise(0)
+            revise(1)
+            for age, path in enumerate(sorted(cache_dir.glob("composite_*.md"), key=lambda p: "v1" in p.read_text())):
+                os.utime(path, (1 + age, 1 + age))
+            revise(0)  # cache hit: v0 becomes the most recently used
+            revise(2)
+        self.assertEqual(cached(), ["v0", "v2"])
+
+    def test_stable_prompt_layout(self):
+        """Static sections form a normalized, launch-independent prefix; recap and scope trail it."""
+        (self.local_pkg / "smoke-gem" / "persona.md").write_text("# smoke-gem   \r\n\n\n\n- **Objective:** Be a dummy.  \n")
+        for project, topic in (("alpha", "Alpha billing"), ("beta", "Beta search")):
+            ledger = self.knowledge_dir / "sessions" / "smoke-gem" / project / "history.jsonl"
+            ledger.parent.mkdir(parents=True)
+            ledger.write_text(json.dumps({"file": "s.md", "topic": topic, "display_date": "today"}) + "\n")
+
+        config = dict(self.config, GEMONADE_PROMPT_LAYOUT="stable")
+        states = [gemonade.build_session_state("smoke-gem", project, "project", config) for project in ("alpha", "beta")]
+        caches = [state["prompt_cache"] for state in states]
+        self.assertEqual(caches[0], caches[1])
+        self.assertEqual(caches[0]["layout"], "stable")
+
+        prompt = states[0]["system_prompt_content"]
+        prefix = prompt.encode()[:caches[0]["stable_prefix_bytes"]].decode()
+        self.assertIn("# smoke-gem\n\n- **Objective:** Be a dummy.\n", prefix)
+        self.assertNotIn("alpha", prefix.lower())
+        self.assertLess(prompt.index("# 🕒 Session Context"), prompt.index("Alpha billing"))
+
+        classic = gemonade.build_session_state("smoke-gem", "alpha", "project", self.config)
+        self.assertLess(classic["system_prompt_content"].index("Alpha billing"), classic["system_prompt_content"].index("# smoke-gem"))
+        self.assertEqual(classic["prompt_cache"]["layout"], "classic")
+
+    def test_metrics_aggregation(self):
+        """Timing events roll up into per-command/phase percentiles."""
+        for ms in range(1, 101):
+            gemonade.record_metric("list", "total", ms / 1000.0)
+        gemonade.record_metric("run", "chat", 2.0, prompt_bytes=10)
+
+        summary = {(r["command"], r["phase"]): r for r in gemonade.aggregate_metrics(gemonade.load_metrics())}
+        row = summary[("list", "total")]
+        self.assertEqual(row["count"], 100)
+        self.assertEqual(row["p50"], 50.0)
+        self.assertEqual(row["p95"], 95.0)
+        self.assertEqual(row["p99"], 99.0)
+        self.assertEqual(summary[("run", "chat")]["count"], 1)
+        self.assertEqual(gemonade.load_metrics(since=gemonade.time.time() + 60), [])
+        self.assertEqual(gemonade.parse_window("24h"), 86400)
+
+    def test_scope_view_filters_sessions(self):
+        """Knowledge views only expose the sessions a scope allows and are repaired in place."""
+        sessions = self.knowledge_dir / "sessions"
+        for persona, project in [("smoke-gem", "alpha"), ("smoke-gem", "beta"), ("other", "alpha")]:
+            (sessions / persona / project).mkdir(parents=True)
+        (self.knowledge_dir / "blueprints").mkdir()
+
+        view = gemonade.ensure_scope_view(self.knowledge_dir, "project", "smoke-gem", "alpha")
+        self.assertEqual(sorted(p.name for p in (view / "sessions").iterdir()), ["smoke-gem"])
+        self.assertEqual(sorted(p.name for p in (view / "sessions" / "smoke-gem").iterdir()), ["alpha"])
+        self.assertEqual((view / "sessions" / "smoke-gem" / "alpha").resolve(), (sessions / "smoke-gem" / "alpha").resolve())
+        self.assertTrue((view / "blueprints").is_symlink())
+
+        view = gemonade.ensure_scope_view(self.knowledge_dir, "persona", "smoke-gem", "alpha")
+        self.assertEqual(sorted(p.name for p in (view / "sessions").iterdir()), ["smoke-gem"])
+        self.assertEqual(sorted(p.name for p in (view / "sessions" / "smoke-gem").iterdir()), ["alpha", "beta"])
+
+        view = gemonade.ensure_scope_view(self.knowledge_dir, "global", "smoke-gem", "alpha")
+        self.assertEqual(sorted(p.name for p in (view / "sessions").iterdir()), ["other", "smoke-gem"])
+
+        # A persona that disappears is dropped from the reused view
+        (sessions / "other" / "alpha").rmdir()
+        (sessions / "other").rmdir()
+        view = gemonade.ensure_scope_view(self.knowledge_dir, "global", "smoke-gem", "alpha")
+        self.assertEqual(sorted(p.name for p in (view / "sessions").iterdir()), ["smoke-gem"])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Gemonade Scale Benchmarks
+Generates synthetic package/knowledge trees and times the CLI hot paths
+(list, run --dry-run, reindex, save_session, search) against them.
+Results can be saved as JSON baselines and compared with regression thresholds.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Add project root to sys.path to allow imports from core
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.gemonade import print_msg, print_err
+
+BASELINE_DIR = PROJECT_ROOT / "tests" / "benchmarks"
+
+# Tree sizes per scale. 'full' matches the sizes we see on heavy installations.
+SCALES = {
+    "smoke":   {"gems": 12,  "personas": 2, "projects": 3,  "sessions": 60,    "ledger_lines": 500,    "log_mb": 1},
+    "default": {"gems": 120, "personas": 4, "projects": 10, "sessions": 5000,  "ledger_lines": 10000,  "log_mb": 20},
+    "full":    {"gems": 500, "personas": 8, "projects": 25, "sessions": 50000, "ledger_lines": 100000, "log_mb": 300},
+}
+
+HOT_PERSONA = "persona-0"
+HOT_PROJECT = "project-0"
+WORDS = ("refactor parser cache ledger deploy tests latency config docker index network "
+         "migration schema review release auth billing queue worker metrics").split()
+
+# --- Synthetic Trees ---
+def _topic(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7)))
+
+def generate_packages(root, count, rng):
+    """Spreads `count` gems across local/installed/core."""
+    categories = ["local", "installed", "core"]
+    for i in range(count):
+        gem_dir = root / categories[i % 3] / f"gem-{i:04d}"
+        (gem_dir / "tools").mkdir(parents=True, exist_ok=True)
+        (gem_dir / "gem.json").write_text(json.dumps({"name": gem_dir.name, "version": "1.0.0", "description": _topic(rng)}))
+        body = "\n".join(f"- Rule {n}: {_topic(rng)}" for n in range(40))
+        (gem_dir / "persona.md").write_text(f"# {gem_dir.name}\n- **Objective:** {_topic(rng)}\n\n## Rules\n{body}\n")
+    for name in (HOT_PERSONA,):
+        gem_dir = root / "local" / name
+        (gem_dir / "tools").mkdir(parents=True, exist_ok=True)
+        (gem_dir / "gem.json").write_text(json.dumps({"name": name, "version": "1.0.0", "description": "hot"}))
+        (gem_dir / "persona.md").write_text(f"# {name}\n- **Objective:** Benchmark target.\n")
+
+def generate_sessions(knowledge, params, rng):
+    """Writes session Markdown files across persona/project dirs plus a large hot ledger."""
+    sessions = knowledge / "sessions"
+    dirs = [sessions / f"persona-{p}" / f"project-{j}"
+            for p in range(params["personas"]) for j in range(params["projects"])]
+    for d in dirs:
+        d.mkdir(parents=True, exist_ok=True)
+
+    base = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+    for i in range(params["sessions"]):
+        ts = time.localtime(base + i * 600)
+        name = time.strftime("session_%Y%m%d_%H%M.md", ts)
+        body = f"# Gemini Session Log\n- **Project:** bench\n---\n\n## 👤 User\n\n{_topic(rng)}\n\n## 🤖 Gemini\n\n{_topic(rng)}\n"
+        (dirs[i % len(dirs)] / name).write_text(body)
+
+    ledger = sessions / HOT_PERSONA / HOT_PROJECT / "history.jsonl"
+    with open(ledger, "w") as f:
+        for i in range(params["ledger_lines"]):
+            ts = time.localtime(base + i * 60)
+            f.write(json.dumps({
+                "date": time.strftime("%Y%m%d_%H%M", ts),
+                "display_date": time.strftime("%A, %B %d, %Y at %I:%M %p", ts),
+                "file": time.strftime("session_%Y%m%d_%H%M.md", ts),
+                "topic": _topic(rng)
+            }) + "\n")
+
+def generate_session_log(path, size_mb, rng):
+    """Streams a Gemini session JSON of roughly size_mb megabytes."""
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w") as f:
+        f.write('{"sessionId": "bench", "startTime": "2025-06-01T12:00:00Z", "messages": [')
+        first = True
+        while written < target:
+            payload = " ".join(rng.choice(WORDS) for _ in range(400))
+            msgs = [
+                {"type": "user", "content": _topic(rng)},
+                {"type": "gemini", "content": payload, "thoughts": [{"subject": "plan", "description": _topic(rng)}],
+                 "toolCalls": [{"name": "read_file", "args": {"path": "src/app.py"}, "resultDisplay": payload}]},
+            ]
+            for msg in msgs:
+                chunk = ("" if first else ",") + json.dumps(msg)
+                first = False
+                f.write(chunk)
+                written += len(chunk)
+        f.write("]}")
+
+def build_sandbox(root, params, seed=1234):
+    """Creates a complete isolated HOME with config, packages, knowledge and a stub 'gh'."""
+    rng = random.Random(seed)
+    root = Path(root)
+    pkg_root, knowledge = root / "packages", root / "knowledge"
+    generate_packages(pkg_root, params["gems"], rng)
+    generate_sessions(knowledge, params, rng)
+    generate_session_log(root / "session-bench.json", params["log_mb"], rng)
+
+    (root / ".gemonade_config").write_text(
+        f'G_PACKAGE_ROOT="{pkg_root}"\n'
+        f'G_KNOWLEDGE_DIR="{knowledge}"\n'
+        f'G_CORE_PERSONA="{PROJECT_ROOT}/core/CORE_PERSONA.md"\n'
+        f'G_SAVER_SCRIPT="{PROJECT_ROOT}/tools/save_session.py"\n'
+    )
+
+    # Search backend stub: a 'gh' that answers instantly with canned results
+    stub_bin = root / "stub_bin"
+    stub_bin.mkdir()
+    results = [{"name": f"gem-{i}", "description": _topic(rng), "url": f"https://example.invalid/gem-{i}",
+                "stargazersCount": i, "owner": {"login": "bench"}} for i in range(15)]
+    gh = stub_bin / "gh"
+    gh.write_text(f"#!/bin/sh\ncat <<'EOF'\n{json.dumps(results)}\nEOF\n")
+    gh.chmod(0o755)
+    return root
+
+# --- Timing ---
+def benchmark_commands(sandbox):
+    cli = str(PROJECT_ROOT / "core" / "gemonade.py")
+    tools = PROJECT_ROOT / "tools"
+    save_dest = sandbox / "knowledge" / "sessions" / HOT_PERSONA / "bench-save"
+    return {
+        "list": [sys.executable, cli, "list"],
+        "run_dry_run": [sys.executable, cli, "run", HOT_PERSONA, "--project", HOT_PROJECT, "--dry-run"],
+        "reindex": [sys.executable, str(tools / "reindex.py")],
+        "save_session": [sys.executable, str(tools / "save_session.py"), str(save_dest),
+                         "--project", "bench", "--log-file", str(sandbox / "session-bench.json")],
+        "search": [sys.executable, cli, "search", "bench"],
+    }
+
+def time_command(cmd, env, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        runs.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} failed: {result.stderr.strip()[-300:]}")
+    return {"median_s": round(statistics.median(runs), 4), "min_s": round(min(runs), 4), "runs": [round(r, 4) for r in runs]}
+
+def run_benchmarks(sandbox, repeat=3, only=None):
+    env = os.environ.copy()
+    env["HOME"] = str(sandbox)
+    env["PATH"] = f"{sandbox / 'stub_bin'}:{env.get('PATH', '')}"
+    env["GEMONADE_NO_DAEMON"] = "1"
+
+    results = {}
+    for name, cmd in benchmark_commands(sandbox).items():
+        if only and name not in only:
+            continue
+        results[name] = time_command(cmd, env, repeat)
+        print(f"   {name:<14} median {results[name]['median_s'] * 1000:9.1f} ms")
+    return results
+
+# --- Baselines ---
+def compare_to_baseline(results, baseline, threshold=0.25, slack_s=0.05):
+    """Returns a list of regressions: benchmarks slower than baseline * (1 + threshold) + slack."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        limit = base["median_s"] * (1 + threshold) + slack_s
+        if current["median_s"] > limit:
+            regressions.append({"benchmark": name, "baseline_s": base["median_s"],
+                                "current_s": current["median_s"], "limit_s": round(limit, 4)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Gemonade against synthetic trees.")
+    parser.add_argument("--scale", choices=SCALES, default="smoke")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", help="Run only this benchmark (repeatable)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against (default: tests/benchmarks/baseline_<scale>.json)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown (default: 0.25)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--output", help="Also write results JSON here")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated sandbox")
+    args = parser.parse_args()
+
+    params = SCALES[args.scale]
+    sandbox = Path(tempfile.mkdtemp(prefix=f"gemonade_bench_{args.scale}_"))
+    try:
+        print_msg("🏗️", f"Generating '{args.scale}' tree in {sandbox} ...")
+        start = time.perf_counter()
+        build_sandbox(sandbox, params)
+        print(f"   Generated in {time.perf_counter() - start:.1f}s: {params}")
+
+        print_msg("⏱️", f"Running benchmarks (x{args.repeat})...")
+        report = {
+            "scale": args.scale,
+            "params": params,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": run_benchmarks(sandbox, args.repeat, args.only),
+        }
+    finally:
+        if args.keep:
+            print_msg("📁", f"Sandbox kept at {sandbox}")
+        else:
+            shutil.rmtree(sandbox, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_DIR / f"baseline_{args.scale}.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print_msg("💾", f"Baseline saved to {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        print_msg("ℹ️", f"No baseline at {baseline_path} (use --save-baseline to create one).")
+        return
+
+    regressions = compare_to_baseline(report["results"], json.loads(baseline_path.read_text()), args.threshold)
+    if regressions:
+        for r in regressions:
+            print_err(f"{r['benchmark']} regressed: {r['current_s']}s vs baseline {r['baseline_s']}s (limit {r['limit_s']}s)")
+        sys.exit(1)
+    print_msg("✅", f"No regressions against {baseline_path.name} (threshold {args.threshold:.0%}).")
+
+if __name__ == "__main__":
+    main()
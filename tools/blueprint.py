@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Gemonade Blueprint Reader
+Serves individual blueprint sections by id from the blueprint index, so a
+session reads only the reference material it needs.
+
+    blueprint.py aws/iam#least-privilege     # one section (several ids allowed)
+    blueprint.py --list aws                  # every section id of a gem
+"""
+import os
+import sys
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.gemonade import (load_config, print_err, read_blueprint_index, build_blueprint_index,
+                           resolve_blueprint_ref, read_blueprint_section, _write_blueprint_index, BLUEPRINT_REF)
+
+def expand_refs(index, text, from_gem):
+    """Replaces {{BLUEPRINT: ref}} markers with the section id they resolve to."""
+    def replace(match):
+        target = resolve_blueprint_ref(index, match.group(1), from_gem)
+        return f"[see `blueprint.py {target}`]" if target else f"[unresolved blueprint: {match.group(1)}]"
+    return BLUEPRINT_REF.sub(replace, text)
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Read Gemonade blueprint sections by id.")
+    parser.add_argument("ids", nargs="*", help="Section ids (gem/doc#section) or short references")
+    parser.add_argument("--list", dest="list_gem", nargs="?", const="", metavar="GEM", help="List section ids (of one gem)")
+    args = parser.parse_args()
+
+    config = load_config()
+    index = read_blueprint_index() or build_blueprint_index(config)
+    known_refs = len(index.get("refs", {}))
+    persona = os.environ.get("GEMONADE_PERSONA")
+
+    if args.list_gem is not None:
+        for name, gem in sorted(index["gems"].items()):
+            if args.list_gem and name != args.list_gem:
+                continue
+            for doc in gem["files"]:
+                for section in doc["sections"]:
+                    print(f"{'  ' * max(section['level'] - 1, 0)}{section['id']}  ({section['length']} bytes)")
+        return
+    if not args.ids:
+        parser.error("give at least one section id (or --list)")
+
+    status = 0
+    for ref in args.ids:
+        section_id = ref if "/" in ref.split("#")[0] and "#" in ref else resolve_blueprint_ref(index, ref, persona)
+        try:
+            section, text, index = read_blueprint_section(index, section_id or ref, config)
+        except (KeyError, OSError) as e:
+            print_err(str(e).strip("'\""))
+            status = 1
+            continue
+        print(f"<!-- {section['id']} -->")
+        print(expand_refs(index, text, section["id"].split("/", 1)[0]).rstrip() + "\n")
+
+    if len(index.get("refs", {})) != known_refs:
+        # Memoize only into the index the refs were resolved against (it may have been re-indexed meanwhile)
+        current = read_blueprint_index()
+        if current and current["gems"] == index["gems"]:
+            current.setdefault("refs", {}).update(index["refs"])
+            _write_blueprint_index(current)
+    sys.exit(status)
+
+if __name__ == "__main__":
+    main()
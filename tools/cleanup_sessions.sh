@@ -48,6 +48,10 @@ mkdir -p "$ARCHIVE_ROOT"
 
 # Find and Move
 # -mindepth 2 ensures we look inside persona subfolders (sessions/thm/*.md) but don't move the folders themselves
-find "$SESSION_ROOT" -mindepth 2 -name "*.md" -type f -mtime +$RETENTION_DAYS -exec mv -v {} "$ARCHIVE_ROOT/" \;
+# Resume packs and tool stats (*.resume.json, *.tools.json) travel with their session
+find "$SESSION_ROOT" -mindepth 2 \( -name "*.md" -o -name "*.resume.json" -o -name "*.tools.json" \) -type f -mtime +$RETENTION_DAYS -exec mv -v {} "$ARCHIVE_ROOT/" \;
+
+# Drop month shards (sessions/<persona>/<project>/YYYY/MM) emptied by the move
+find "$SESSION_ROOT" -mindepth 3 -maxdepth 4 -type d -empty \( -name "[0-9][0-9]" -o -name "[0-9][0-9][0-9][0-9]" \) -not -path "$SESSION_ROOT/archive/*" -delete
 
 echo "✅ Maintenance Complete."
\ No newline at end of file
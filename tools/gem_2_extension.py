@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 import os
 import json
+import time
 import shutil
+import hashlib
 import argparse
 import sys
 from pathlib import Path
 
+# Files that are transformed (not copied) or never shipped in an extension
+MANIFEST_FILES = {"gem.json", "persona.md"}
+IGNORE_NAMES = {".venv", "__pycache__", ".git", ".DS_Store"}
+
+# Sync state lets repeated syncs touch only what changed. It lives next to the
+# graduate (<out>/.gemonade_sync/<name>.json), never inside what gets installed.
+SYNC_STATE_DIR = ".gemonade_sync"
+LEGACY_SYNC_STATE_FILE = ".gemonade_sync.json"
+
 def load_gem_manifest(gem_path):
     manifest_path = gem_path / "gem.json"
     if not manifest_path.exists():
@@ -28,13 +39,205 @@ def create_extension_manifest(gem_data):
         "contextFileName": "GEMINI.md"
     }
 
-def graduate_gem(gem_path, output_dir):
+def write_extension_manifest(gem_data, target_path):
+    with open(target_path / "gemini-extension.json", "w") as f:
+        json.dump(create_extension_manifest(gem_data), f, indent=2)
+
+def file_hash(path):
+    """Streams a file through SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def iter_support_files(gem_path):
+    """Yields (relative_path, absolute_path) for every file shipped as-is."""
+    for root, dirs, files in os.walk(gem_path):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORE_NAMES)
+        rel_root = Path(root).relative_to(gem_path)
+        for name in sorted(files):
+            if name in IGNORE_NAMES:
+                continue
+            if rel_root == Path(".") and name in MANIFEST_FILES:
+                continue
+            yield (rel_root / name).as_posix(), Path(root) / name
+
+def sync_state_path(target_path):
+    return target_path.parent / SYNC_STATE_DIR / f"{target_path.name}.json"
+
+def load_sync_state(target_path):
+    for state_file in (sync_state_path(target_path), target_path / LEGACY_SYNC_STATE_FILE):
+        if state_file.exists():
+            try:
+                return json.loads(state_file.read_text())
+            except json.JSONDecodeError:
+                pass
+    return {"files": {}, "sources": {}}
+
+def save_sync_state(target_path, state):
+    state_file = sync_state_path(target_path)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_file.with_name(state_file.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    os.replace(tmp, state_file)
+    legacy = target_path / LEGACY_SYNC_STATE_FILE
+    if legacy.exists():
+        legacy.unlink()
+
+def hash_with_state(path, previous):
+    """Returns a state record for path, reusing the previous hash when mtime/size are unchanged."""
+    st = path.stat()
+    if previous and previous.get("mtime_ns") == st.st_mtime_ns and previous.get("size") == st.st_size:
+        return previous
+    return {"sha256": file_hash(path), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def sync_extension(gem_path, target_path, verbose=True):
+    """
+    Incrementally mirrors a Gem into its graduated extension directory.
+    Copies only new or modified files, removes files that disappeared from
+    the source, and regenerates gemini-extension.json / GEMINI.md only when
+    gem.json / persona.md change. Returns a summary of the actions taken.
+    """
+    gem_path = Path(gem_path).resolve()
+    target_path = Path(target_path)
+    gem_data = load_gem_manifest(gem_path)
+    target_path.mkdir(parents=True, exist_ok=True)
+
+    state = load_sync_state(target_path)
+    old_files = state.get("files", {})
+    old_sources = state.get("sources", {})
+    summary = {"copied": [], "removed": [], "regenerated": []}
+
+    # 1. Generated files
+    new_sources = {}
+    manifest_rec = hash_with_state(gem_path / "gem.json", old_sources.get("gem.json"))
+    new_sources["gem.json"] = manifest_rec
+    if (manifest_rec["sha256"] != old_sources.get("gem.json", {}).get("sha256")
+            or not (target_path / "gemini-extension.json").exists()):
+        write_extension_manifest(gem_data, target_path)
+        summary["regenerated"].append("gemini-extension.json")
+
+    persona_path = gem_path / "persona.md"
+    if persona_path.exists():
+        persona_rec = hash_with_state(persona_path, old_sources.get("persona.md"))
+        new_sources["persona.md"] = persona_rec
+        if (persona_rec["sha256"] != old_sources.get("persona.md", {}).get("sha256")
+                or not (target_path / "GEMINI.md").exists()):
+            shutil.copy(persona_path, target_path / "GEMINI.md")
+            summary["regenerated"].append("GEMINI.md")
+    elif "persona.md" in old_sources and (target_path / "GEMINI.md").exists():
+        (target_path / "GEMINI.md").unlink()
+        summary["removed"].append("GEMINI.md")
+
+    # 2. Support files
+    new_files = {}
+    for rel, src in iter_support_files(gem_path):
+        rec = hash_with_state(src, old_files.get(rel))
+        new_files[rel] = rec
+        dest = target_path / rel
+        if dest.exists():
+            prev_sha = old_files.get(rel, {}).get("sha256")
+            # Files we never tracked (e.g. a legacy full copy) are verified by content
+            if prev_sha is None:
+                prev_sha = file_hash(dest)
+            if prev_sha == rec["sha256"]:
+                continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(src, dest)
+        summary["copied"].append(rel)
+
+    # 3. Removals (only files this tool put there)
+    for rel in sorted(set(old_files) - set(new_files)):
+        dest = target_path / rel
+        if dest.exists():
+            dest.unlink()
+            summary["removed"].append(rel)
+        parent = dest.parent
+        while parent != target_path and parent.exists() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+    save_sync_state(target_path, {"files": new_files, "sources": new_sources})
+
+    if verbose:
+        for name in summary["regenerated"]:
+            print(f"   ✅ Regenerated {name}")
+        for rel in summary["copied"]:
+            print(f"   📄 Updated {rel}")
+        for rel in summary["removed"]:
+            print(f"   🗑️  Removed {rel}")
+        if not any(summary.values()):
+            print("   ✨ Already up to date.")
+    return summary
+
+def source_snapshot(gem_path):
+    """Cheap stat-only fingerprint of the source tree used by watch mode."""
+    gem_path = Path(gem_path).resolve()
+    snapshot = {}
+    for name in MANIFEST_FILES:
+        path = gem_path / name
+        if path.exists():
+            st = path.stat()
+            snapshot[name] = (st.st_mtime_ns, st.st_size)
+    for rel, src in iter_support_files(gem_path):
+        try:
+            st = src.stat()
+        except FileNotFoundError:
+            continue
+        snapshot[rel] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+def try_sync(gem_path, target_path):
+    """sync_extension for watch mode: a failed sync is reported instead of ending the watch."""
+    try:
+        sync_extension(gem_path, target_path)
+        return True
+    except SystemExit:
+        # load_gem_manifest exits on a missing or half-saved gem.json
+        print("   ⚠️  gem.json is missing or invalid, retrying...")
+    except OSError as e:
+        # A file changed or vanished mid-sync
+        print(f"   ⚠️  Sync interrupted ({e}), retrying...")
+    return False
+
+def watch_gem(gem_path, output_dir, interval=1.0):
+    """
+    Re-syncs the graduate whenever the source Gem changes (polling loop).
+    After a failed sync the next tick retries, changed or not.
+    """
+    gem_path = Path(gem_path).resolve()
+    gem_name = load_gem_manifest(gem_path).get("name")
+    target_path = Path(output_dir) / gem_name
+
+    print(f"👀 Watching '{gem_name}' (every {interval}s). Press Ctrl+C to stop.")
+    print(f"   Source: {gem_path}")
+    print(f"   Target: {target_path}")
+    last = source_snapshot(gem_path)
+    if not try_sync(gem_path, target_path):
+        last = None
+    try:
+        while True:
+            time.sleep(interval)
+            current = source_snapshot(gem_path)
+            if current != last:
+                if last is not None:
+                    print(f"🔄 Change detected at {time.strftime('%H:%M:%S')}")
+                last = current if try_sync(gem_path, target_path) else None
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
+
+def graduate_gem(gem_path, output_dir, sync=False):
     gem_path = Path(gem_path).resolve()
     gem_data = load_gem_manifest(gem_path)
     gem_name = gem_data.get("name")
     
     # Define target directory
     target_path = Path(output_dir) / gem_name
+
+    if sync:
+        print(f"🔄 Syncing '{gem_name}' -> {target_path}")
+        return sync_extension(gem_path, target_path)
     
     if target_path.exists():
         print(f"Warning: Target directory {target_path} already exists.")
@@ -53,9 +256,7 @@ def graduate_gem(gem_path, output_dir):
     target_path.mkdir(parents=True, exist_ok=True)
 
     # 2. Generate gemini-extension.json
-    extension_manifest = create_extension_manifest(gem_data)
-    with open(target_path / "gemini-extension.json", "w") as f:
-        json.dump(extension_manifest, f, indent=2)
+    write_extension_manifest(gem_data, target_path)
     print("   ✅ Generated gemini-extension.json")
 
     # 3. Transform persona.md -> GEMINI.md
@@ -68,14 +269,7 @@ def graduate_gem(gem_path, output_dir):
 
     # 4. Copy support files
     # Blacklist of files to NOT copy
-    ignore_files = {
-        "gem.json", 
-        "persona.md", 
-        ".venv", 
-        "__pycache__", 
-        ".git",
-        ".DS_Store"
-    }
+    ignore_files = MANIFEST_FILES | IGNORE_NAMES
     
     copied_count = 0
     for item in gem_path.iterdir():
@@ -84,13 +278,16 @@ def graduate_gem(gem_path, output_dir):
         
         dest = target_path / item.name
         if item.is_dir():
-            shutil.copytree(item, dest, ignore=shutil.ignore_patterns(".venv", "__pycache__", ".git"))
+            shutil.copytree(item, dest, ignore=shutil.ignore_patterns(*IGNORE_NAMES))
         else:
             shutil.copy2(item, dest)
         copied_count += 1
     
     print(f"   ✅ Copied {copied_count} support files/directories.")
 
+    # Record sync state so later `--sync` runs are incremental
+    sync_extension(gem_path, target_path, verbose=False)
+
     print(f"\n🎉 Graduation Complete!")
     print(f"To install this extension in Gemini CLI:")
     print(f"  gemini install extension {target_path}")
@@ -99,7 +296,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Graduate a Gemonade Gem into a Gemini CLI Extension.")
     parser.add_argument("gem_path", help="Path to the source Gem (containing gem.json)")
     parser.add_argument("--out", default="graduates", help="Output directory (default: ./graduates)")
+    parser.add_argument("--sync", action="store_true", help="Incrementally sync an existing graduate (no prompt, only changed files)")
+    parser.add_argument("--watch", action="store_true", help="Keep syncing whenever the source Gem changes")
+    parser.add_argument("--interval", type=float, default=1.0, help="Polling interval in seconds for --watch (default: 1.0)")
     
     args = parser.parse_args()
     
-    graduate_gem(args.gem_path, args.out)
+    if args.watch:
+        watch_gem(args.gem_path, args.out, interval=args.interval)
+    else:
+        graduate_gem(args.gem_path, args.out, sync=args.sync)
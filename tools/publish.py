@@ -6,30 +6,47 @@ import argparse
 import sys
 import shutil
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def run_command(command, cwd=None, check=True):
-    """Runs a shell command and returns the output."""
+BUMP_TYPES = ("patch", "minor", "major")
+
+class PublishError(Exception):
+    """Raised when a release step fails for a single Gem. `pushed` is set if the release reached the remote anyway."""
+    def __init__(self, message, pushed=False):
+        super().__init__(message)
+        self.pushed = pushed
+
+def run_command(command, cwd=None, check=True, log=print):
+    """Runs a command (argv list, or a shell string) and returns the output."""
     try:
         result = subprocess.run(
             command,
             cwd=cwd,
             check=check,
-            shell=True,
+            shell=isinstance(command, str),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True
         )
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
-        print(f"Error running command: {command}")
-        print(f"Stderr: {e.stderr}")
+        printable = command if isinstance(command, str) else " ".join(command)
+        log(f"Error running command: {printable}")
+        log(f"Stderr: {e.stderr}")
         if check:
             sys.exit(1)
         return None
 
+def git(args, cwd):
+    """Runs a git subcommand without a shell, raising PublishError on failure."""
+    result = subprocess.run(["git"] + args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise PublishError(f"git {' '.join(args)} failed: {result.stderr.strip() or result.stdout.strip()}")
+    return result.stdout.strip()
+
 def check_git_clean(gem_path):
     """Checks if the git repository is clean."""
-    status = run_command("git status --porcelain", cwd=gem_path)
+    status = run_command(["git", "status", "--porcelain"], cwd=gem_path)
     if status:
         print("❌ Error: Git working directory is not clean. Please commit or stash changes.")
         sys.exit(1)
@@ -56,43 +73,196 @@ def bump_version(current_version, bump_type):
         patch += 1
     return f"{major}.{minor}.{patch}"
 
-def sync_github_metadata(gem_path, data):
-    """Syncs gem.json description and topics to GitHub."""
-    print("🔄 Syncing metadata to GitHub...")
+def sync_github_metadata(gem_path, data, log=print):
+    """Syncs gem.json description and topics to GitHub. Progress goes to `log` (batch mode collects it per Gem)."""
+    log("🔄 Syncing metadata to GitHub...")
     # Check if gh is installed
     if shutil.which("gh") is None:
-        print("⚠️  Warning: GitHub CLI ('gh') not found. Skipping metadata sync.")
+        log("⚠️  Warning: GitHub CLI ('gh') not found. Skipping metadata sync.")
         return
 
     # Check if repo has a remote
-    remotes = run_command("git remote", cwd=gem_path, check=False)
+    remotes = run_command(["git", "remote"], cwd=gem_path, check=False, log=log)
     if not remotes:
-        print("⚠️  Warning: No git remote configured. Skipping GitHub sync.")
+        log("⚠️  Warning: No git remote configured. Skipping GitHub sync.")
         return
 
     try:
-        # 1. Ensure Topic
-        cmd_topic = "gh repo edit --add-topic gemonade-gem"
-        run_command(cmd_topic, cwd=gem_path, check=False)
-
-        # 2. Sync Description
+        # A single edit call covers both topic and description (argv form, no shell escaping)
+        cmd = ["gh", "repo", "edit", "--add-topic", "gemonade-gem"]
         description = data.get("description", "")
         if description:
-            # Escape double quotes for shell safety
-            safe_desc = description.replace('"', '\\"')
-            cmd_desc = f'gh repo edit --description "{safe_desc}"'
-            run_command(cmd_desc, cwd=gem_path, check=False)
+            cmd += ["--description", description]
+        run_command(cmd, cwd=gem_path, check=False, log=log)
             
-        print("   ✅ Synced gem.json metadata (description & topics) to GitHub.")
+        log("   ✅ Synced gem.json metadata (description & topics) to GitHub.")
     except Exception as e:
-        print(f"   ⚠️  Failed to sync metadata: {e}")
+        log(f"   ⚠️  Failed to sync metadata: {e}")
 
-def main():
-    parser = argparse.ArgumentParser(description="Publish a Gemonade Gem (Version Bump + Git Release).")
-    parser.add_argument("gem_path", help="Path to the Gem directory", default=".")
-    args = parser.parse_args()
+# --- Batch Release Pipeline ---
+def plan_release(gem_path, bump_type, metadata_sync=True):
+    """Computes every action a release would take, without touching anything."""
+    gem_path = Path(gem_path).resolve()
+    manifest_path = gem_path / "gem.json"
+    if not manifest_path.exists():
+        raise PublishError(f"No gem.json found at {gem_path}")
+
+    data = load_manifest(manifest_path)
+    current_version = data.get("version", "0.0.0")
+    try:
+        new_version = bump_version(current_version, bump_type)
+    except ValueError:
+        raise PublishError(f"Unsupported version '{current_version}' (expected MAJOR.MINOR.PATCH)")
+
+    tag_name = f"v{new_version}"
+    actions = [
+        ["git", "status", "--porcelain"],
+        ["write", "gem.json", f"version={new_version}"],
+        ["git", "add", "gem.json"],
+        ["git", "commit", "-m", f"chore: release {tag_name}"],
+        ["git", "tag", "-a", tag_name, "-m", f"Release {tag_name}"],
+        ["git", "push", "--follow-tags"],
+    ]
+    if metadata_sync:
+        actions.append(["sync-metadata", "gemonade-gem", data.get("description", "")])
+    return {
+        "gem": data.get("name", gem_path.name),
+        "path": str(gem_path),
+        "current_version": current_version,
+        "new_version": new_version,
+        "tag": tag_name,
+        "actions": actions,
+    }
+
+def push_release(gem_path):
+    """
+    `git push --follow-tags`. On failure, raises PublishError with `pushed`
+    set if any ref still landed (e.g. the branch went through but the tag was
+    rejected): the release commit is then on the remote.
+    """
+    result = subprocess.run(["git", "push", "--porcelain", "--follow-tags"], cwd=gem_path,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        # Porcelain ref lines: <flag>\t<from>:<to>\t<summary>; ' ', '+', '*' and '=' mean the remote has it
+        landed = any(line[:1] in " +*=" and line.count("\t") >= 2 for line in result.stdout.splitlines())
+        raise PublishError(f"git push --follow-tags failed: {result.stderr.strip() or result.stdout.strip()}",
+                           pushed=landed)
 
-    gem_path = Path(args.gem_path).resolve()
+def release_gem(gem_path, bump_type, metadata_sync=sync_github_metadata, log=print):
+    """
+    Non-interactive release of a single Gem: bump, commit, annotated tag and
+    one `git push --follow-tags`. Raises PublishError on the first failure;
+    if the tag or push fails before anything reached the remote, the local tag
+    and bump commit are undone so the release can simply be re-run. A failed
+    metadata sync does not fail the release; it is listed in plan["warnings"].
+    """
+    plan = plan_release(gem_path, bump_type, metadata_sync=bool(metadata_sync))
+    gem_path = Path(plan["path"])
+    manifest_path = gem_path / "gem.json"
+
+    if git(["status", "--porcelain"], gem_path):
+        raise PublishError("Git working directory is not clean.")
+
+    data = load_manifest(manifest_path)
+    data["version"] = plan["new_version"]
+    save_manifest(manifest_path, data)
+
+    try:
+        git(["add", "gem.json"], gem_path)
+        git(["commit", "-m", f"chore: release {plan['tag']}"], gem_path)
+    except PublishError:
+        # Nothing was recorded yet, so leave the tree as we found it
+        git(["checkout", "--", "gem.json"], gem_path)
+        raise
+
+    try:
+        git(["tag", "-a", plan["tag"], "-m", f"Release {plan['tag']}"], gem_path)
+        push_release(gem_path)
+    except PublishError as e:
+        if e.pushed:
+            # Published commits are never rewritten; keep them so the push can be finished
+            raise PublishError(f"{e} (the release commit already reached the remote and was kept; "
+                               f"finish with 'git push --follow-tags')", pushed=True)
+        # The tree was clean before the bump, so dropping the commit loses nothing
+        if git(["tag", "--list", plan["tag"]], gem_path):
+            git(["tag", "-d", plan["tag"]], gem_path)
+        git(["reset", "--hard", "HEAD~1"], gem_path)
+        raise
+
+    plan["warnings"] = []
+    if metadata_sync:
+        try:
+            metadata_sync(gem_path, data, log=log)
+        except Exception as e:
+            plan["warnings"].append(f"Metadata sync failed: {e}")
+    return plan
+
+def publish_many(gem_paths, bump_type, jobs=4, metadata_sync=sync_github_metadata, on_result=None):
+    """
+    Releases several Gems in parallel, collecting a result per Gem instead of
+    aborting. Each Gem's output is captured in result["output"] rather than
+    printed from the worker; `on_result` sees each result as its Gem finishes.
+    Results are returned in input order.
+    """
+    def worker(path):
+        output = []
+        try:
+            plan = release_gem(path, bump_type, metadata_sync=metadata_sync, log=output.append)
+            return {"path": str(path), "ok": True, "pushed": True, "gem": plan["gem"], "tag": plan["tag"],
+                    "warnings": plan["warnings"], "output": output}
+        except Exception as e:
+            return {"path": str(path), "ok": False, "pushed": getattr(e, "pushed", False), "error": str(e),
+                    "warnings": [], "output": output}
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(worker, path): i for i, path in enumerate(gem_paths)}
+        results = [None] * len(futures)
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_result:
+                on_result(results[futures[future]])
+        return results
+
+def print_plan(gem_paths, bump_type, metadata_sync=True):
+    """Prints every action of a release (dry run). Returns False if any Gem cannot be planned."""
+    ok = True
+    for path in gem_paths:
+        try:
+            plan = plan_release(path, bump_type, metadata_sync=metadata_sync)
+        except Exception as e:
+            print(f"❌ {path}: {e}")
+            ok = False
+            continue
+        print(f"📦 {plan['gem']} ({plan['path']}): {plan['current_version']} -> {plan['new_version']}")
+        for action in plan["actions"]:
+            print(f"   - {' '.join(action)}")
+    return ok
+
+def run_batch(args):
+    metadata_sync = None if args.no_gh else sync_github_metadata
+    if args.plan:
+        sys.exit(0 if print_plan(args.gem_paths, args.bump, metadata_sync=not args.no_gh) else 1)
+
+    def report(res):
+        if res["ok"]:
+            print(f"✅ {res['gem']} {res['tag']}")
+        else:
+            print(f"❌ {res['path']}: {res['error']}")
+        for line in res["output"]:
+            print(f"   {line}")
+        for warning in res["warnings"]:
+            print(f"   ⚠️  {warning}")
+
+    print(f"🚀 Releasing {len(args.gem_paths)} gem(s) with a {args.bump} bump...")
+    results = publish_many(args.gem_paths, args.bump, jobs=args.jobs, metadata_sync=metadata_sync, on_result=report)
+
+    failed = [r for r in results if not r["ok"]]
+    print(f"\n{len(results) - len(failed)} published, {len(failed)} failed.")
+    if failed:
+        sys.exit(1)
+
+def run_interactive(gem_dir):
+    gem_path = Path(gem_dir).resolve()
     manifest_path = gem_path / "gem.json"
 
     if not manifest_path.exists():
@@ -139,18 +309,33 @@ def main():
     tag_name = f"v{new_version}"
     commit_msg = f"chore: release {tag_name}"
     
-    run_command(f"git add gem.json", cwd=gem_path)
-    run_command(f'git commit -m "{commit_msg}"', cwd=gem_path)
-    run_command(f"git tag {tag_name}", cwd=gem_path)
+    run_command(["git", "add", "gem.json"], cwd=gem_path)
+    run_command(["git", "commit", "-m", commit_msg], cwd=gem_path)
+    run_command(["git", "tag", "-a", tag_name, "-m", f"Release {tag_name}"], cwd=gem_path)
     
     print("☁️  Pushing to remote...")
-    run_command("git push", cwd=gem_path)
-    run_command("git push --tags", cwd=gem_path)
+    run_command(["git", "push", "--follow-tags"], cwd=gem_path)
 
     # 5. Enforce Findability & Metadata Sync
     sync_github_metadata(gem_path, data)
 
     print(f"\n✅ Published {name} {tag_name} successfully!")
 
+def main():
+    parser = argparse.ArgumentParser(description="Publish Gemonade Gems (Version Bump + Git Release).")
+    parser.add_argument("gem_paths", nargs="*", default=["."], help="Path(s) to Gem directories (default: .)")
+    parser.add_argument("--bump", choices=BUMP_TYPES, help="Non-interactive bump; required for multiple gems")
+    parser.add_argument("--plan", action="store_true", help="Print every release action without executing (needs --bump)")
+    parser.add_argument("--jobs", type=int, default=4, help="Parallel releases in batch mode (default: 4)")
+    parser.add_argument("--no-gh", action="store_true", help="Skip the GitHub metadata sync")
+    args = parser.parse_args()
+
+    if args.bump:
+        run_batch(args)
+    elif args.plan or len(args.gem_paths) > 1:
+        parser.error("--bump is required for --plan and multi-gem releases.")
+    else:
+        run_interactive(args.gem_paths[0])
+
 if __name__ == "__main__":
     main()
@@ -14,11 +14,10 @@ from datetime import datetime
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from core.gemonade import print_msg, print_err
+from core.gemonade import print_msg, print_err, load_config, minhash_signature, iter_session_files,
+                         replace_ledger
 
-KNOWLEDGE_DIR = PROJECT_ROOT / "knowledge" / "sessions"
-
-def index_file(filepath):
+def index_file(filepath, project_dir=None):
     try:
         content = filepath.read_text()
         filename = filepath.name
@@ -27,9 +26,10 @@ def index_file(filepath):
         
         if filename.startswith("session_"):
             try:
-                parts = filename.split("_")
+                # session_YYYYMMDD_HHMM.md (legacy) or session_YYYYMMDD_HHMMSS_<id>.md
+                parts = filename.split(".")[0].split("_")
                 dt_part = parts[1]
-                time_part = parts[2].split(".")[0]
+                time_part = parts[2][:4]
                 dt = datetime.strptime(f"{dt_part}{time_part}", "%Y%m%d%H%M")
                 date_str = dt.strftime('%Y%m%d_%H%M')
                 display_date = dt.strftime('%A, %B %d, %Y')
@@ -57,8 +57,9 @@ def index_file(filepath):
         return {
             "date": date_str,
             "display_date": display_date,
-            "file": filename,
-            "topic": topic
+            "file": str(filepath.relative_to(project_dir)) if project_dir else filename,
+            "topic": topic,
+            "minhash": minhash_signature(topic)
         }
 
     except Exception as e:
@@ -66,13 +67,14 @@ def index_file(filepath):
         return None
 
 def main():
-    print_msg("🧠", f"Re-indexing session history from: {KNOWLEDGE_DIR}")
+    knowledge_dir = Path(load_config()["G_KNOWLEDGE_DIR"]) / "sessions"
+    print_msg("🧠", f"Re-indexing session history from: {knowledge_dir}")
     
-    if not KNOWLEDGE_DIR.exists():
+    if not knowledge_dir.exists():
         print_err("Knowledge directory not found.")
         return
 
-    personas = [d for d in KNOWLEDGE_DIR.iterdir() if d.is_dir() and d.name != "archive"]
+    personas = [d for d in knowledge_dir.iterdir() if d.is_dir() and d.name != "archive"]
     total_indexed = 0
     
     for persona_dir in personas:
@@ -80,21 +82,19 @@ def main():
             if not project_dir.is_dir(): continue
             
             ledger_path = project_dir / "history.jsonl"
-            md_files = sorted(project_dir.glob("session_*.md"))
+            md_files = iter_session_files(project_dir)
             if not md_files: continue
             
             print(f"   Processing {persona_dir.name}/{project_dir.name} ({len(md_files)} sessions)...")
             
             entries = []
             for md in md_files:
-                entry = index_file(md)
+                entry = index_file(md, project_dir)
                 if entry:
                     entries.append(entry)
             
             if entries:
-                with open(ledger_path, 'w') as f:
-                    for e in entries:
-                        f.write(json.dumps(e) + "\n")
+                replace_ledger(ledger_path, entries)
                 total_indexed += len(entries)
 
     print_msg("✅", f"Re-indexing complete. Processed {total_indexed} sessions.")
@@ -2,7 +2,14 @@
 import json
 import glob
 import os
+import re
 import sys
+import time
+import signal
+import functools
+import shlex
+import uuid
+import hashlib
 from datetime import datetime
 from pathlib import Path
 
@@ -10,10 +17,10 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from core.gemonade import print_msg, print_err
-
-# Configuration
-GEMINI_TMP_DIR = os.path.expanduser("~/.gemini/tmp")
+from core.gemonade import (print_msg, print_err, append_ledger_entry, atomic_write_text, index_session_terms,
+                           record_metric, minhash_signature, resume_pack_path, tool_stats_path,
+                           store_tool_stats, find_persona_file, duration_bucket, load_config, session_layout,
+                           locate_session_file, GEMINI_TMP_DIR, find_session_log_since)
 
 def find_latest_session_log():
     """Finds the most recently modified session-*.json file in the Gemini tmp directories."""
@@ -23,6 +30,31 @@ def find_latest_session_log():
         return None
     return max(files, key=os.path.getmtime)
 
+def session_filename(dt_obj, session_id):
+    """
+    Unique, time-sortable name: session_YYYYMMDD_HHMMSS_<id>.md. The session id
+    suffix keeps parallel sessions started in the same second apart, while a
+    re-save of the same session maps to the same file.
+    """
+    suffix = re.sub(r'[^A-Za-z0-9]', '', session_id or '')[:8] or uuid.uuid4().hex[:8]
+    return f"session_{dt_obj.strftime('%Y%m%d_%H%M%S')}_{suffix}.md"
+
+PATH_ARG_KEYS = ("file_path", "absolute_path", "path", "dir_path", "paths")
+TOUCHED_PATHS_LIMIT = 20
+
+def tool_result_text(tool):
+    """The displayed result of a tool call (falls back to the raw function response)."""
+    result = tool.get('resultDisplay')
+    if not result and 'result' in tool:
+         try:
+             res_data = tool['result']
+             if isinstance(res_data, list) and len(res_data) > 0:
+                res_data = res_data[0]
+             result = res_data.get('functionResponse', {}).get('response', {}).get('output')
+         except:
+             result = str(tool.get('result'))
+    return result
+
 def format_message(msg):
     """Formats a single message object into Markdown."""
     text = ""
@@ -43,17 +75,7 @@ def format_message(msg):
             for tool in msg['toolCalls']:
                 name = tool.get('displayName', tool.get('name'))
                 args = json.dumps(tool.get('args', {}), indent=2)
-                result = tool.get('resultDisplay')
-                if not result and 'result' in tool:
-                     try:
-                         res_data = tool['result']
-                         if isinstance(res_data, list) and len(res_data) > 0:
-                            res_data = res_data[0]
-                         result = res_data.get('functionResponse', {}).get('response', {}).get('output')
-                     except:
-                         result = str(tool.get('result'))
-                
-                result_str = str(result)
+                result_str = str(tool_result_text(tool))
                 if len(result_str) > 2000:
                     result_str = result_str[:2000] + "\n... (truncated)"
 
@@ -63,105 +85,510 @@ def format_message(msg):
                     text += f"> **Result:**\n> ```\n> {result_str.replace(chr(10), chr(10) + '> ')}\n> ```\n\n"
     return text
 
+@functools.lru_cache(maxsize=None)
+def configured_layout():
+    return session_layout(load_config())
+
+def session_output_path(dest_dir, filename):
+    """The session's existing Markdown (either layout), else where the configured layout puts it."""
+    return str(locate_session_file(dest_dir, filename, configured_layout()))
+
+# --- Incremental Log Reading ---
+# A Gemini log is one JSON document that is rewritten on every update. Messages
+# before the capture anchor (the first one not yet settled) never change, so a
+# tick parses only from the anchor's byte offset on.
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r'[ \t\n\r]*')
+
+def _skip_ws(text, pos):
+    return _WS.match(text, pos).end()
+
+def _scan_array(text, pos):
+    """Elements of a JSON array from `pos` (just inside '[' or at an element): ([(char offset, value)], end)."""
+    items = []
+    pos = _skip_ws(text, pos)
+    if text.startswith(']', pos):
+        return items, pos + 1
+    while True:
+        value, end = _DECODER.raw_decode(text, pos)
+        items.append((pos, value))
+        pos = _skip_ws(text, end)
+        if text.startswith(',', pos):
+            pos = _skip_ws(text, pos + 1)
+        elif text.startswith(']', pos):
+            return items, pos + 1
+        else:
+            raise ValueError("Malformed messages array")
+
+def _walk_log(text):
+    """Top-level fields (except messages) and [(char offset, message)] of a session log."""
+    pos = _skip_ws(text, 0)
+    if not text.startswith('{', pos):
+        raise ValueError("Session log is not a JSON object")
+    header, messages = {}, []
+    pos = _skip_ws(text, pos + 1)
+    while not text.startswith('}', pos):
+        key, pos = _DECODER.raw_decode(text, pos)
+        pos = _skip_ws(text, pos)
+        if not text.startswith(':', pos):
+            raise ValueError("Malformed session log")
+        pos = _skip_ws(text, pos + 1)
+        if key == 'messages' and text.startswith('[', pos):
+            messages, pos = _scan_array(text, pos + 1)
+        else:
+            header[key], pos = _DECODER.raw_decode(text, pos)
+        pos = _skip_ws(text, pos)
+        if text.startswith(',', pos):
+            pos = _skip_ws(text, pos + 1)
+    return header, messages
+
+def _byte_offsets(text, items, base):
+    out, last_char, last_byte = [], 0, base
+    for start, value in items:
+        last_byte += len(text[last_char:start].encode())
+        last_char = start
+        out.append((last_byte, value))
+    return out
+
+def message_key(msg):
+    """Identity of a message that survives Gemini filling in its content."""
+    return msg.get('id') or f"{msg.get('type')}|{msg.get('timestamp', '')}"
+
+def read_session_log(path, anchor=None):
+    """
+    Parses a session log into (header, [(byte offset, message)], index of the
+    first message). With an anchor from an earlier read ({"offset", "index",
+    "key"}) only the messages from that offset on are parsed and header is
+    None; if the anchor no longer lines up the whole log is parsed.
+    """
+    if anchor:
+        with open(path, 'rb') as f:
+            start = max(0, anchor["offset"] - 64)
+            f.seek(start)
+            before = f.read(anchor["offset"] - start)
+            data = f.read()
+        if before.rstrip()[-1:] in (b',', b'['):
+            try:
+                text = data.decode('utf-8')
+                items, _ = _scan_array(text, 0)
+            except ValueError:
+                items = None
+            if items and isinstance(items[0][1], dict) and message_key(items[0][1]) == anchor["key"]:
+                return None, _byte_offsets(text, items, anchor["offset"]), anchor["index"]
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8')
+    header, items = _walk_log(text)
+    return header, _byte_offsets(text, items, 0), 0
+
+def session_header(data, project_ctx, log_file):
+    """Returns (filename, header markdown, date_str, display_date) for a session log."""
+    session_id = data.get('sessionId', 'unknown')
+    start_time = data.get('startTime', datetime.now().isoformat())
+
+    try:
+        dt_obj = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+        display_date = dt_obj.strftime('%A, %B %d, %Y at %I:%M %p')
+    except ValueError:
+        dt_obj = datetime.now()
+        display_date = start_time
+    date_str = dt_obj.strftime('%Y%m%d_%H%M')
+
+    header = f"# Gemini Session Log\n"
+    header += f"- **Date:** {display_date}\n"
+    header += f"- **Project:** {project_ctx}\n"
+    header += f"- **ID:** {session_id}\n"
+    header += f"- **Source Log:** `{log_file}`\n"
+    header += f"---\n"
+    return session_filename(dt_obj, data.get('sessionId')), header, date_str, display_date
+
+def parse_summary_block(messages):
+    """Fields (goal, outcome, open) of the newest ```summary block the model wrote."""
+    for msg in reversed(messages):
+        if msg['type'] == 'gemini':
+            content = msg.get('content', '')
+            if '```summary' in content:
+                fields = {"goal": "", "outcome": "", "open": []}
+                try:
+                    block = content.split('```summary')[1].split('```')[0].strip()
+                    for line in block.split('\n'):
+                        key, _, value = line.partition(':')
+                        key = key.strip().upper()
+                        if key == 'GOAL': fields["goal"] = value.strip()
+                        elif key == 'OUTCOME': fields["outcome"] = value.strip()
+                        elif key in ('OPEN', 'UNRESOLVED') and value.strip(): fields["open"].append(value.strip())
+                except: pass
+                if fields["goal"] or fields["outcome"]:
+                    return fields
+    return None
+
+def extract_topic(digest):
+    """Self-summary block if the model wrote one, otherwise the first prompt."""
+    summary = digest["summary"]
+    if summary:
+        topic = f"{summary['goal']} -> {summary['outcome']}"
+        if len(topic) > 100: topic = topic[:97] + "..."
+        print_msg("📚", f"Indexed via Self-Summary: '{topic}'")
+        return topic
+
+    first_line = digest["first_line"]
+    if first_line:
+        topic = (first_line[:75] + '...') if len(first_line) > 75 else first_line
+        print_msg("📚", f"Indexed via First Prompt: '{topic}'")
+        return topic
+    return "General Session"
+
+# --- Resume Packs ---
+# A few hundred tokens per session (goal, files, commands, open questions, final
+# answer) so 'gemonade resume' can continue without re-reading the transcript.
+RESUME_MAX_COMMANDS = 10
+RESUME_MAX_QUESTIONS = 5
+RESUME_FINAL_CHARS = 1200
+
+def _clip(text, limit):
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+def build_resume_pack(digest, filename, project_ctx, session_id):
+    summary = digest["summary"] or {}
+    final = digest["final"]
+
+    questions = list(summary.get("open") or [])
+    if not questions:
+        # Questions the assistant left with the user in its last turn
+        for line in final.splitlines():
+            line = line.strip(" -*>#")
+            if line.endswith("?") and len(line) > 10:
+                questions.append(_clip(line, 200))
+    return {
+        "session": filename,
+        "session_id": session_id,
+        "project": project_ctx,
+        "goal": _clip(summary.get("goal") or digest["first_line"], 200),
+        "outcome": _clip(summary.get("outcome", ""), 200),
+        "files": digest["paths"],
+        "commands": digest["commands"],
+        "open_questions": questions[:RESUME_MAX_QUESTIONS],
+        "final_turn": _clip(final, RESUME_FINAL_CHARS),
+        "messages": digest["count"],
+    }
+
+# --- Tool Call Stats ---
+# Per-session tool analytics, folded into the rollup behind 'gemonade stats tools'.
+def _timestamp(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+SCRIPT_INTERPRETERS = {"python", "python3", "bash", "sh", "node"}
+
+@functools.lru_cache(maxsize=None)
+def gem_tool_names(persona):
+    """Script names in the persona's tools/ directory (empty if it cannot be found)."""
+    try:
+        persona_file = find_persona_file(persona, load_config())
+    except (OSError, ValueError, KeyError):
+        return frozenset()
+    tools_dir = persona_file.parent / "tools" if persona_file else None
+    if not tools_dir or not tools_dir.is_dir():
+        return frozenset()
+    return frozenset(p.name for p in tools_dir.iterdir() if p.is_file())
+
+def tool_call_key(tool, persona, gem_tools=frozenset()):
+    """
+    (gem, tool) a call is attributed to: 'gemonade tool run' and scripts in a
+    gem's tools/ directory by gem, other shell commands as 'shell', Gemini
+    built-ins as 'builtin'.
+    """
+    command = (tool.get('args') or {}).get('command')
+    if isinstance(command, str) and command.strip():
+        try:
+            words = shlex.split(command)
+        except ValueError:
+            words = command.split()
+        if not words:
+            return "shell", tool.get('name', 'shell')
+        if words[:3] == ["gemonade", "tool", "run"] and len(words) >= 5:
+            return words[3], words[4]
+        script = words[1] if os.path.basename(words[0]) in SCRIPT_INTERPRETERS and len(words) > 1 else words[0]
+        name = os.path.basename(script)
+        parent = os.path.dirname(script)
+        if parent and os.path.basename(parent) == "tools" and os.path.dirname(parent):
+            return os.path.basename(os.path.dirname(parent)), name
+        if not parent and name in gem_tools:
+            return persona, name
+        return "shell", os.path.basename(words[0])
+    return "builtin", tool.get('name') or tool.get('displayName') or "unknown"
+
+def tool_call_duration(tool, started):
+    """Milliseconds for a call: recorded duration, else the gap since the previous event."""
+    for field in ('durationMs', 'duration_ms'):
+        if isinstance(tool.get(field), (int, float)):
+            return float(tool[field])
+    finished = _timestamp(tool.get('timestamp'))
+    if finished is None or started is None or finished < started:
+        return None
+    return (finished - started) * 1000
+
+def _fold_tool_stats(digest, msg, persona):
+    tools, seen_calls = digest["tools"], digest["seen_calls"]
+    started = _timestamp(msg.get('timestamp'))
+    for tool in msg.get('toolCalls') or []:
+        gem, name = tool_call_key(tool, persona, gem_tool_names(persona))
+        stat = tools.setdefault(f"{gem}\t{name}", {"calls": 0, "errors": 0, "redundant": 0, "timed": 0,
+                                                    "total_ms": 0.0, "max_ms": 0.0, "result_bytes": 0, "buckets": {}})
+        stat["calls"] += 1
+        call_id = hashlib.sha1(json.dumps([tool.get('name'), tool.get('args') or {}], sort_keys=True).encode()).hexdigest()[:16]
+        if call_id in seen_calls:
+            stat["redundant"] += 1
+        else:
+            seen_calls.append(call_id)
+        if tool.get('status') in ('error', 'cancelled'):
+            stat["errors"] += 1
+        result = tool_result_text(tool)
+        stat["result_bytes"] += len(str(result).encode()) if result else 0
+        ms = tool_call_duration(tool, started)
+        if ms is not None:
+            stat["timed"] += 1
+            stat["total_ms"] = round(stat["total_ms"] + ms, 3)
+            stat["max_ms"] = max(stat["max_ms"], round(ms, 3))
+            bucket = str(duration_bucket(ms))
+            stat["buckets"][bucket] = stat["buckets"].get(bucket, 0) + 1
+        started = _timestamp(tool.get('timestamp')) or started
+
+def record_tool_stats(tools, output_path, persona, project_ctx):
+    """Writes the session's stats record and swaps it into the rollup. Returns the call count."""
+    record = {"session": os.path.basename(output_path), "persona": persona, "project": project_ctx, "tools": tools}
+    if not store_tool_stats(tool_stats_path(output_path), record):
+        return 0
+    return sum(stat["calls"] for stat in tools.values())
+
+# --- Session Digest ---
+# Everything the final save derives from the transcript (topic, resume pack,
+# touched paths, tool stats), folded one settled message at a time so the
+# final save never rescans the whole log.
+def new_digest():
+    return {"count": 0, "first_line": "", "summary": None, "final": "", "paths": [], "commands": [],
+            "tools": {}, "seen_calls": []}
+
+def fold_message(digest, msg, persona):
+    digest["count"] += 1
+    content = msg.get('content') or ''
+    if msg['type'] == 'user' and not digest["first_line"] and content.strip():
+        digest["first_line"] = content.strip().split('\n')[0]
+    elif msg['type'] == 'gemini':
+        digest["summary"] = parse_summary_block([msg]) or digest["summary"]
+        if content.strip():
+            digest["final"] = content.split('```summary')[0]
+    for tool in msg.get('toolCalls') or []:
+        args = tool.get('args') or {}
+        for key in PATH_ARG_KEYS:
+            values = args.get(key)
+            for value in values if isinstance(values, list) else [values]:
+                if isinstance(value, str) and value and value not in digest["paths"] \
+                        and len(digest["paths"]) < TOUCHED_PATHS_LIMIT:
+                    digest["paths"].append(value)
+        command = args.get('command')
+        if isinstance(command, str) and command.strip():
+            command = _clip(command, 200)
+            if command in digest["commands"]:
+                digest["commands"].remove(command)
+            digest["commands"] = (digest["commands"] + [command])[-RESUME_MAX_COMMANDS:]
+    if msg.get('toolCalls'):
+        _fold_tool_stats(digest, msg, persona)
+
+# --- Live Capture ---
+# While a chat runs, `--follow` keeps the session Markdown current and records
+# progress (anchor, settled messages, digest) in a capture state file. The
+# final save then only parses and renders what the watcher has not settled.
+def read_capture_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError, TypeError):
+        return None
+
+def capture_delta(log_file, dest_dir, project_ctx, state, final=False):
+    """
+    Brings the session Markdown up to date. The newest message is held back
+    until `final`, and the last captured one stays open: it is re-rendered
+    (the Markdown truncated back to it) while Gemini may still fill in its
+    tool results. Messages before it are settled, rendered once and folded
+    into state["digest"]. Returns the bytes written.
+    """
+    markdown = state.get("markdown")
+    resumable = (state.get("log_file") == log_file and state.get("header") is not None and markdown
+                 and os.path.exists(markdown) and os.path.getsize(markdown) >= state.get("settled_bytes", 0))
+    header, items, base = read_session_log(log_file, state.get("anchor") if resumable else None)
+    header = header if header is not None else state["header"]
+    filename, head_md, _, _ = session_header(header, project_ctx, log_file)
+    output_path = session_output_path(dest_dir, filename)
+    if not resumable or markdown != output_path or base > state["settled"]:
+        resumable = False
+        state.clear()
+        state.update({"log_file": log_file, "markdown": output_path, "settled": 0, "settled_bytes": 0,
+                      "header": {k: header[k] for k in ("sessionId", "startTime") if k in header},
+                      "digest": new_digest(), "open_sha": None})
+
+    total = base + len(items)
+    settled = state["settled"]
+    upto = total if final else max(settled, total - 1)
+    new_settled = upto if final else max(settled, upto - 1)
+    message = lambda i: items[i - base][1]
+    persona = Path(dest_dir).resolve().parent.name
+
+    settled_md = "".join(format_message(message(i)) for i in range(settled, new_settled))
+    for i in range(settled, new_settled):
+        fold_message(state["digest"], message(i), persona)
+    open_md = "".join(format_message(message(i)) for i in range(new_settled, upto))
+    open_sha = hashlib.sha1(open_md.encode()).hexdigest()
+
+    written = ""
+    if not resumable:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        written = head_md + settled_md + open_md
+        atomic_write_text(output_path, written)
+        settled_bytes = len((head_md + settled_md).encode())
+    else:
+        settled_bytes = state["settled_bytes"]
+        if settled_md or open_sha != state["open_sha"]:
+            written = settled_md + open_md
+            with open(output_path, 'r+b') as f:
+                f.truncate(settled_bytes)
+                f.seek(settled_bytes)
+                f.write(written.encode())
+        settled_bytes += len(settled_md.encode())
+
+    anchor = None
+    if new_settled < total:
+        anchor = {"offset": items[new_settled - base][0], "index": new_settled, "key": message_key(message(new_settled))}
+    state.update({"settled": new_settled, "settled_bytes": settled_bytes, "open_sha": open_sha,
+                  "message_count": upto, "anchor": anchor})
+    return len(written.encode())
+
+def follow_session(dest_dir, project_ctx, state_path, since, interval=2.0, log_file=None, claim=None):
+    """
+    Polls the active session log and captures new messages until stopped.
+    If the launching process disappears (crash, killed terminal, SSH drop)
+    the session is finalized here, ledger included.
+    """
+    parent = os.getppid()
+    state = read_capture_state(state_path) or {}
+    last_stamp = None
+    # SIGTERM (normal end of chat) exits at once, except mid-append where it waits
+    # for the state file to match the Markdown
+    busy, stopping = [False], [False]
+    def on_term(signum, frame):
+        stopping[0] = True
+        if not busy[0]:
+            raise SystemExit(0)
+    signal.signal(signal.SIGTERM, on_term)
+
+    while not stopping[0]:
+        if os.getppid() != parent:
+            if state.get("log_file"):
+                save_session(dest_dir, project_ctx, state["log_file"], capture_state=state_path)
+            return
+        log = state.get("log_file") or log_file or find_session_log_since(since, owner=claim)
+        if log:
+            busy[0] = True
+            try:
+                st = os.stat(log)
+                stamp = (st.st_mtime_ns, st.st_size)
+                if stamp != last_stamp:
+                    capture_delta(log, dest_dir, project_ctx, state)
+                    atomic_write_text(state_path, json.dumps(state))
+                    last_stamp = stamp
+            except (OSError, ValueError):
+                pass  # mid-write: retry on the next tick
+            finally:
+                busy[0] = False
+        if not stopping[0]:
+            time.sleep(interval)
+
+def save_session(dest_dir, project_ctx, log_file, no_ledger=False, entry_out=None, capture_state=None):
+    """Finalizes the session Markdown and returns its ledger entry."""
+    started = time.perf_counter()
+    state = (read_capture_state(capture_state) if capture_state else None) or {}
+    resumed = state.get("settled", 0)
+    markdown_bytes = capture_delta(log_file, dest_dir, project_ctx, state, final=True)
+    digest, header, output_path = state["digest"], state["header"], state["markdown"]
+    filename, _, date_str, display_date = session_header(header, project_ctx, log_file)
+    if capture_state and os.path.exists(capture_state):
+        os.unlink(capture_state)
+
+    pack = build_resume_pack(digest, filename, project_ctx, header.get('sessionId'))
+    atomic_write_text(resume_pack_path(output_path), json.dumps(pack, indent=2))
+    persona = Path(dest_dir).resolve().parent.name
+    tool_calls = record_tool_stats(digest["tools"], output_path, persona, project_ctx)
+
+    print_msg("✅", f"Session saved to: {output_path}")
+
+    # --- V6 Memory Indexing (The Ledger) ---
+    ledger_path = os.path.join(dest_dir, "history.jsonl")
+    topic = extract_topic(digest)
+    ledger_entry = {
+        "date": date_str,
+        "display_date": display_date,
+        "file": os.path.relpath(output_path, dest_dir),
+        "topic": topic,
+        "minhash": minhash_signature(topic)
+    }
+    if digest["paths"]:
+        ledger_entry["paths"] = digest["paths"]
+
+    if entry_out:
+        with open(entry_out, 'w') as f:
+            json.dump(ledger_entry, f)
+    if not no_ledger:
+        append_ledger_entry(ledger_path, ledger_entry)
+        index_session_terms(dest_dir, ledger_entry)
+
+    record_metric("save", "save_session", time.perf_counter() - started,
+                  message_count=digest["count"],
+                  log_bytes=os.path.getsize(log_file),
+                  markdown_bytes=markdown_bytes,
+                  tool_calls=tool_calls,
+                  incremental=resumed > 0)
+    return ledger_entry
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Save Gemini session logs as Markdown.")
     parser.add_argument("dest_dir", help="Directory where the Markdown file will be saved.")
     parser.add_argument("--project", help="The project context for this session.", default="global")
+    parser.add_argument("--log-file", help="Explicit Gemini session JSON (default: most recent in ~/.gemini/tmp).")
+    parser.add_argument("--no-ledger", action="store_true", help="Do not append to history.jsonl (the caller records it).")
+    parser.add_argument("--entry-out", help="Write the ledger entry as JSON to this path.")
+    parser.add_argument("--capture-state", help="Live capture state file (written by --follow, consumed by the final save).")
+    parser.add_argument("--follow", action="store_true", help="Capture new messages live until stopped (requires --capture-state).")
+    parser.add_argument("--since", type=float, default=None, help="With --follow: only pick up this project's logs started after this epoch time.")
+    parser.add_argument("--claim", help="With --follow: launch id that claims the picked log, so parallel chats keep their own.")
+    parser.add_argument("--interval", type=float, default=2.0, help="With --follow: polling interval in seconds.")
     
     args = parser.parse_args()
     dest_dir = os.path.expanduser(args.dest_dir)
-    project_ctx = args.project
     
     if not os.path.exists(dest_dir):
         os.makedirs(dest_dir, exist_ok=True)
 
-    log_file = find_latest_session_log()
+    if args.follow:
+        if not args.capture_state:
+            parser.error("--follow requires --capture-state")
+        follow_session(dest_dir, args.project, args.capture_state, args.since or time.time(),
+                       args.interval, args.log_file, args.claim)
+        return
+
+    log_file = args.log_file or find_latest_session_log()
     if not log_file:
         print_err("No Gemini session logs found in ~/.gemini/tmp/")
         sys.exit(1)
 
     try:
-        with open(log_file, 'r') as f:
-            data = json.load(f)
-        
-        session_id = data.get('sessionId', 'unknown')
-        start_time = data.get('startTime', datetime.now().isoformat())
-        
-        try:
-            dt_obj = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-            date_str = dt_obj.strftime('%Y%m%d_%H%M')
-            display_date = dt_obj.strftime('%A, %B %d, %Y at %I:%M %p')
-        except ValueError:
-            date_str = datetime.now().strftime('%Y%m%d_%H%M')
-            display_date = start_time
-        
-        filename = f"session_{date_str}.md"
-        output_path = os.path.join(dest_dir, filename)
-
-        markdown_content = f"# Gemini Session Log\n"
-        markdown_content += f"- **Date:** {display_date}\n"
-        markdown_content += f"- **Project:** {project_ctx}\n"
-        markdown_content += f"- **ID:** {session_id}\n"
-        markdown_content += f"- **Source Log:** `{log_file}`\n"
-        markdown_content += f"---\n"
-
-        for msg in data.get('messages', []):
-            markdown_content += format_message(msg)
-
-        with open(output_path, 'w') as f:
-            f.write(markdown_content)
-
-        print_msg("✅", f"Session saved to: {output_path}")
-
-        # --- V6 Memory Indexing (The Ledger) ---
-        topic = "General Session"
-        summary_found = False
-        for msg in reversed(data.get('messages', [])):
-            if msg['type'] == 'gemini':
-                content = msg.get('content', '')
-                if '```summary' in content:
-                    try:
-                        block = content.split('```summary')[1].split('```')[0].strip()
-                        lines = block.split('\n')
-                        goal = ""
-                        outcome = ""
-                        for line in lines:
-                            if line.upper().startswith('GOAL:'): goal = line.split(':', 1)[1].strip()
-                            if line.upper().startswith('OUTCOME:'): outcome = line.split(':', 1)[1].strip()
-                        
-                        if goal or outcome:
-                            topic = f"{goal} -> {outcome}"
-                            if len(topic) > 100: topic = topic[:97] + "..."
-                            print_msg("📚", f"Indexed via Self-Summary: '{topic}'")
-                            summary_found = True
-                            break
-                    except: pass
-        
-        if not summary_found:
-            for msg in data.get('messages', []):
-                if msg['type'] == 'user':
-                    content = msg.get('content', '').strip()
-                    if content:
-                        first_line = content.split('\n')[0]
-                        topic = (first_line[:75] + '...') if len(first_line) > 75 else first_line
-                        print_msg("📚", f"Indexed via First Prompt: '{topic}'")
-                        break
-        
-        ledger_path = os.path.join(dest_dir, "history.jsonl")
-        ledger_entry = {
-            "date": date_str,
-            "display_date": display_date,
-            "file": filename,
-            "topic": topic
-        }
-        
-        with open(ledger_path, 'a') as f:
-            f.write(json.dumps(ledger_entry) + "\n")
-
+        save_session(dest_dir, args.project, log_file, args.no_ledger, args.entry_out, args.capture_state)
     except Exception as e:
         print_err(f"Processing failed: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Gemonade Tool Worker
+A per-gem forkserver: imports the gem's heavy modules once, then runs each tool
+call in a forked child so invocations skip interpreter start-up and imports.
+
+Runs under the gem's own interpreter (.venv/bin/python), so it only uses the
+standard library. Shims created by gemonade call `call()` with the caller's
+stdin/stdout/stderr passed over the socket (SCM_RIGHTS); if the worker is not
+reachable the shim simply execs the tool directly.
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import signal
+import socket
+import argparse
+import importlib
+import threading
+
+MAX_REQUEST = 1024 * 1024
+
+def _recv_request(conn):
+    """Reads one JSON request (newline terminated) plus the three stdio fds."""
+    data, fds, _, _ = socket.recv_fds(conn, MAX_REQUEST, 3)
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(MAX_REQUEST)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data), fds
+
+def _run_tool(request, fds):
+    """Child side: adopt the caller's stdio/cwd/env and run the script as __main__."""
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = os.fdopen(0, "r", closefd=False)
+    sys.stdout = os.fdopen(1, "w", closefd=False)
+    sys.stderr = os.fdopen(2, "w", closefd=False)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = [request["script"]] + request["argv"]
+    sys.path.insert(0, os.path.dirname(request["script"]))
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    code = 0
+    try:
+        runpy.run_path(request["script"], run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if not isinstance(e.code, (int, type(None))):
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    return code
+
+def _watch_parent(parent_pid, sock_path):
+    """Exits the worker once the launching session is gone."""
+    while True:
+        time.sleep(1)
+        if os.getppid() != parent_pid:
+            try:
+                os.unlink(sock_path)
+            except OSError:
+                pass
+            os._exit(0)
+
+def serve(sock_path, preload):
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # children are reaped automatically
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl-C in the chat must not kill the worker
+    if os.path.exists(sock_path):
+        os.unlink(sock_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    os.chmod(sock_path, 0o600)
+    # Listen before preloading: early calls queue up instead of starting cold
+    server.listen(16)
+
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            print(f"tool-worker: could not preload '{module}': {e}", file=sys.stderr)
+    threading.Thread(target=_watch_parent, args=(os.getppid(), sock_path), daemon=True).start()
+
+    while True:
+        conn, _ = server.accept()
+        if os.fork() == 0:
+            server.close()
+            code = 1
+            try:
+                request, fds = _recv_request(conn)
+                conn.sendall(f"{os.getpid()}\n".encode())
+                code = _run_tool(request, fds)
+            finally:
+                try:
+                    conn.sendall(f"{code}\n".encode())
+                except OSError:
+                    pass
+                os._exit(code)
+        conn.close()
+
+def call(sock_path, script, argv, python):
+    """Client side used by shims. Falls back to running the tool cold under `python`."""
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(sock_path)
+    except OSError:
+        os.execv(python, [python, script] + argv)
+
+    request = {"script": script, "argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    socket.send_fds(conn, [json.dumps(request).encode() + b"\n"], [0, 1, 2])
+    reader = conn.makefile("r")
+    line = reader.readline()
+    if not line:
+        return 1
+    # The tool runs outside our process group: forward Ctrl-C / termination to it
+    tool_pid = int(line)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: os.kill(tool_pid, signum))
+    line = reader.readline()
+    return int(line) if line else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemonade per-gem tool worker.")
+    parser.add_argument("socket", help="Unix socket path to listen on")
+    parser.add_argument("--preload", action="append", default=[], help="Module to import up front (repeatable)")
+    args = parser.parse_args()
+    serve(args.socket, args.preload)
+
+if __name__ == "__main__":
+    main()